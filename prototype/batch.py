@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+PocketMindly - Batch Runner
+Answers a JSONL file of text questions without audio: route -> search -> LLM.
+
+Searches run concurrently (bounded); the LLM is kept busy by one or more
+model processes, each pinned to its own set of cores, with a couple of
+requests queued per process so it never waits between questions.
+Writes one JSON line per answer with per-stage timings, and reports
+questions per minute.
+
+Input lines:  {"id": "q1", "question": "Who is Elon Musk?"}   ("text" also accepted)
+Usage (from prototype/):
+    python batch.py questions.jsonl -o answers.jsonl [--instances 2] [--threads 4]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import settings
+from core.llm_server import LLMServer, PRIORITY_LOW
+from core.router import IntentRouter
+from core.tracing import RollingHistogram
+from tools.web_search import AsyncWebSearchTool
+
+TIMINGS = ("route_ms", "search_ms", "wait_ms", "first_token_ms", "llm_ms", "total_ms")
+
+
+def load_questions(path: str, limit: int = None):
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            question = row.get("question") or row.get("text")
+            if not question:
+                print(f"⚠️ Line {line_no}: no question, skipped")
+                continue
+            items.append({"id": row.get("id", line_no), "question": question})
+            if limit and len(items) >= limit:
+                break
+    return items
+
+
+def core_sets(instances: int, threads: int = None):
+    """
+    Split the cores this process may use into one set per instance.
+    Returns (sets, threads_per_instance); sets are None where pinning isn't supported.
+    """
+    if not hasattr(os, "sched_getaffinity"):
+        return [None] * instances, threads or max(1, (os.cpu_count() or 1) // instances)
+    available = sorted(os.sched_getaffinity(0))
+    threads = threads or max(1, len(available) // instances)
+    if instances * threads > len(available):
+        print(f"⚠️ {instances} x {threads} threads oversubscribes {len(available)} cores")
+    sets = [[available[(i * threads + j) % len(available)] for j in range(threads)]
+            for i in range(instances)]
+    return sets, threads
+
+
+class BatchRunner:
+    """Feeds questions through search and a pool of LLM servers"""
+
+    def __init__(self, servers, web_tool, router, search_concurrency: int = 8,
+                 depth: int = 2, search: bool = True):
+        self.servers = servers
+        self.web_tool = web_tool
+        self.router = router
+        self.search_concurrency = search_concurrency
+        self.depth = depth
+        self.search = search
+        self.timings = {name: RollingHistogram(100000) for name in TIMINGS}
+        self.done = 0
+        self.errors = 0
+
+    # ---------- SEARCH ----------
+
+    async def _prepare(self, item):
+        """Route and, when needed, fetch search context"""
+        item["started"] = time.monotonic()
+        route = self.router.route(item["question"])
+        item["intent"] = route["intent"]
+        item["route_ms"] = (time.monotonic() - item["started"]) * 1000
+        item["context"] = None
+
+        if self.search and route["needs_search"]:
+            started = time.monotonic()
+            try:
+                item["context"] = await self.web_tool.get_context(route["query"])
+            except Exception as e:
+                item["search_error"] = str(e)[:200]
+            item["search_ms"] = (time.monotonic() - started) * 1000
+        item["ready"] = time.monotonic()
+
+    async def _search_worker(self, pending: asyncio.Queue, ready: asyncio.Queue):
+        while True:
+            try:
+                item = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await self._prepare(item)
+            await ready.put(item)     # Blocks while the LLMs are behind
+
+    # ---------- LLM ----------
+
+    async def _answer(self, server, index, item):
+        context = item.pop("context")
+        grounded = bool(context and len(context) > 100)
+        first_token = []
+        submitted = time.monotonic()
+
+        def on_token(token):
+            if not first_token:
+                first_token.append(time.monotonic())
+
+        if grounded:
+            request = server.submit("generate_response_with_search", item["question"], context,
+                                    priority=PRIORITY_LOW, on_token=on_token)
+        else:
+            request = server.submit("generate_response", item["question"],
+                                    priority=PRIORITY_LOW, on_token=on_token)
+        try:
+            answer = await asyncio.wrap_future(request.future)
+        except RuntimeError as e:
+            answer, item["error"] = None, str(e)
+            self.errors += 1
+        finished = time.monotonic()
+        # Waiting includes the LLM process's own priority queue, up to when it picked the request up
+        started = request.started or submitted
+
+        item.update({
+            "answer": answer,
+            "grounded": grounded,
+            "instance": index,
+            "wait_ms": (started - item["ready"]) * 1000,
+            "llm_ms": (finished - started) * 1000,
+            "total_ms": (finished - item.pop("started")) * 1000,
+        })
+        if first_token:
+            item["first_token_ms"] = (first_token[0] - started) * 1000
+        del item["ready"]
+        return item
+
+    async def _llm_worker(self, server, index, ready: asyncio.Queue, out):
+        while True:
+            item = await ready.get()
+            if item is None:
+                return
+            record = await self._answer(server, index, item)
+            for name in TIMINGS:
+                if name in record:
+                    self.timings[name].add(record[name])
+                    record[name] = round(record[name], 1)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            self.done += 1
+
+    async def run(self, items, out):
+        pending = asyncio.Queue()
+        for item in items:
+            pending.put_nowait(item)
+        llm_workers = len(self.servers) * self.depth
+        ready = asyncio.Queue(maxsize=llm_workers * 2)
+
+        consumers = [asyncio.ensure_future(self._llm_worker(server, index, ready, out))
+                     for index, server in enumerate(self.servers) for _ in range(self.depth)]
+        await asyncio.gather(*(self._search_worker(pending, ready)
+                               for _ in range(max(1, self.search_concurrency))))
+        for _ in range(llm_workers):
+            await ready.put(None)
+        await asyncio.gather(*consumers)
+        await self.web_tool.close()
+
+
+def start_servers(args):
+    """Start one LLM process per core set, in parallel (each loads its own model)"""
+    sets, threads = core_sets(args.instances, args.threads)
+    servers = [LLMServer(args.model, cpus=cpus, model_kwargs={"n_threads": threads}) for cpus in sets]
+    print(f"🧠 Starting {len(servers)} LLM instance(s), {threads} thread(s) each...")
+    with ThreadPoolExecutor(max_workers=len(servers)) as pool:
+        list(pool.map(lambda s: s.start(), servers))
+    for i, server in enumerate(servers):
+        print(f"   #{i}: cores {server.cpus if server.cpus else 'any'}")
+    return servers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions without audio")
+    parser.add_argument("questions", help="JSONL file with one {\"question\": ...} per line")
+    parser.add_argument("-o", "--output", default="answers.jsonl")
+    parser.add_argument("--instances", type=int, default=1, help="LLM processes, each on its own cores")
+    parser.add_argument("--threads", type=int, help="llama.cpp threads per instance (default: cores / instances)")
+    parser.add_argument("--depth", type=int, default=2, help="requests queued per instance")
+    parser.add_argument("--search-concurrency", type=int, default=8)
+    parser.add_argument("--search-url", help="default: settings.SEARCH_URL")
+    parser.add_argument("--no-search", action="store_true", help="answer everything offline")
+    parser.add_argument("--model", default="core.llm:PocketLLM", help="model factory, module:Class")
+    parser.add_argument("--limit", type=int, help="only the first N questions")
+    settings.add_arguments(parser)
+    args = parser.parse_args()
+    if not settings.apply_args(args):
+        return 0
+
+    items = load_questions(args.questions, args.limit)
+    if not items:
+        print("No questions to answer.")
+        return 1
+
+    servers = start_servers(args)
+    try:
+        if not all(s.model_loaded for s in servers):
+            print("❌ LLM not loaded. Please run download_models.py first.")
+            return 1
+
+        runner = BatchRunner(servers, AsyncWebSearchTool(search_url=args.search_url),
+                             IntentRouter.from_config(), search_concurrency=args.search_concurrency,
+                             depth=args.depth, search=not args.no_search)
+        print(f"📝 {len(items)} questions -> {args.output}")
+        started = time.monotonic()
+        with open(args.output, "w", encoding="utf-8") as out:
+            asyncio.run(runner.run(items, out))
+        elapsed = time.monotonic() - started
+        stats = [s.stats() for s in servers]
+    finally:
+        for server in servers:
+            server.stop()
+
+    print(f"\n📊 {runner.done} answered in {elapsed:.1f}s: {runner.done / elapsed * 60:.1f} questions/min"
+          f" ({runner.errors} errors)")
+    print(f"\n{'ms':<16}{'n':>7}{'p50':>9}{'p95':>9}{'mean':>9}")
+    for name in TIMINGS:
+        s = runner.timings[name].summary()
+        if s["count"]:
+            print(f"{name:<16}{s['count']:>7}{s['p50']:>9.0f}{s['p95']:>9.0f}{s['mean']:>9.0f}")
+    for i, s in enumerate(stats):
+        print(f"🧠 #{i}: {s['completed']} done, {s['utilisation'] * 100:.0f}% busy")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
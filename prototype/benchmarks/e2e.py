@@ -0,0 +1,281 @@
+"""
+End-to-end latency and throughput benchmark.
+
+Replays each case in cases.json (a WAV fixture or a synthetic speech
+pattern) through FullStreamingAssistant: VAD -> endpoint -> STT -> route ->
+search -> LLM -> TTS. Search goes to a local HTTP stand-in and TTS to the
+null backend. Models are stubbed unless --real is given.
+
+Per case it reports:
+    - endpoint_to_first_audio_ms: VAD endpoint until the first TTS audio
+    - endpoint_to_stt_ms, endpoint_to_first_token_ms
+    - rtf.<stage>: processing seconds per second of input audio
+    - cpu_util (process + children CPU / wall time) and rss_mb
+
+Results are compared against baseline.json; a metric more than --tolerance
+worse than its baseline is a regression (exit code 1).
+
+Usage (from prototype/):
+    python benchmarks/e2e.py [--real] [--realtime] [--repeat 3]
+    python benchmarks/e2e.py --save-baseline
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from config import settings
+
+# Quiet, deterministic runs: no callback report per case, no TTS pre-warm
+settings.AUDIO_PROFILE_ENABLED = False
+settings.TTS_PREWARM = False
+# Keep the checked-in input.wav untouched
+settings.UTTERANCE_WAV_PATH = os.path.join(tempfile.mkdtemp(prefix="pm-bench-"), "input.wav")
+
+from core import tracing
+from core.audio_source import ReplaySource, SyntheticSource
+from core.state_machine import State
+from core.tts import TTSEngine, NullBackend, NullPlayer
+from tools.web_search import AsyncWebSearchTool
+from main import FullStreamingAssistant
+from search_server import LocalSearchServer
+from stubs import EnergyVAD, ScriptedSTT, ScriptedLLM
+
+CASES = os.path.join(BENCH_DIR, "cases.json")
+BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+# Spans that make up each stage's processing time
+STAGE_SPANS = {
+    "vad": ["vad.frame"],
+    "stt": ["stt.transcribe", "stt.partial"],
+    "llm": ["llm.generate", "llm.generate_grounded", "llm.decide"],
+    "search": ["search.context"],
+    "tts": ["tts.synthesize"],
+}
+
+# Differences smaller than these never count as regressions (timer noise)
+ABSOLUTE_SLACK = {"ms": 10.0, "rtf": 0.01, "cpu_util": 0.05, "rss_mb": 20.0}
+
+
+class BenchTracer(tracing.Tracer):
+    """Tracer that also hands each finished turn to the benchmark."""
+
+    def __init__(self):
+        super().__init__(path=None)
+        self._turn = None
+        self._finished = threading.Event()
+
+    def finish_turn(self, turn, **fields):
+        super().finish_turn(turn, **fields)
+        self._turn = turn
+        self._finished.set()
+
+    def wait_turn(self, timeout):
+        if not self._finished.wait(timeout):
+            return None
+        self._finished.clear()
+        return self._turn
+
+    def span_totals(self):
+        return {name: s["total"] for name, s in self.summary().items()}
+
+
+def make_source(case, realtime):
+    blocksize = int(16000 * 30 / 1000)
+    # Trailing silence beyond the assistant's 1.5 s endpoint threshold
+    pad = 2.0
+    if "pattern" in case:
+        return SyntheticSource([tuple(p) for p in case["pattern"]], blocksize=blocksize,
+                               realtime=realtime, pad_seconds=pad)
+    return ReplaySource(os.path.join(BENCH_DIR, case["wav"]), blocksize=blocksize,
+                        realtime=realtime, pad_seconds=pad)
+
+
+def cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        # Peak RSS; KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def run_case(assistant, tracer, case, args):
+    source = make_source(case, args.realtime)
+    audio_seconds = source.duration
+    stt = assistant.memory.models["stt"].load()   # the model behind the governor's proxy
+    if isinstance(stt, ScriptedSTT):
+        stt.transcript = case["transcript"]
+
+    spans_before = tracer.span_totals()
+    cpu_before = cpu_seconds()
+    started = time.monotonic()
+
+    assistant.audio_stream.source = source
+    assistant.audio_stream.start()
+    turn = tracer.wait_turn(args.timeout)
+    wall = time.monotonic() - started
+    assistant.audio_stream.stop()
+
+    # Let the turn finish resetting before the next case starts
+    deadline = time.monotonic() + 5.0
+    while assistant.state_machine.state != State.LISTENING and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    if turn is None:
+        print(f"⚠️ {case['name']}: no turn finished within {args.timeout}s")
+        return None
+
+    marks = turn.marks
+    endpoint = marks["vad_endpoint"]
+    metrics = {}
+    for name, key in [("first_audio", "endpoint_to_first_audio_ms"),
+                      ("stt_done", "endpoint_to_stt_ms"),
+                      ("first_token", "endpoint_to_first_token_ms")]:
+        if name in marks:
+            metrics[key] = (marks[name] - endpoint) * 1000
+
+    spans_after = tracer.span_totals()
+    for stage, names in STAGE_SPANS.items():
+        busy_ms = sum(spans_after.get(n, 0.0) - spans_before.get(n, 0.0) for n in names)
+        metrics[f"rtf.{stage}"] = busy_ms / 1000 / audio_seconds
+
+    metrics["cpu_util"] = (cpu_seconds() - cpu_before) / wall
+    metrics["rss_mb"] = rss_mb()
+    metrics["intent"] = turn.route["intent"] if turn.route else None
+    return metrics
+
+
+def aggregate(runs):
+    """Median of each numeric metric over repeated runs."""
+    runs = [r for r in runs if r]
+    if not runs:
+        return None
+    result = {}
+    for key in runs[0]:
+        values = [r[key] for r in runs if key in r]
+        result[key] = statistics.median(values) if isinstance(values[0], (int, float)) else values[0]
+    return result
+
+
+def slack_for(metric):
+    if metric.endswith("_ms"):
+        return ABSOLUTE_SLACK["ms"]
+    if metric.startswith("rtf."):
+        return ABSOLUTE_SLACK["rtf"]
+    return ABSOLUTE_SLACK.get(metric, 0.0)
+
+
+def compare(results, baseline, tolerance):
+    """Print a comparison table; returns the list of regressions."""
+    regressions = []
+    print(f"\n{'case':<20}{'metric':<30}{'baseline':>10}{'now':>10}{'change':>9}")
+    for case, metrics in results.items():
+        base = baseline.get(case, {})
+        for metric, value in metrics.items():
+            if not isinstance(value, (int, float)):
+                continue
+            old = base.get(metric)
+            if not isinstance(old, (int, float)):
+                print(f"{case:<20}{metric:<30}{'-':>10}{value:>10.3f}")
+                continue
+            change = (value - old) / old * 100 if old else 0.0
+            regressed = value > old * (1 + tolerance) + slack_for(metric)
+            flag = "  ❌" if regressed else ""
+            print(f"{case:<20}{metric:<30}{old:>10.3f}{value:>10.3f}{change:>8.0f}%{flag}")
+            if regressed:
+                regressions.append((case, metric, old, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PocketMindly end-to-end benchmark")
+    parser.add_argument("--cases", default=CASES)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--real", action="store_true", help="use the real VAD/STT/LLM models")
+    parser.add_argument("--realtime", action="store_true", help="replay audio at real-time pace")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="seconds per local search request")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="also write results JSON here")
+    args = parser.parse_args()
+
+    with open(args.cases, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+
+    server = LocalSearchServer(latency=args.search_latency).start()
+    tracer = BenchTracer()
+    tracing.set_tracer(tracer)
+
+    if args.real:
+        vad = stt = llm = None
+    else:
+        vad, stt, llm = EnergyVAD(), ScriptedSTT(), ScriptedLLM()
+
+    assistant = FullStreamingAssistant(
+        audio_source=make_source(cases[0], args.realtime),
+        vad=vad, stt=stt, llm=llm,
+        web_tool=AsyncWebSearchTool(search_url=server.url),
+        tts=TTSEngine(backend=NullBackend(), player=NullPlayer())
+    )
+    assistant.pipeline.start()
+    assistant.state_machine.transition(State.LISTENING)
+
+    results = {}
+    try:
+        for case in cases:
+            runs = [run_case(assistant, tracer, case, args) for _ in range(args.repeat)]
+            results[case["name"]] = aggregate(runs)
+    finally:
+        assistant.shutdown()
+        server.stop()
+
+    results = {name: metrics for name, metrics in results.items() if metrics}
+    mode = "real" if args.real else "stub"
+    print(f"\n📊 {len(results)} cases, {args.repeat} runs each ({mode} models, "
+          f"{'real-time' if args.realtime else 'fast'} replay)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"💾 Baseline written to {args.baseline}")
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance * 100:.0f}%")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
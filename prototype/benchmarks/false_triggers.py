@@ -0,0 +1,127 @@
+"""
+False-trigger rejection by the turn gate.
+
+Replays the speech fixtures and some synthetic non-speech triggers (a cough,
+a door slam, TV chatter through a wall) through AudioStream (with the DSP
+front-end) -> Endpointer -> TurnGate, and reports per clip:
+    - utterances: how many times the VAD started and ended a turn
+    - rejected: how many the gate dropped before STT, and why
+    - stt_s_saved: seconds of audio Whisper never had to decode
+Speech should never be rejected; the triggers should be.
+Uses SileroVAD when its model is downloaded, else the energy VAD stand-in
+(which scores any loud noise as speech, so it is the harder case here).
+
+Usage (from prototype/):
+    python benchmarks/false_triggers.py [--vad energy]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from config import settings
+
+settings.AUDIO_PROFILE_ENABLED = False
+
+from core.audio_source import ReplaySource
+from core.audio_stream import AudioStream
+from core.dsp import DSPChain
+from core.endpointer import Endpointer
+from core.turn_gate import TurnGate
+from vad_onset import FIXTURES, load, make_vad
+
+RATE = settings.SAMPLE_RATE
+NOISE_LEVEL = 0.0005
+
+
+def decaying_noise(seconds: float, level: float, decay_s: float, rng) -> np.ndarray:
+    t = np.arange(int(seconds * RATE)) / RATE
+    return rng.normal(0.0, level, len(t)) * np.exp(-t / decay_s)
+
+
+def triggers() -> dict:
+    """Non-speech sounds that open the VAD"""
+    rng = np.random.default_rng(0)
+    cough = decaying_noise(0.25, 0.3, 0.08, rng)
+    # The impact, then the room ringing (RT60 ~0.4 s)
+    slam = np.concatenate([decaying_noise(0.02, 0.9, 0.01, rng), decaying_noise(0.4, 0.05, 0.06, rng)])
+    # Muffled bursts of sound, 60 ms on in every 300 ms, for 3 s
+    tv = np.concatenate([np.concatenate([rng.normal(0.0, 0.03, int(0.06 * RATE)),
+                                         np.zeros(int(0.24 * RATE))]) for _ in range(10)])
+    return {"cough": cough, "door_slam": slam, "tv": tv}
+
+
+def with_room(audio: np.ndarray) -> np.ndarray:
+    """Half a second of room noise before, and enough after for the endpoint"""
+    rng = np.random.default_rng(1)
+    pad = lambda s: rng.normal(0.0, NOISE_LEVEL, int(s * RATE))
+    return np.concatenate([pad(0.5), audio, pad(settings.SILENCE_THRESHOLD + 0.5)]).astype(np.float32)
+
+
+def run(signal: np.ndarray, vad, gate: TurnGate):
+    """Utterances endpointed in the signal, and how many the gate rejected"""
+    source = ReplaySource(signal, sample_rate=RATE, realtime=False,
+                          blocksize=RATE * settings.FRAME_MS // 1000)
+    dsp = DSPChain.from_settings(RATE, settings.FRAME_MS)
+    stream = AudioStream(RATE, settings.FRAME_MS, profile=False, source=source, dsp=dsp)
+    endpointer = Endpointer(vad, RATE, settings.SILENCE_THRESHOLD, settings.VAD_THRESHOLD)
+    endpointer.reset()
+    counts = {"utterances": 0, "rejected": 0, "reasons": []}
+
+    def on_frame(frame):
+        result = endpointer.process(frame)
+        if result["event"] == "speech_end":
+            counts["utterances"] += 1
+            reason = gate.check_audio(result["stats"])
+            if reason:
+                counts["rejected"] += 1
+                counts["reasons"].append(reason)
+            endpointer.reset()
+
+    stream.subscribe(on_frame)
+    stream.start()
+    stream.wait_finished()
+    stream.stop()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="False-trigger rejection by the turn gate")
+    parser.add_argument("--vad", choices=["auto", "silero", "energy"], default="auto")
+    args = parser.parse_args()
+
+    vad, vad_name = make_vad(args.vad)
+    print(f"🚪 {vad_name} VAD; gate: speech >= {settings.GATE_MIN_SPEECH_SECONDS}s, "
+          f"voiced >= {settings.GATE_MIN_VOICED_RATIO:.0%}, "
+          f"mean VAD probability >= {settings.GATE_MIN_VAD_PROBABILITY}\n")
+
+    clips = {name: ("speech", load(fixture)) for name, fixture in FIXTURES.items()}
+    clips.update({name: ("trigger", audio) for name, audio in triggers().items()})
+
+    print(f"{'clip':<13}{'kind':<9}{'utterances':>11}{'rejected':>10}{'stt_s_saved':>13}  reasons")
+    wrong = 0
+    total = TurnGate.from_settings()
+    for name, (kind, audio) in clips.items():
+        gate = TurnGate.from_settings()
+        counts = run(with_room(audio), vad, gate)
+        for key in ("utterances", "rejected_before_stt", "stt_seconds_saved"):
+            setattr(total, key, getattr(total, key) + getattr(gate, key))
+        total.reasons.update(gate.reasons)
+        # Speech must get through; a trigger must not (or never open the VAD at all)
+        kept = counts["utterances"] - counts["rejected"]
+        wrong += (kind == "speech" and kept == 0) or (kind == "trigger" and kept > 0)
+        print(f"{name:<13}{kind:<9}{counts['utterances']:>11}{counts['rejected']:>10}"
+              f"{gate.stt_seconds_saved:>13.2f}  {'; '.join(counts['reasons'])}")
+
+    print("\n" + total.report())
+    print("✅ Every clip gated as expected" if not wrong else f"⚠️ {wrong} clip(s) gated wrongly")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Local stand-in for DuckDuckGo's HTML endpoint and the pages it links to,
+so search-path benchmarks don't depend on the network.
+"""
+
+import asyncio
+import threading
+
+from aiohttp import web
+
+_PAGE_TEXT = (
+    "This is a locally served page used by the PocketMindly benchmarks. "
+    "It stands in for a news article or encyclopedia entry and is long enough "
+    "to pass the page-length filter in the web search tool. "
+) * 8
+
+
+class LocalSearchServer:
+    """Serves /html/?q=... results and /page/<n> pages on 127.0.0.1 with a fixed latency."""
+
+    def __init__(self, latency: float = 0.05, results: int = 3):
+        self.latency = latency
+        self.results = results
+        self.port = None
+        self.requests = 0
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Search URL template for AsyncWebSearchTool(search_url=...)"""
+        return f"http://127.0.0.1:{self.port}/html/?q={{query}}"
+
+    async def _results(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        query = request.query.get("q", "")
+        items = "".join(
+            f'<div class="result"><a class="result__a" href="http://127.0.0.1:{self.port}/page/{i}">'
+            f'Result {i} for {query}</a><a class="result__snippet">Snippet {i} about {query}.</a></div>'
+            for i in range(self.results)
+        )
+        return web.Response(text=f"<html><body>{items}</body></html>", content_type="text/html")
+
+    async def _page(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        n = request.match_info["n"]
+        return web.Response(text=f"<html><body><h1>Page {n}</h1><p>{_PAGE_TEXT}</p></body></html>",
+                            content_type="text/html")
+
+    def start(self):
+        started = threading.Event()
+
+        async def serve():
+            app = web.Application()
+            app.router.add_get("/html/", self._results)
+            app.router.add_get("/page/{n}", self._page)
+            self._runner = web.AppRunner(app, access_log=None)
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, "127.0.0.1", 0)
+            await site.start()
+            self.port = self._runner.addresses[0][1]
+            started.set()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(serve())
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="search-server", daemon=True)
+        self._thread.start()
+        started.wait(5.0)
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(5.0)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2.0)
+        self._loop = None
@@ -0,0 +1,124 @@
+"""
+Fast, deterministic stand-ins for the models, with the same interfaces as
+SileroVAD, PocketSTT and PocketLLM. They sleep for a configurable cost so
+the pipeline around them is measured, not the models.
+"""
+
+import threading
+import time
+
+import numpy as np
+import scipy.io.wavfile as wav
+
+from core import tracing
+from core.turn_gate import confident_text, segment_is_confident
+
+
+class EnergyVAD:
+    """RMS-threshold VAD with SileroVAD's process_frame() contract."""
+
+    def __init__(self, speech_rms: float = 0.004):
+        self.speech_rms = speech_rms
+        self._was_speech = False
+
+    def process_frame(self, audio_frame, threshold=0.5):
+        with tracing.tracer.span("vad.frame"):
+            rms = float(np.sqrt(np.mean(audio_frame * audio_frame)))
+            # threshold 0.5 <=> rms > speech_rms
+            prob = min(1.0, rms / (2 * self.speech_rms))
+            is_speech_now = prob > threshold
+
+        event = None
+        if is_speech_now and not self._was_speech:
+            event = 'speech_start'
+        elif not is_speech_now and self._was_speech:
+            event = 'speech_end'
+        self._was_speech = is_speech_now
+
+        return {'probability': prob, 'is_speech': is_speech_now, 'event': event}
+
+    def reset_for_new_utterance(self):
+        self._was_speech = False
+
+    def fork(self):
+        return EnergyVAD(self.speech_rms)
+
+
+class ScriptedSTT:
+    """
+    Returns the transcript set for the current case after rtf * audio seconds,
+    as one segment with the set no_speech_prob (raise it to script a hallucination).
+    """
+
+    def __init__(self, rtf: float = 0.1):
+        self.rtf = rtf
+        self.transcript = ""
+        self.no_speech_prob = 0.0
+
+    def transcribe(self, audio_file):
+        return self.transcribe_detailed(audio_file)['text']
+
+    def transcribe_detailed(self, audio_file):
+        with tracing.tracer.span("stt.transcribe"):
+            if isinstance(audio_file, str):
+                sample_rate, audio = wav.read(audio_file)
+            else:
+                sample_rate, audio = 16000, audio_file
+            seconds = len(audio) / sample_rate
+            time.sleep(seconds * self.rtf)
+            segments = [{'text': self.transcript, 'start': 0.0, 'end': seconds,
+                         'no_speech_prob': self.no_speech_prob, 'avg_logprob': -0.2}] if self.transcript else []
+            kept = [s for s in segments if segment_is_confident(s)]
+            return {'text': confident_text(kept), 'segments': segments, 'dropped': len(segments) - len(kept)}
+
+    def transcribe_stream(self, audio_buffer, sample_rate=16000):
+        with tracing.tracer.span("stt.partial"):
+            time.sleep(len(audio_buffer) / sample_rate * self.rtf)
+            return {'text': "", 'is_final': False}
+
+
+class ScriptedLLM:
+    """Streams a fixed answer at tokens_per_second after first_token_ms."""
+
+    llm = True
+
+    ANSWER = "That is a good question. Here is a short answer with a few words in it."
+    GROUNDED_ANSWER = "According to the search results, here is what I found. It is a short answer."
+
+    def __init__(self, first_token_ms: float = 150, tokens_per_second: float = 25, n_threads: int = None):
+        # n_threads is accepted (and ignored) so it can stand in for PocketLLM anywhere
+        self.first_token_ms = first_token_ms
+        self.tokens_per_second = tokens_per_second
+        self._lock = threading.Lock()
+
+    def _stream(self, answer, cancel_event, on_token):
+        with self._lock:
+            started = time.monotonic()
+            time.sleep(self.first_token_ms / 1000)
+            parts = []
+            for i, word in enumerate(answer.split()):
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                token = word if i == 0 else " " + word
+                if i == 0:
+                    tracing.tracer.record("llm.first_token", (time.monotonic() - started) * 1000)
+                else:
+                    time.sleep(1 / self.tokens_per_second)
+                parts.append(token)
+                if on_token is not None:
+                    on_token(token)
+            return "".join(parts)
+
+    def generate_response(self, user_text, cancel_event=None, on_token=None):
+        with tracing.tracer.span("llm.generate"):
+            return self._stream(self.ANSWER, cancel_event, on_token)
+
+    def generate_response_with_search(self, user_text, search_context, cancel_event=None, on_token=None):
+        with tracing.tracer.span("llm.generate_grounded"):
+            return self._stream(self.GROUNDED_ANSWER, cancel_event, on_token)
+
+    def decide_search(self, user_text):
+        return None
+
+    def check_search_intent(self, user_text):
+        return False
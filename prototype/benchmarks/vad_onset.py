@@ -0,0 +1,156 @@
+"""
+VAD onset with and without the DSP front-end.
+
+Replays each fixture twice in a row (two turns, so the second shows the AGC
+already adapted to the speaker) at several input levels, through
+AudioStream -> Endpointer, once with the DSP chain off and once with it on.
+Uses SileroVAD when its model is downloaded, else the energy VAD stand-in.
+
+Per fixture and level it reports, for each turn:
+    - onset_ms: stream position of 'speech_start' (- = never detected)
+    - end_ms: stream position of 'speech_end'
+and the DSP chain's per-stage cost.
+
+Usage (from prototype/):
+    python benchmarks/vad_onset.py [--levels 0,-15,-25] [--vad energy]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import scipy.io.wavfile as wav
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from config import settings
+
+settings.AUDIO_PROFILE_ENABLED = False
+
+from core.audio_source import ReplaySource, synthesize_pattern
+from core.audio_stream import AudioStream
+from core.dsp import DSPChain
+from core.endpointer import Endpointer
+from stubs import EnergyVAD
+
+FIXTURES = {
+    "utterance_a": os.path.join(BENCH_DIR, "fixtures", "utterance_a.wav"),
+    "utterance_b": os.path.join(BENCH_DIR, "fixtures", "utterance_b.wav"),
+    "synthetic": [("silence", 0.5), ("speech", 1.5)],
+}
+GAP_SECONDS = 2.0
+
+
+def load(fixture) -> np.ndarray:
+    if isinstance(fixture, str):
+        rate, audio = wav.read(fixture)
+        assert rate == settings.SAMPLE_RATE, f"{fixture}: expected {settings.SAMPLE_RATE} Hz"
+        return audio.astype(np.float32) / 32768.0
+    return synthesize_pattern(fixture, settings.SAMPLE_RATE)
+
+
+def two_turns(audio: np.ndarray, level_db: float):
+    """The utterance twice, each followed by a pause at its background noise level; and where each starts"""
+    frame = settings.SAMPLE_RATE * settings.FRAME_MS // 1000
+    frames = audio[:len(audio) // frame * frame].reshape(-1, frame)
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    noise = max(float(np.percentile(rms[rms > 0], 10)), 1e-4) if np.any(rms > 0) else 1e-4
+    gap = np.random.default_rng(0).normal(0.0, noise, int(GAP_SECONDS * settings.SAMPLE_RATE))
+    signal = np.concatenate([audio, gap, audio, gap]).astype(np.float32) * 10 ** (level_db / 20)
+    return signal, [0, len(audio) + len(gap)]
+
+
+def make_vad(kind: str):
+    if kind in ("auto", "silero") and os.path.exists(settings.VAD_MODEL_PATH):
+        from core.vad import SileroVAD
+        vad = SileroVAD()
+        if vad.session is not None:
+            return vad, "silero"
+    if kind == "silero":
+        raise SystemExit(f"❌ No Silero model at {settings.VAD_MODEL_PATH}")
+    return EnergyVAD(), "energy"
+
+
+def run(signal: np.ndarray, vad, dsp):
+    """Stream positions (ms) of each speech_start and speech_end"""
+    source = ReplaySource(signal, sample_rate=settings.SAMPLE_RATE, realtime=False, pad_seconds=0.5,
+                          blocksize=settings.SAMPLE_RATE * settings.FRAME_MS // 1000)
+    stream = AudioStream(settings.SAMPLE_RATE, settings.FRAME_MS, profile=False, source=source, dsp=dsp)
+    endpointer = Endpointer(vad, settings.SAMPLE_RATE, settings.SILENCE_THRESHOLD, settings.VAD_THRESHOLD)
+    endpointer.reset()
+    events = []
+    position = [0]
+
+    def on_frame(frame):
+        result = endpointer.process(frame)
+        position[0] += len(frame)
+        if result["event"]:
+            events.append((result["event"], position[0] / settings.SAMPLE_RATE * 1000))
+
+    stream.subscribe(on_frame)
+    stream.start()
+    stream.wait_finished()
+    stream.stop()
+    return events
+
+
+def per_turn(events, starts_ms):
+    """(onset_ms, end_ms) per turn, each relative to where that turn's audio starts"""
+    turns = []
+    for i, start in enumerate(starts_ms):
+        stop = starts_ms[i + 1] if i + 1 < len(starts_ms) else float("inf")
+        onsets = [t for e, t in events if e == "speech_start" and start <= t < stop]
+        ends = [t for e, t in events if e == "speech_end" and start <= t < stop + GAP_SECONDS * 1000]
+        turns.append((onsets[0] - start if onsets else None, ends[0] - start if ends else None))
+    return turns
+
+
+def fmt(ms):
+    return f"{ms:>8.0f}" if ms is not None else f"{'-':>8}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VAD onset timing with and without the DSP front-end")
+    parser.add_argument("--levels", default="0,-15,-25", help="input gain in dB, comma-separated")
+    parser.add_argument("--vad", choices=["auto", "silero", "energy"], default="auto")
+    args = parser.parse_args()
+    levels = [float(x) for x in args.levels.split(",")]
+
+    vad, vad_name = make_vad(args.vad)
+    chain = DSPChain.from_settings(settings.SAMPLE_RATE, settings.FRAME_MS)
+    if not chain:
+        raise SystemExit("❌ Every DSP stage is off in settings")
+    print(f"🎛️  {vad_name} VAD, DSP stages: {', '.join(s.name for s in chain.stages)}\n")
+
+    print(f"{'fixture':<13}{'level':>6}  {'turn':<5}{'onset off':>10}{'onset on':>10}{'delta':>8}"
+          f"{'end off':>10}{'end on':>10}")
+    deltas, detected, turns = [], {"off": 0, "on": 0}, 0
+    for name, fixture in FIXTURES.items():
+        audio = load(fixture)
+        for level in levels:
+            signal, starts = two_turns(audio, level)
+            starts_ms = [s / settings.SAMPLE_RATE * 1000 for s in starts]
+            off = per_turn(run(signal, vad, False), starts_ms)
+            on = per_turn(run(signal, vad, chain), starts_ms)
+            for turn, ((onset_off, end_off), (onset_on, end_on)) in enumerate(zip(off, on), 1):
+                delta = onset_on - onset_off if onset_on is not None and onset_off is not None else None
+                if delta is not None:
+                    deltas.append(delta)
+                turns += 1
+                detected["off"] += onset_off is not None
+                detected["on"] += onset_on is not None
+                print(f"{name:<13}{level:>6.0f}  {turn:<5}{fmt(onset_off):>10}{fmt(onset_on):>10}"
+                      f"{fmt(delta)}{fmt(end_off):>10}{fmt(end_on):>10}")
+
+    print(f"\nTurns detected: {detected['off']}/{turns} without DSP, {detected['on']}/{turns} with")
+    if deltas:
+        print(f"Onset with DSP: mean {np.mean(deltas):+.0f} ms, "
+              f"earlier in {sum(d < 0 for d in deltas)}/{len(deltas)} turns")
+    print(chain.report())
+
+
+if __name__ == "__main__":
+    main()
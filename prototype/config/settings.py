@@ -1,23 +1,377 @@
+import copy
+import json
 import os
+from typing import Dict, List, Optional, Set, Union, get_args, get_origin
+
+# Every setting is a typed module constant; components read settings.X when they
+# need it. Defaults below, then (see configure() at the end):
+#   tuned hardware profile -> named performance profile -> POCKETMINDLY_<NAME> env -> CLI
 
 # Base Paths
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MODELS_DIR = os.path.join(BASE_DIR, "models")
+BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR: str = os.path.join(BASE_DIR, "models")
 
 # Audio Settings
-AUDIO_SAMPLE_RATE = 44100
-AUDIO_CHANNELS = 1
-AUDIO_DTYPE = 'int16'
+# Capture at the device's own rate (None = its default, usually 44.1 or 48 kHz) and
+# resample to SAMPLE_RATE in-process; asking PortAudio for 16 kHz leaves it to the host
+AUDIO_CAPTURE_RATE: Optional[int] = None
+RESAMPLER_QUALITY: str = "balanced"       # fast | balanced | high (core/resampler.py)
+AUDIO_CHANNELS: int = 1
+AUDIO_DTYPE: str = 'int16'
+# What the VAD and Whisper consume
+SAMPLE_RATE: int = 16000
+FRAME_MS: int = 30                 # VAD block size
+SILENCE_THRESHOLD: float = 1.5     # seconds of silence that end an utterance
+PARTIAL_STT_INTERVAL: float = 1.0  # seconds of speech between partial decodes (search prefetch)
+
+# Front-end conditioning before the VAD (core/dsp.py), per frame; each stage optional
+DSP_DC_REMOVAL: bool = True
+DSP_HIGHPASS_HZ: Optional[float] = 80.0   # None = off; rumble, handling and fan noise
+DSP_AGC: bool = True
+DSP_AGC_TARGET_DBFS: float = -20.0
+DSP_AGC_MAX_GAIN_DB: float = 20.0
+DSP_AGC_ATTACK_MS: float = 20.0           # how fast the gain falls on loud input
+DSP_AGC_RELEASE_MS: float = 400.0         # how fast it rises on quiet speech
+
+# VAD Settings
+VAD_MODEL_PATH: str = os.path.join(MODELS_DIR, "onnx", "model.onnx")
+VAD_THRESHOLD: float = 0.5
 
 # STT Settings
-STT_MODEL_SIZE = "base.en"
-# Use absolute path or relative from execution context carefully. 
+STT_MODEL_SIZE: str = "base.en"
+# Use absolute path or relative from execution context carefully.
 # Here we point to the models dir we just defined.
-STT_MODEL_PATH = os.path.join(MODELS_DIR, "whisper-base.en")
-STT_COMPUTE_TYPE = "int8"
-STT_DEVICE = "cpu"
+STT_MODEL_PATH: str = os.path.join(MODELS_DIR, "whisper-base.en")
+STT_COMPUTE_TYPE: str = "int8"
+STT_DEVICE: str = "cpu"
+STT_BEAM_SIZE: int = 5
+STT_PARTIAL_BEAM_SIZE: int = 1
+# Whisper segments kept only when it believes them (core/turn_gate.py); replaces
+# the old exact-match list of hallucinations ("You", "Thank you.", "MBC")
+STT_NO_SPEECH_THRESHOLD: float = 0.6   # drop segments Whisper rates likelier silence than this
+STT_LOGPROB_THRESHOLD: float = -1.0    # drop segments decoded with a lower mean token log-prob
+
+# Turn Gate (core/turn_gate.py): reject false triggers (coughs, door slams, TV)
+# from the endpointer's stats before paying for Whisper, and low-confidence
+# transcripts before paying for the LLM
+GATE_ENABLED: bool = True
+GATE_MIN_SPEECH_SECONDS: float = 0.3     # voiced audio in the utterance (a short "yes" is ~0.35 s)
+GATE_MIN_VOICED_RATIO: float = 0.4       # voiced share of the utterance (trailing silence excluded)
+GATE_MIN_VAD_PROBABILITY: float = 0.6    # mean VAD probability of the voiced frames
 
 # LLM Settings
-LLM_MODEL_FILENAME = "gemma-2b-it.Q4_K_M.gguf"
-LLM_MODEL_PATH = os.path.join(MODELS_DIR, LLM_MODEL_FILENAME)
-LLM_CONTEXT_WINDOW = 2048
+LLM_MODEL_FILENAME: str = "gemma-2b-it.Q4_K_M.gguf"
+LLM_MODEL_PATH: str = os.path.join(MODELS_DIR, LLM_MODEL_FILENAME)
+LLM_CONTEXT_WINDOW: int = 2048
+LLM_MAX_TOKENS: int = 512
+LLM_TEMPERATURE: float = 0.6
+# Answers grounded in search results
+LLM_GROUNDED_MAX_TOKENS: int = 512
+LLM_GROUNDED_TEMPERATURE: float = 0.3
+# Token cap for the grammar-constrained search decision pass
+LLM_DECISION_MAX_TOKENS: int = 32
+# When to ask the LLM whether to search:
+#   "off"        - never, router only
+#   "borderline" - only when the router says 'borderline' and BORDERLINE_RACE is off
+#   "unmatched"  - whenever the router did not already pick search
+LLM_SEARCH_DECISION: str = "borderline"
+# Borderline intent: race the offline answer against search + grounded answer
+BORDERLINE_RACE: bool = True
+BORDERLINE_SEARCH_BUDGET: float = 2.0   # seconds the search gets before offline wins
+
+# Search Prefetch Settings
+SEARCH_PREFETCH_ENABLED: bool = True
+# Decode partial transcripts silently to start searches before speech ends
+# (costs a Whisper pass per second of speech, so off by default)
+SEARCH_PREFETCH_ON_PARTIALS: bool = False
+SEARCH_PREFETCH_RATE: float = 0.5   # sustained speculative searches per second
+SEARCH_PREFETCH_BURST: int = 2
+
+# Intent Router Settings
+# Phrase lists and the optional classifier are configured in JSON, not code
+ROUTER_CONFIG_PATH: str = os.environ.get(
+    "POCKETMINDLY_ROUTER_CONFIG",
+    os.path.join(BASE_DIR, "config", "router.json")
+)
+
+# TTS Settings
+TTS_BACKEND: str = "auto"   # "auto", "piper", "espeak", "say" or "null"
+TTS_VOICE: str = "en-us"
+TTS_RATE: int = 175         # words per minute
+TTS_PIPER_MODEL: str = os.path.join(MODELS_DIR, "piper", "en_US-lessac-medium.onnx")
+
+# TTS Cache Settings
+TTS_CACHE_ENABLED: bool = True
+TTS_CACHE_DIR: str = os.path.join(BASE_DIR, "cache", "tts")
+TTS_CACHE_MEMORY_MB: int = 32
+TTS_CACHE_DISK_MB: int = 256
+# Synthesise the canned replies (plus these) at startup
+TTS_PREWARM: bool = True
+TTS_PREWARM_PHRASES: List[str] = []
+
+# Barge-in Settings
+# Keep VAD running while speaking so the user can interrupt
+BARGE_IN_ENABLED: bool = True
+BARGE_IN_VAD_THRESHOLD: float = 0.85   # stricter than the normal 0.5 to ignore our own voice
+BARGE_IN_ECHO_RATIO: float = 0.5       # mic RMS must exceed this x current playback RMS
+BARGE_IN_CONFIRM_FRAMES: int = 6       # consecutive 30 ms frames (~180 ms) before cutting playback
+BARGE_IN_PREROLL_FRAMES: int = 15      # frames kept as the start of the interrupting utterance
+
+# Pipeline Settings
+# Queue bounds between stages (capture -> VAD/endpoint -> STT -> route -> search -> LLM -> TTS)
+PIPELINE_FRAME_QUEUE: int = 64   # capture -> VAD, in 30 ms frames (~2 s of slack)
+PIPELINE_TURN_QUEUE: int = 2     # between later stages, in turns
+# Executor threads per stage. VAD and LLM must stay at 1 (sequential model state).
+PIPELINE_WORKERS: Dict[str, int] = {"vad": 1, "stt": 1, "route": 1, "search": 2, "llm": 1, "tts": 1}
+
+# LLM Server Settings
+# Host the GGUF model in its own process (prioritised queue, cancellable between tokens)
+LLM_OUT_OF_PROCESS: bool = True
+LLM_SERVER_START_TIMEOUT: float = 120  # seconds to wait for the model to load
+
+# Tracing Settings
+# Per-turn latency marks as JSON lines plus rolling p50/p95/p99 (POCKETMINDLY_TRACE=1 to enable)
+TRACE_ENABLED: bool = os.environ.get("POCKETMINDLY_TRACE", "0") == "1"
+TRACE_PATH: str = os.environ.get("POCKETMINDLY_TRACE_PATH") or os.path.join(BASE_DIR, "logs", "trace.jsonl")
+TRACE_WINDOW: int = 500  # samples kept per histogram
+
+# Audio Callback Profiling
+AUDIO_PROFILE_ENABLED: bool = True            # durations, jitter, overflow counts (summary on shutdown)
+AUDIO_PROFILE_STACKS: bool = False            # sample the callback's stack when it runs over budget
+AUDIO_CALLBACK_BUDGET_MS: Optional[float] = None    # None = one frame (30 ms)
+
+# Web Search Settings
+SEARCH_URL: str = os.environ.get("POCKETMINDLY_SEARCH_URL", "https://html.duckduckgo.com/html/?q={query}")
+SEARCH_FETCH_TIMEOUT: float = 4.0       # seconds for the whole search + page fetches
+SEARCH_MAX_RESULTS: int = 5             # result links considered
+SEARCH_MAX_PAGES: int = 2               # pages whose text goes into the LLM context
+SEARCH_MAX_CHARS_PER_PAGE: int = 2000
+
+# Where the last utterance is written for final transcription
+UTTERANCE_WAV_PATH: str = "input.wav"
+
+# Capture Journal (core/journal.py): the last hours of input audio plus an index of
+# turns, VAD events and transcripts; scripts/replay_journal.py re-runs any turn
+JOURNAL_ENABLED: bool = False
+JOURNAL_DIR: str = os.path.join(BASE_DIR, "journal")
+JOURNAL_HOURS: float = 4.0          # 16 kHz int16: 115 MB per hour, allocated up front
+JOURNAL_MAX_PENDING: int = 1000     # frames queued for the writer before frames are dropped
+
+# Thread Budget (overridden by config/tuned_profile.json, see scripts/tune_hardware.py)
+VAD_THREADS: int = 1        # ONNX Runtime intra-op threads
+STT_CPU_THREADS: int = 0    # CTranslate2 threads (0 = its default)
+LLM_THREADS: int = 4        # llama.cpp threads
+LLM_BATCH: int = 512        # llama.cpp prompt-eval batch size
+
+# Startup Settings
+STARTUP_WARMUP: bool = True  # one VAD frame, a silent Whisper decode and a one-token LLM eval at startup
+
+# Memory Settings ("low-memory" profile: load STT/LLM on first speech, unload when idle)
+MEMORY_IDLE_TIMEOUTS: Dict[str, Optional[float]] = {"stt": None, "llm": None}   # seconds idle; None = never
+MEMORY_LAZY_LOAD: bool = False       # load STT/LLM when speech first starts instead of at startup
+MEMORY_CHECK_INTERVAL: float = 1.0   # seconds between idle checks
+# Memory-map the GGUF (reloads come from the page cache); mlock pins it in RAM
+LLM_USE_MMAP: bool = True
+LLM_USE_MLOCK: bool = False
+
+# Voice Server Settings (voice_server.py: many clients, one set of models)
+VOICE_SERVER_HOST: str = "0.0.0.0"
+VOICE_SERVER_PORT: int = 8765
+VOICE_SERVER_MAX_SESSIONS: int = 8    # admission control: concurrent clients
+VOICE_SERVER_MAX_BACKLOG: int = 16    # admission control: queued STT/LLM jobs before new clients are refused
+VOICE_SERVER_VAD_WORKERS: int = 2
+VOICE_SERVER_TTS: str = "auto"        # server-side TTS backend ("null" = text-only replies)
+VOICE_SERVER_TTS_WORKERS: int = 2
+
+# Tuned Runtime Profile
+# Written by scripts/tune_hardware.py; its "settings" replace the defaults above
+TUNED_PROFILE_PATH: str = os.environ.get("POCKETMINDLY_TUNED_PROFILE") or os.path.join(BASE_DIR, "config", "tuned_profile.json")
+TUNED_PROFILE = None
+
+# ---------- PROFILES ----------
+
+# Named trade-offs; combine with commas ("low-power,low-memory"), later ones win
+PROFILES: Dict[str, Dict[str, object]] = {
+    "default": {},
+    # Answer as soon as possible: greedy decoding, short replies, quick endpointing,
+    # one page of search context, searches started from partial transcripts
+    "low-latency": {
+        "SILENCE_THRESHOLD": 0.8,
+        "STT_BEAM_SIZE": 1,
+        "LLM_MAX_TOKENS": 160,
+        "LLM_GROUNDED_MAX_TOKENS": 160,
+        "SEARCH_FETCH_TIMEOUT": 2.5,
+        "SEARCH_MAX_RESULTS": 3,
+        "SEARCH_MAX_PAGES": 1,
+        "BORDERLINE_SEARCH_BUDGET": 1.2,
+        "SEARCH_PREFETCH_ON_PARTIALS": True,
+    },
+    # Fewer cores busy and no speculative work (batteries, fanless boxes)
+    "low-power": {
+        "VAD_THREADS": 1,
+        "STT_CPU_THREADS": 2,
+        "LLM_THREADS": 2,
+        "STT_BEAM_SIZE": 1,
+        "LLM_MAX_TOKENS": 200,
+        "LLM_GROUNDED_MAX_TOKENS": 200,
+        "LLM_SEARCH_DECISION": "off",
+        "BORDERLINE_RACE": False,
+        "SEARCH_PREFETCH_ENABLED": False,
+        "SEARCH_PREFETCH_ON_PARTIALS": False,
+        "SEARCH_MAX_PAGES": 1,
+        "RESAMPLER_QUALITY": "fast",
+    },
+    # Best transcripts and answers: wider beams, float Whisper, more search context
+    "accuracy": {
+        "STT_BEAM_SIZE": 8,
+        "STT_COMPUTE_TYPE": "float32",
+        "LLM_CONTEXT_WINDOW": 4096,
+        "LLM_TEMPERATURE": 0.4,
+        "LLM_MAX_TOKENS": 768,
+        "LLM_SEARCH_DECISION": "unmatched",
+        "SEARCH_FETCH_TIMEOUT": 6.0,
+        "SEARCH_MAX_RESULTS": 8,
+        "SEARCH_MAX_PAGES": 3,
+        "BORDERLINE_SEARCH_BUDGET": 3.0,
+        "RESAMPLER_QUALITY": "high",
+    },
+    # Small RAM: models load on first speech and unload when idle
+    "low-memory": {
+        "MEMORY_IDLE_TIMEOUTS": {"stt": 60, "llm": 120},
+        "MEMORY_LAZY_LOAD": True,
+        "STARTUP_WARMUP": False,
+        "TTS_PREWARM": False,
+        "TTS_CACHE_MEMORY_MB": 4,
+    },
+}
+PROFILE: str = os.environ.get("POCKETMINDLY_PROFILE", "default")
+
+_TYPES = {name: kind for name, kind in __annotations__.items() if name not in ("PROFILES", "PROFILE")}
+_DEFAULTS = copy.deepcopy({name: globals()[name] for name in _TYPES})
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off")
+
+
+def _coerce(name: str, value, source: str):
+    """Check a value against the setting's annotation; strings (env, CLI) are parsed"""
+    kind = _TYPES[name]
+    if get_origin(kind) is Union:
+        # Optional[X]
+        if value is None or (isinstance(value, str) and value.strip().lower() in ("none", "null")):
+            return None
+        kind = next(a for a in get_args(kind) if a is not type(None))
+    base = get_origin(kind) or kind
+
+    if isinstance(value, str) and base is not str:
+        text = value.strip()
+        try:
+            if base is bool:
+                if text.lower() not in _TRUE + _FALSE:
+                    raise ValueError(text)
+                value = text.lower() in _TRUE
+            elif base in (int, float):
+                value = base(text)
+            else:
+                value = json.loads(text)
+        except ValueError:
+            raise ValueError(f"{source}: {name} expects {kind}, got {value!r}") from None
+
+    if base is float and isinstance(value, int) and not isinstance(value, bool):
+        value = float(value)
+    if not isinstance(value, base) or (base is int and isinstance(value, bool)):
+        raise ValueError(f"{source}: {name} expects {kind}, got {value!r}")
+    return value
+
+
+def apply(overrides: Dict[str, object], source: str = "override") -> Set[str]:
+    """Set several settings at once, type-checked. Returns the names set."""
+    for name, value in overrides.items():
+        if name not in _TYPES:
+            raise ValueError(f"{source}: unknown setting {name}")
+        globals()[name] = _coerce(name, copy.deepcopy(value), source)
+    return set(overrides)
+
+
+def _load_tuned_profile(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring tuned profile {path}: {e}")
+        return None
+    return profile
+
+
+def configure(profile: Optional[str] = None, overrides: Optional[Dict[str, object]] = None):
+    """
+    Rebuild every setting: defaults, tuned profile, the named profile(s),
+    POCKETMINDLY_<NAME> environment variables, then explicit overrides (CLI).
+    """
+    global PROFILE, TUNED_PROFILE, LLM_MODEL_PATH
+    apply(_DEFAULTS, "defaults")
+    changed = set()
+
+    TUNED_PROFILE = _load_tuned_profile(TUNED_PROFILE_PATH)
+    if TUNED_PROFILE:
+        changed |= apply(TUNED_PROFILE.get("settings", {}), TUNED_PROFILE_PATH)
+
+    PROFILE = profile or PROFILE
+    for name in PROFILE.split(","):
+        name = name.strip()
+        if name not in PROFILES:
+            raise ValueError(f"Unknown profile '{name}' (choose from {', '.join(PROFILES)})")
+        changed |= apply(PROFILES[name], f"profile {name}")
+
+    changed |= apply({name: os.environ[f"POCKETMINDLY_{name}"] for name in _TYPES
+                      if f"POCKETMINDLY_{name}" in os.environ}, "environment")
+    changed |= apply(overrides or {}, "override")
+
+    # Derived from the (possibly overridden) filename, unless the path itself was set
+    if "LLM_MODEL_PATH" not in changed:
+        LLM_MODEL_PATH = os.path.join(MODELS_DIR, LLM_MODEL_FILENAME)
+
+
+def add_arguments(parser):
+    """--profile / --set / --show-settings for an entry point's argparse parser"""
+    parser.add_argument("--profile", help=f"performance profile(s): {', '.join(PROFILES)} (comma-separated)")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="override one setting (repeatable), e.g. --set STT_BEAM_SIZE=1")
+    parser.add_argument("--show-settings", action="store_true", help="print the effective settings and exit")
+
+
+def apply_args(args):
+    """Apply add_arguments() options. Returns False if --show-settings asked to exit."""
+    overrides = {}
+    for item in args.set:
+        name, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"--set expects NAME=VALUE, got {item!r}")
+        overrides[name.strip()] = value
+    try:
+        configure(args.profile, overrides)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    if args.show_settings:
+        print(describe())
+        return False
+    return True
+
+
+def snapshot() -> Dict[str, object]:
+    """Current values, for handing the same configuration to a child process"""
+    return copy.deepcopy({name: globals()[name] for name in _TYPES})
+
+
+def describe() -> str:
+    """Effective settings, marking the ones that differ from the defaults"""
+    lines = [f"# profile: {PROFILE}" + (f", tuned: {TUNED_PROFILE_PATH}" if TUNED_PROFILE else "")]
+    for name in _TYPES:
+        value = globals()[name]
+        changed = "  *" if value != _DEFAULTS[name] else ""
+        lines.append(f"{name} = {value!r}{changed}")
+    return "\n".join(lines)
+
+
+configure()
@@ -2,21 +2,23 @@ import sounddevice as sd
 import numpy as np
 import scipy.io.wavfile as wav
 import os
-import subprocess
 import threading
 import queue
 import sys
-import time
+from config import settings
+from core.audio_source import native_rate
+from core.resampler import resample
 
 # Audio configuration
-SAMPLE_RATE = 44100  # Changed to 44100 for better Mac compatibility
+# Captured at the device's own rate (for Mac compatibility), saved at the rate Whisper uses
+SAMPLE_RATE = settings.SAMPLE_RATE
 CHANNELS = 1
 DTYPE = 'int16'
 
 def record_audio(filename="input.wav"):
     """
     Records audio from the microphone until the user presses Enter.
-    Saves the audio to a WAV file.
+    Saves the audio to a WAV file at SAMPLE_RATE.
     """
     q = queue.Queue()
 
@@ -29,7 +31,8 @@ def record_audio(filename="input.wav"):
     print("\n🎙️ Listening... Press Enter to STOP.")
     
     # Start recording in a non-blocking stream
-    stream = sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, dtype=DTYPE, callback=callback)
+    capture_rate = settings.AUDIO_CAPTURE_RATE or native_rate(fallback=SAMPLE_RATE)
+    stream = sd.InputStream(samplerate=capture_rate, channels=CHANNELS, dtype=DTYPE, callback=callback)
     stream.start()
 
     # Wait for the user to press Enter to stop
@@ -49,7 +52,10 @@ def record_audio(filename="input.wav"):
         return False
 
     # Concatenate and save
-    recording = np.concatenate(audio_data, axis=0)
+    recording = np.concatenate(audio_data, axis=0)[:, 0]
+    if capture_rate != SAMPLE_RATE:
+        recording = resample(recording, capture_rate, SAMPLE_RATE)
+        recording = np.clip(recording, -32768, 32767).astype(np.int16)
     
     # Normalize Audio (Boost volume)
     max_val = np.max(np.abs(recording))
@@ -62,20 +68,26 @@ def record_audio(filename="input.wav"):
     wav.write(filename, SAMPLE_RATE, recording)
     return True
 
+_tts_engine = None
+
+def get_tts_engine():
+    """Shared TTS engine (backend chosen by settings.TTS_BACKEND)."""
+    global _tts_engine
+    if _tts_engine is None:
+        from core.tts import TTSEngine
+        _tts_engine = TTSEngine()
+    return _tts_engine
+
 def speak_text(text):
     """
-    Uses the system's TTS (macOS 'say' command) to speak the text.
+    Speaks the text with the configured TTS backend (espeak-ng, Piper, say).
+    Blocks until playback finishes.
     """
     try:
-        # Sanitize text for shell command (basic)
-        # Remove characters that might confuse the shell or 'say' command
-        safe_text = text.replace('"', '').replace("'", "").replace('`', '')
-        
-        # Using 'say' command on macOS
-        # -r 175 sets the rate (optional, can adjust)
-        subprocess.run(["say", safe_text], check=True)
-        # Small buffer to ensure audio device is free before recording again
-        time.sleep(0.5)
+        engine = get_tts_engine()
+        engine.begin_utterance()
+        engine.speak(text)
+        engine.wait()
     except Exception as e:
         print(f"Error in TTS: {e}")
 
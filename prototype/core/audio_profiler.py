@@ -0,0 +1,178 @@
+import bisect
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import List, Optional
+
+# Histogram bucket upper edges in ms (last bucket is everything above)
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 50, 100]
+
+
+class _Histogram:
+    """Fixed-bucket histogram; add() is one bisect and one increment (hot-path safe)."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0.0
+        self.max = 0.0
+        self.n = 0
+
+    def add(self, ms: float):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.total += ms
+        self.n += 1
+        if ms > self.max:
+            self.max = ms
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.n if self.n else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Upper edge of the bucket holding the p-th percentile."""
+        if not self.n:
+            return 0.0
+        target = p / 100 * self.n
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+
+class CallbackProfiler:
+    """
+    Instrumentation for the PortAudio callback.
+
+    Records callback durations, per-subscriber cost, inter-arrival jitter and
+    PortAudio overflow/underflow flags. With sample_stacks=True a watchdog
+    thread grabs the callback thread's stack whenever a callback runs past
+    its budget, so slow frames can be traced to the code responsible.
+    """
+
+    def __init__(self, frame_duration_ms: float, budget_ms: Optional[float] = None,
+                 sample_stacks: bool = False):
+        self.frame_duration_ms = frame_duration_ms
+        self.budget_ms = budget_ms or frame_duration_ms
+
+        self.durations = _Histogram()
+        self.jitter = _Histogram()
+        self._subscriber_names: List[str] = []
+        self._subscriber_cost: List[_Histogram] = []
+
+        self.callbacks = 0
+        self.overruns = 0
+        self.input_overflows = 0
+        self.input_underflows = 0
+        self._last_arrival = None
+
+        # Stack sampling (watchdog thread reads these)
+        self.stacks = Counter()
+        self._callback_start = None
+        self._callback_thread = None
+        self._sampled = False
+        self._watchdog = None
+        self._running = False
+        if sample_stacks:
+            self._running = True
+            self._watchdog = threading.Thread(target=self._watch, name="audio-profiler", daemon=True)
+            self._watchdog.start()
+
+    # ---------- HOT PATH ----------
+
+    def begin(self, status=None) -> float:
+        """Call first thing in the callback. Returns the start timestamp for end()."""
+        now = time.perf_counter()
+        if self._last_arrival is not None:
+            interval_ms = (now - self._last_arrival) * 1000
+            self.jitter.add(abs(interval_ms - self.frame_duration_ms))
+        self._last_arrival = now
+
+        if status:
+            if getattr(status, "input_overflow", False):
+                self.input_overflows += 1
+            if getattr(status, "input_underflow", False):
+                self.input_underflows += 1
+
+        self._callback_thread = threading.get_ident()
+        self._sampled = False
+        self._callback_start = now
+        return now
+
+    def subscriber_done(self, index: int, subscriber, started: float):
+        """Account the time one subscriber took (started = perf_counter() before the call)."""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        while index >= len(self._subscriber_cost):
+            self._subscriber_names.append(getattr(subscriber, "__qualname__", repr(subscriber)))
+            self._subscriber_cost.append(_Histogram())
+        self._subscriber_cost[index].add(elapsed_ms)
+
+    def end(self, started: float):
+        """Call last thing in the callback."""
+        self._callback_start = None
+        duration_ms = (time.perf_counter() - started) * 1000
+        self.durations.add(duration_ms)
+        self.callbacks += 1
+        if duration_ms > self.budget_ms:
+            self.overruns += 1
+
+    # ---------- STACK SAMPLING ----------
+
+    def _watch(self):
+        interval = self.budget_ms / 4000
+        while self._running:
+            time.sleep(interval)
+            started = self._callback_start
+            if started is None or self._sampled:
+                continue
+            if (time.perf_counter() - started) * 1000 <= self.budget_ms:
+                continue
+            frame = sys._current_frames().get(self._callback_thread)
+            if frame is None:
+                continue
+            # One sample per overrunning callback; innermost frames identify the culprit
+            stack = traceback.extract_stack(frame)[-8:]
+            self.stacks["\n".join(f"  {f.filename}:{f.lineno} {f.name}" for f in stack)] += 1
+            self._sampled = True
+
+    def stop(self):
+        self._running = False
+
+    # ---------- REPORT ----------
+
+    def summary(self) -> dict:
+        return {
+            "callbacks": self.callbacks,
+            "budget_ms": self.budget_ms,
+            "overruns": self.overruns,
+            "input_overflows": self.input_overflows,
+            "input_underflows": self.input_underflows,
+            "duration_ms": {"mean": self.durations.mean, "p50": self.durations.percentile(50),
+                            "p99": self.durations.percentile(99), "max": self.durations.max},
+            "jitter_ms": {"mean": self.jitter.mean, "p99": self.jitter.percentile(99), "max": self.jitter.max},
+            "subscribers": {name: {"mean_ms": h.mean, "max_ms": h.max}
+                            for name, h in zip(self._subscriber_names, self._subscriber_cost)},
+        }
+
+    def report(self) -> str:
+        s = self.summary()
+        d = s["duration_ms"]
+        j = s["jitter_ms"]
+        lines = [
+            f"🎚️  Audio callback: {s['callbacks']} calls, {s['overruns']} over the {s['budget_ms']:.0f} ms budget, "
+            f"{s['input_overflows']} overflows, {s['input_underflows']} underflows",
+            f"    duration mean {d['mean']:.3f} ms, p50 <= {d['p50']} ms, p99 <= {d['p99']} ms, max {d['max']:.2f} ms",
+            f"    jitter   mean {j['mean']:.2f} ms, p99 <= {j['p99']} ms, max {j['max']:.2f} ms",
+        ]
+        for name, cost in s["subscribers"].items():
+            lines.append(f"    {name}: mean {cost['mean_ms']:.3f} ms, max {cost['max_ms']:.2f} ms")
+
+        bars = " ".join(f"<={edge}:{count}" for edge, count in zip(BUCKETS_MS + ['inf'], self.durations.counts) if count)
+        lines.append(f"    histogram (ms) {bars}")
+
+        for stack, count in self.stacks.most_common(3):
+            lines.append(f"    slow callback stack (x{count}):\n{stack}")
+        return "\n".join(lines)
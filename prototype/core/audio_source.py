@@ -0,0 +1,220 @@
+import threading
+import time
+from typing import Callable, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Source callbacks follow the PortAudio (sounddevice) contract:
+#     callback(indata, frames, time_info, status)
+# where indata is an int16 array of shape (frames, 1).
+SourceCallback = Callable[[np.ndarray, int, object, object], None]
+
+
+class AudioSource:
+    """
+    Something that delivers fixed-size int16 mono blocks to a callback.
+    AudioStream works the same on top of every source.
+    """
+
+    # False when blocks arrive as fast as the consumer takes them
+    realtime = True
+
+    def __init__(self, sample_rate: int = 16000, blocksize: int = 480):
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+
+    def start(self, callback: SourceCallback):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the source runs out of audio. Live sources never do."""
+        return False
+
+    @property
+    def finished(self) -> bool:
+        return False
+
+
+def native_rate(device=None, fallback: int = 16000) -> int:
+    """The input device's default sample rate (what it captures without host resampling)"""
+    try:
+        import sounddevice as sd
+        return int(sd.query_devices(device, 'input')['default_samplerate'])
+    except Exception:
+        # No PortAudio or no such device: start() reports the real error
+        return fallback
+
+
+class MicrophoneSource(AudioSource):
+    """
+    The live microphone, through a sounddevice InputStream. Captures at the
+    device's native rate unless sample_rate is given; blocks are frame_ms long.
+    """
+
+    def __init__(self, sample_rate=None, blocksize=None, device=None, frame_ms: int = 30):
+        sample_rate = sample_rate or native_rate(device)
+        blocksize = blocksize or int(sample_rate * frame_ms / 1000)
+        super().__init__(sample_rate, blocksize)
+        self.device = device
+        self._stream = None
+
+    def start(self, callback):
+        # Imported here so headless sources work without PortAudio
+        import sounddevice as sd
+
+        self._stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            channels=1,
+            dtype='int16',
+            blocksize=self.blocksize,
+            device=self.device,
+            callback=callback
+        )
+        self._stream.start()
+
+    def stop(self):
+        if self._stream:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+def _to_int16(audio: np.ndarray) -> np.ndarray:
+    """Mono int16 from int16 or float ([-1, 1]) audio, mono or (n, channels)."""
+    audio = np.asarray(audio)
+    if audio.ndim == 2:
+        audio = audio.mean(axis=1) if audio.dtype.kind == 'f' else audio[:, 0]
+    if audio.dtype.kind == 'f':
+        audio = np.clip(audio, -1.0, 1.0) * 32767
+    return audio.astype(np.int16)
+
+
+class ReplaySource(AudioSource):
+    """
+    Replays a WAV file or NumPy array as if it came from the microphone.
+
+    realtime=True paces blocks at the sample rate (deadline-scheduled, so no
+    drift); realtime=False delivers them back to back, as fast as the
+    callback returns. pad_seconds of trailing silence lets an endpointer see
+    the end of the last utterance.
+    """
+
+    def __init__(self, audio, sample_rate=16000, blocksize=480, realtime=True,
+                 pad_seconds: float = 0.0, loop: bool = False):
+        super().__init__(sample_rate, blocksize)
+        self.realtime = realtime
+        self.loop = loop
+
+        if isinstance(audio, str):
+            import scipy.io.wavfile as wav
+            file_rate, audio = wav.read(audio)
+            audio = _to_int16(audio)
+            if file_rate != sample_rate:
+                # Same filter as live capture, so replays sound like the microphone path
+                from core.resampler import resample
+                audio = _to_int16(resample(audio.astype(np.float32) / 32768.0, file_rate, sample_rate))
+        else:
+            audio = _to_int16(audio)
+
+        pad = int(pad_seconds * sample_rate)
+        # Round up to whole blocks; the tail is zero-padded
+        total = len(audio) + pad
+        total += (-total) % blocksize
+        self.audio = np.zeros(total, dtype=np.int16)
+        self.audio[:len(audio)] = audio
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self.blocks_delivered = 0
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / self.sample_rate
+
+    def start(self, callback):
+        self._stop.clear()
+        self._done.clear()
+        self._thread = threading.Thread(target=self._run, args=(callback,), name="audio-replay", daemon=True)
+        self._thread.start()
+
+    def _run(self, callback):
+        block_seconds = self.blocksize / self.sample_rate
+        blocks = self.audio.reshape(-1, self.blocksize, 1)
+        started = time.monotonic()
+        n = 0
+        try:
+            while not self._stop.is_set():
+                for block in blocks:
+                    if self._stop.is_set():
+                        break
+                    if self.realtime:
+                        delay = started + n * block_seconds - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+                    callback(block, self.blocksize, None, None)
+                    n += 1
+                    self.blocks_delivered = n
+                if not self.loop:
+                    break
+        finally:
+            self._done.set()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+
+def synthesize_pattern(pattern: Sequence[Tuple[str, float]], sample_rate=16000,
+                       level: float = 0.3, noise_level: float = 0.002, seed: int = 0) -> np.ndarray:
+    """
+    Render a ("speech" | "silence", seconds) pattern to float32 audio.
+
+    "speech" is a voiced, speech-like signal: a harmonic series on a gliding
+    pitch, shaped by syllable-rate (~4 Hz) amplitude modulation. "silence"
+    is low-level noise. The same seed always gives the same samples.
+    """
+    rng = np.random.default_rng(seed)
+    parts = []
+    for kind, seconds in pattern:
+        n = int(seconds * sample_rate)
+        t = np.arange(n) / sample_rate
+        noise = rng.normal(0.0, noise_level, n)
+        if kind == "silence":
+            parts.append(noise)
+            continue
+        if kind != "speech":
+            raise ValueError(f"Unknown pattern segment: {kind}")
+
+        pitch = 120 + 30 * np.sin(2 * np.pi * 0.7 * t + rng.uniform(0, np.pi))
+        phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+        syllables = 0.55 + 0.45 * np.sin(2 * np.pi * 4.0 * t) ** 2
+        # Short fades avoid clicks at segment edges
+        fade = np.minimum(1.0, np.minimum(t, t[::-1] if n else t) / 0.02)
+        parts.append(level * voiced / np.max(np.abs(voiced) + 1e-9) * syllables * fade + noise)
+
+    if not parts:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(parts).astype(np.float32)
+
+
+class SyntheticSource(ReplaySource):
+    """Replays a generated speech/silence pattern, e.g. [("silence", 1), ("speech", 2), ("silence", 2)]."""
+
+    def __init__(self, pattern, sample_rate=16000, blocksize=480, realtime=False, seed: int = 0, **kwargs):
+        self.pattern = list(pattern)
+        audio = synthesize_pattern(self.pattern, sample_rate=sample_rate, seed=seed)
+        super().__init__(audio, sample_rate=sample_rate, blocksize=blocksize, realtime=realtime, **kwargs)
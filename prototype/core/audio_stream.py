@@ -1,22 +1,67 @@
-import sounddevice as sd
 import numpy as np
 import queue
 import threading
 import time
 from typing import Callable, Optional
+from config import settings
+from core.audio_profiler import CallbackProfiler
+from core.audio_source import AudioSource, MicrophoneSource
+from core.dsp import DSPChain
+from core.journal import AudioJournal
+from core.resampler import Resampler
 
 class AudioStream:
     """
-    Continuous audio streaming from microphone.
+    Continuous audio streaming from microphone (or any AudioSource).
     Feeds audio frames to multiple consumers (VAD, STT) simultaneously.
+
+    A source at another rate (the microphone captures at the device's own)
+    is resampled to sample_rate here and re-cut into frame-sized blocks.
+    Each frame then goes through the DSP front-end (DC removal, high-pass,
+    AGC) before the ring buffer and subscribers see it. With a journal, the
+    frames are recorded before the DSP, as a 16 kHz microphone would give them.
     """
     
-    def __init__(self, sample_rate=16000, frame_duration_ms=30):
+    def __init__(self, sample_rate=16000, frame_duration_ms=30, profile=None,
+                 source: Optional[AudioSource] = None, dsp=None, journal=None):
         self.sample_rate = sample_rate
         self.frame_duration_ms = frame_duration_ms
         self.frame_size = int(sample_rate * frame_duration_ms / 1000)  # samples per frame
         
-        self._stream = None
+        # Live microphone unless a replay/synthetic source is given
+        self.source = source or MicrophoneSource(settings.AUDIO_CAPTURE_RATE, frame_ms=frame_duration_ms)
+        self.resampler = None
+        if self.source.sample_rate != sample_rate:
+            self.resampler = Resampler(self.source.sample_rate, sample_rate, settings.RESAMPLER_QUALITY)
+        elif self.source.blocksize != self.frame_size:
+            raise ValueError("AudioSource at the stream's sample rate must deliver whole frames")
+        self._pending = np.zeros(0, dtype=np.float32)   # Resampled audio short of a frame
+        
+        # Front-end conditioning: from settings, off (False) or a given DSPChain
+        if dsp is None or dsp is True:
+            dsp = DSPChain.from_settings(sample_rate, frame_duration_ms)
+        self.dsp = dsp or None
+        
+        # Capture journal: from settings, off (False) or a given AudioJournal
+        if journal is None:
+            journal = settings.JOURNAL_ENABLED
+        if journal is True:
+            journal = AudioJournal(settings.JOURNAL_DIR, settings.JOURNAL_HOURS, sample_rate,
+                                   max_pending=settings.JOURNAL_MAX_PENDING)
+        self.journal = journal or None
+        
+        # Samples delivered so far (across restarts); subscribers read it for the current frame's end
+        self.position = 0
+        
+        # Callback timing (summary printed on stop)
+        if profile is None:
+            profile = settings.AUDIO_PROFILE_ENABLED
+        self.profiler = CallbackProfiler(
+            frame_duration_ms,
+            budget_ms=settings.AUDIO_CALLBACK_BUDGET_MS,
+            sample_stacks=settings.AUDIO_PROFILE_STACKS
+        ) if profile else None
+        
         self._running = False
         self._paused = False
         self._lock = threading.Lock()
@@ -43,37 +88,52 @@ class AudioStream:
         
         self._running = True
         
+        profiler = self.profiler
+        
         def audio_callback(indata, frames, time_info, status):
+            started = profiler.begin(status) if profiler else None
+            
             if status:
                 print(f"Audio status: {status}")
             
             # Convert to float32 mono
             audio = indata[:, 0].astype(np.float32) / 32768.0
             
-            # Update ring buffer
-            self._update_ring_buffer(audio)
-            
-            # Don't send to subscribers if paused
-            if self._paused:
-                return
+            for frame in self._frames(audio):
+                if self.journal:
+                    self.journal.write(frame)
+                self.position += len(frame)
+                if self.dsp:
+                    self.dsp.process(frame)
+                
+                # Update ring buffer
+                self._update_ring_buffer(frame)
+                
+                # Send to all subscribers (unless paused)
+                if not self._paused:
+                    for i, subscriber in enumerate(self._subscribers):
+                        sub_started = time.perf_counter()
+                        try:
+                            subscriber(frame.copy())
+                        except Exception as e:
+                            print(f"Error in subscriber: {e}")
+                        if profiler:
+                            profiler.subscriber_done(i, subscriber, sub_started)
             
-            # Send to all subscribers
-            for subscriber in self._subscribers:
-                try:
-                    subscriber(audio.copy())
-                except Exception as e:
-                    print(f"Error in subscriber: {e}")
-        
-        self._stream = sd.InputStream(
-            samplerate=self.sample_rate,
-            channels=1,
-            dtype='int16',
-            blocksize=self.frame_size,
-            callback=audio_callback
-        )
-        
-        self._stream.start()
-        print(f"🎤 Audio stream started ({self.sample_rate}Hz, {self.frame_duration_ms}ms frames)")
+            if profiler:
+                profiler.end(started)
+        
+        if self.resampler:
+            self.resampler.reset()
+            self._pending = np.zeros(0, dtype=np.float32)
+        if self.dsp:
+            self.dsp.reset()
+        
+        self.source.start(audio_callback)
+        rate = f"{self.sample_rate}Hz"
+        if self.resampler:
+            rate = f"{self.source.sample_rate}Hz -> {rate}, {self.resampler.quality} resampler"
+        print(f"🎤 Audio stream started ({rate}, {self.frame_duration_ms}ms frames, {type(self.source).__name__})")
     
     def stop(self):
         """Stop streaming"""
@@ -82,12 +142,32 @@ class AudioStream:
         
         self._running = False
         
-        if self._stream:
-            self._stream.stop()
-            self._stream.close()
-            self._stream = None
+        self.source.stop()
         
         print("🎤 Audio stream stopped")
+        
+        if self.profiler:
+            self.profiler.stop()
+            print(self.profiler.report())
+            if self.dsp:
+                print(self.dsp.report())
+    
+    def close(self):
+        """Stop streaming and finish writing the journal"""
+        self.stop()
+        if self.journal:
+            self.journal.close()
+            dropped = f", {self.journal.dropped} frames dropped" if self.journal.dropped else ""
+            print(f"📼 Journal: {self.journal.position / self.sample_rate:.0f}s recorded to {self.journal.directory}{dropped}")
+    
+    @property
+    def realtime(self) -> bool:
+        """False when the source runs as fast as subscribers consume frames"""
+        return self.source.realtime
+    
+    def wait_finished(self, timeout: Optional[float] = None) -> bool:
+        """Block until a replay source runs out of audio"""
+        return self.source.wait(timeout)
     
     def pause(self):
         """Pause sending frames to subscribers (for TTS playback)"""
@@ -107,6 +187,17 @@ class AudioStream:
             # Return last 500ms of audio
             return self._ring_buffer.copy()
     
+    def _frames(self, audio: np.ndarray):
+        """The frame_size blocks a source block yields (resampled if needed)"""
+        if self.resampler is None:
+            return [audio]
+        audio = self.resampler.process(audio)
+        if len(self._pending):
+            audio = np.concatenate((self._pending, audio))
+        whole = len(audio) - len(audio) % self.frame_size
+        self._pending = audio[whole:]
+        return np.split(audio[:whole], whole // self.frame_size) if whole else []
+    
     def _update_ring_buffer(self, audio: np.ndarray):
         """Update the ring buffer with new audio"""
         with self._lock:
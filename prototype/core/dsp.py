@@ -0,0 +1,232 @@
+import math
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from config import settings
+
+
+def level_dbfs(frame: np.ndarray) -> float:
+    """RMS level of a float frame, in dB relative to full scale"""
+    if not len(frame):
+        return -200.0
+    return 10 * math.log10(float(np.dot(frame, frame)) / len(frame) + 1e-20)
+
+
+# ---------- STAGES ----------
+# Each stage conditions one float32 frame in place, keeping its state between
+# frames, and has a name for the cost report.
+
+class DCBlocker:
+    """Subtracts a slowly tracked mean (microphone DC offset)"""
+
+    name = "dc"
+
+    def __init__(self, sample_rate: int = 16000, time_constant: float = 0.5):
+        self.sample_rate = sample_rate
+        self.time_constant = time_constant
+        self.reset()
+
+    def reset(self):
+        self.offset = 0.0
+
+    def process(self, frame: np.ndarray) -> np.ndarray:
+        alpha = 1.0 - math.exp(-len(frame) / (self.sample_rate * self.time_constant))
+        self.offset += alpha * (float(frame.mean()) - self.offset)
+        frame -= self.offset
+        return frame
+
+
+class HighPass:
+    """
+    Butterworth high-pass (rumble, handling and fan noise), state carried across frames.
+
+    sosfilt runs the O(n) recursion in C with the filter state (zi) kept
+    between frames. It returns a new array, which is copied back into the
+    frame, so the chain still filters in place.
+    """
+
+    name = "highpass"
+
+    def __init__(self, sample_rate: int = 16000, cutoff_hz: float = 80.0, order: int = 2):
+        from scipy.signal import butter, sosfilt, sosfilt_zi
+        self.cutoff_hz = cutoff_hz
+        self._sosfilt = sosfilt
+        self._sos = butter(order, cutoff_hz, btype="highpass", fs=sample_rate, output="sos")
+        self._zi_shape = sosfilt_zi(self._sos).shape
+        self._zi = np.zeros(self._zi_shape)
+
+    def reset(self):
+        self._zi = np.zeros(self._zi_shape)
+
+    def process(self, frame: np.ndarray) -> np.ndarray:
+        filtered, self._zi = self._sosfilt(self._sos, frame, zi=self._zi)
+        np.copyto(frame, filtered, casting="same_kind")
+        return frame
+
+
+class AGC:
+    """
+    Automatic gain control towards target_dbfs.
+
+    The gain moves at the attack rate when it has to fall (loud input) and
+    at the release rate when it has to rise (quiet speech). It only adapts on
+    frames well above the tracked noise floor and holds through pauses, so a
+    quiet speaker's next word starts already amplified. Boost is capped so
+    the amplified noise floor stays under NOISE_CEILING_DBFS (an energy VAD
+    would otherwise hear it as speech), and the gain is ramped across each frame and
+    limited to the frame's peak, so it never clicks or clips.
+    """
+
+    name = "agc"
+
+    NOISE_CEILING_DBFS = -55.0
+    SPEECH_ABOVE_FLOOR_DB = 10.0     # Frames this far above the floor count as speech
+    # The noise floor falls quickly (but not to a single odd frame), rises quickly
+    # through pauses and barely during speech, so a long sentence isn't taken for noise
+    FLOOR_FALL_DB_PER_S = 20.0
+    FLOOR_RISE_DB_PER_S = 10.0
+    FLOOR_CREEP_DB_PER_S = 1.0
+    DIGITAL_SILENCE_DBFS = -90.0     # Muted input / zero padding says nothing about the room
+
+    def __init__(self, sample_rate: int = 16000, target_dbfs: float = -20.0, max_gain_db: float = 20.0,
+                 attack_ms: float = 20.0, release_ms: float = 400.0):
+        self.sample_rate = sample_rate
+        self.target_dbfs = target_dbfs
+        self.max_gain_db = max_gain_db
+        self.attack_ms = attack_ms
+        self.release_ms = release_ms
+        self._ramp = self._scratch = np.zeros(0, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self.gain_db = 0.0
+        self.floor_db = None
+        self._applied = 1.0          # Linear gain at the end of the last frame
+        self.frame_gain = 1.0        # Mean linear gain applied to the last frame
+
+    def process(self, frame: np.ndarray) -> np.ndarray:
+        n = len(frame)
+        if n == 0:
+            return frame
+        if len(self._ramp) != n:
+            self._ramp = (np.arange(1, n + 1) / n).astype(np.float32)
+            self._scratch = np.empty(n, dtype=np.float32)
+        frame_ms = n / self.sample_rate * 1000
+
+        level = level_dbfs(frame)
+        if level > self.DIGITAL_SILENCE_DBFS:
+            if self.floor_db is None:
+                self.floor_db = level
+            if level < self.floor_db:
+                self.floor_db = max(level, self.floor_db - self.FLOOR_FALL_DB_PER_S * frame_ms / 1000)
+            else:
+                speech_like = level > self.floor_db + self.SPEECH_ABOVE_FLOOR_DB
+                rise = self.FLOOR_CREEP_DB_PER_S if speech_like else self.FLOOR_RISE_DB_PER_S
+                self.floor_db = min(level, self.floor_db + rise * frame_ms / 1000)
+        floor = self.floor_db if self.floor_db is not None else self.DIGITAL_SILENCE_DBFS
+
+        desired = self.target_dbfs - level if level > floor + self.SPEECH_ABOVE_FLOOR_DB else self.gain_db
+        # Never boosts noise above the ceiling, but never cuts because of it either
+        ceiling = min(self.max_gain_db, max(0.0, self.NOISE_CEILING_DBFS - floor))
+        desired = min(max(desired, -self.max_gain_db), ceiling)
+        time_ms = self.attack_ms if desired < self.gain_db else self.release_ms
+        self.gain_db = desired + math.exp(-frame_ms / time_ms) * (self.gain_db - desired)
+
+        gain = 10 ** (self.gain_db / 20)
+        peak = max(float(frame.max()), -float(frame.min()))
+        if peak * gain > 0.99:
+            gain = 0.99 / peak
+        # Ramp from the last frame's gain to this one's, without temporaries
+        np.multiply(self._ramp, gain - self._applied, out=self._scratch)
+        self._scratch += self._applied
+        frame *= self._scratch
+        self.frame_gain = self._applied + (gain - self._applied) * (n + 1) / (2 * n)
+        self._applied = gain
+        return frame
+
+
+# ---------- CHAIN ----------
+
+class DSPChain:
+    """
+    The front-end stages AudioStream runs on every frame before the VAD,
+    with the time each one takes.
+    """
+
+    def __init__(self, stages: List[object], frame_duration_ms: float = 30.0):
+        self.stages = list(stages)
+        self.frame_duration_ms = frame_duration_ms
+        self._cost = [0.0] * len(self.stages)
+        self._max = [0.0] * len(self.stages)
+        self.frames = 0
+
+    @classmethod
+    def from_settings(cls, sample_rate: int = 16000, frame_duration_ms: float = 30.0) -> "DSPChain":
+        stages = []
+        if settings.DSP_DC_REMOVAL:
+            stages.append(DCBlocker(sample_rate))
+        if settings.DSP_HIGHPASS_HZ:
+            stages.append(HighPass(sample_rate, settings.DSP_HIGHPASS_HZ))
+        if settings.DSP_AGC:
+            stages.append(AGC(sample_rate, settings.DSP_AGC_TARGET_DBFS, settings.DSP_AGC_MAX_GAIN_DB,
+                              settings.DSP_AGC_ATTACK_MS, settings.DSP_AGC_RELEASE_MS))
+        return cls(stages, frame_duration_ms)
+
+    def __bool__(self):
+        return bool(self.stages)
+
+    def __len__(self):
+        return len(self.stages)
+
+    def stage(self, name: str) -> Optional[object]:
+        return next((s for s in self.stages if s.name == name), None)
+
+    @property
+    def gain(self) -> float:
+        """Linear gain the AGC applied to the last frame (1.0 without one)"""
+        agc = self.stage("agc")
+        return agc.frame_gain if agc is not None else 1.0
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+    def process(self, frame: np.ndarray) -> np.ndarray:
+        """Condition a float32 frame in place"""
+        for i, stage in enumerate(self.stages):
+            started = time.perf_counter()
+            stage.process(frame)
+            elapsed = time.perf_counter() - started
+            self._cost[i] += elapsed
+            if elapsed > self._max[i]:
+                self._max[i] = elapsed
+        self.frames += 1
+        return frame
+
+    def stats(self) -> dict:
+        frames = max(1, self.frames)
+        audio_s = self.frames * self.frame_duration_ms / 1000
+        return {
+            "frames": self.frames,
+            "stages": {
+                stage.name: {
+                    "mean_us": self._cost[i] / frames * 1e6,
+                    "max_us": self._max[i] * 1e6,
+                    "cpu_pct": self._cost[i] / audio_s * 100 if audio_s else 0.0,
+                }
+                for i, stage in enumerate(self.stages)
+            },
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        total = sum(st["cpu_pct"] for st in s["stages"].values())
+        lines = [f"🎛️  DSP front-end: {s['frames']} frames, {total:.3f}% of real time"]
+        for name, st in s["stages"].items():
+            lines.append(f"    {name}: mean {st['mean_us']:.1f} µs, max {st['max_us']:.1f} µs per frame")
+        agc = self.stage("agc")
+        if agc is not None and agc.floor_db is not None:
+            lines.append(f"    agc gain now {agc.gain_db:+.1f} dB (noise floor {agc.floor_db:.0f} dBFS)")
+        return "\n".join(lines)
@@ -0,0 +1,112 @@
+import numpy as np
+
+
+class Endpointer:
+    """
+    Turns per-frame VAD decisions into whole utterances.
+
+    Recording starts on the VAD 'speech_start' event and ends after
+    silence_threshold seconds without speech. Silence is measured in samples,
+    not wall-clock time, so queued or replayed audio endpoints identically.
+
+    Each utterance also gets cheap acoustic stats (see utterance_stats()) that
+    the turn gate uses to drop coughs and bangs before they reach Whisper.
+    """
+
+    def __init__(self, vad, sample_rate: int = 16000, silence_threshold: float = 1.5,
+                 vad_threshold: float = 0.5):
+        self.vad = vad
+        self.sample_rate = sample_rate
+        self.silence_threshold = silence_threshold
+        self.vad_threshold = vad_threshold
+
+        self.recording = False
+        self.frames = []
+        self._silence_samples = 0
+        self._clear_stats()
+
+    @property
+    def recorded_seconds(self) -> float:
+        return sum(len(f) for f in self.frames) / self.sample_rate
+
+    def start(self, initial_frames=()):
+        """Begin recording, optionally seeded with audio captured earlier (barge-in)."""
+        self.recording = True
+        self.frames = list(initial_frames)
+        self._silence_samples = 0
+        self._clear_stats()
+        # Seeded frames were already judged to be speech (the barge-in confirmed them)
+        self._voiced_samples = sum(len(f) for f in self.frames)
+
+    def reset(self):
+        """Forget the current utterance and VAD state."""
+        self.vad.reset_for_new_utterance()
+        self.recording = False
+        self.frames = []
+        self._silence_samples = 0
+        self._clear_stats()
+
+    def _clear_stats(self):
+        self._voiced_samples = 0
+        self._voiced_frames = 0
+        self._probability_sum = 0.0
+
+    def utterance_stats(self) -> dict:
+        """
+        The current utterance, without its trailing silence:
+            - 'seconds': from the first frame to the last voiced one
+            - 'speech_seconds': voiced frames only
+            - 'voiced_ratio': speech_seconds / seconds
+            - 'mean_probability': mean VAD probability of the voiced frames scored here
+        """
+        total = sum(len(f) for f in self.frames)
+        active = max(total - self._silence_samples, 1)
+        return {
+            'seconds': active / self.sample_rate,
+            'speech_seconds': self._voiced_samples / self.sample_rate,
+            'voiced_ratio': min(1.0, self._voiced_samples / active),
+            'mean_probability': self._probability_sum / self._voiced_frames if self._voiced_frames else 0.0,
+        }
+
+    def process(self, frame: np.ndarray) -> dict:
+        """
+        Feed one frame.
+        Returns dict with:
+            - 'event': 'speech_start', 'speech_end' or None
+            - 'audio': the full utterance on 'speech_end', else None
+            - 'stats': utterance_stats() on 'speech_end', else None
+            - 'is_speech', 'probability': raw VAD result for this frame
+        """
+        result = self.vad.process_frame(frame, threshold=self.vad_threshold)
+        event = None
+        audio = None
+        stats = None
+
+        if not self.recording:
+            if result['event'] == 'speech_start':
+                self.start()
+                event = 'speech_start'
+            else:
+                return {'event': None, 'audio': None, 'stats': None,
+                        'is_speech': result['is_speech'], 'probability': result['probability']}
+
+        self.frames.append(frame)
+
+        if result['is_speech']:
+            self._silence_samples = 0
+            self._voiced_samples += len(frame)
+            self._voiced_frames += 1
+            self._probability_sum += result['probability']
+        else:
+            self._silence_samples += len(frame)
+            if self._silence_samples >= self.silence_threshold * self.sample_rate:
+                event = 'speech_end'
+                audio = np.concatenate(self.frames)
+                stats = self.utterance_stats()
+                self.recording = False
+                self.frames = []
+                self._silence_samples = 0
+                self._clear_stats()
+
+        return {'event': event, 'audio': audio, 'stats': stats,
+                'is_speech': result['is_speech'], 'probability': result['probability']}
@@ -0,0 +1,255 @@
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# audio.pcm: a 4 KB header, then a ring of int16 mono samples. Positions are
+# absolute sample counts since the file was created; sample p lives at slot
+# p % capacity, so the ring always holds [head - capacity, head).
+MAGIC = b"PMJRNL01"
+HEADER = struct.Struct("<8sIqqd")     # magic, sample_rate, capacity, head, created
+HEADER_BYTES = 4096
+HEAD_OFFSET = 8 + 4 + 8              # head is rewritten after every block
+
+AUDIO_FILE = "audio.pcm"
+INDEX_FILE = "index.jsonl"
+
+
+def _paths(directory: str):
+    return os.path.join(directory, AUDIO_FILE), os.path.join(directory, INDEX_FILE)
+
+
+def _read_index(path: str) -> List[dict]:
+    events = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass      # A line cut short by a crash
+    return events
+
+
+class AudioJournal:
+    """
+    Rolling capture journal: the last `hours` of input audio in a fixed-size
+    memory-mapped file, plus a JSONL index of sessions, VAD events and
+    transcripts at their sample positions.
+
+    write() and mark() only queue; a writer thread copies frames into the
+    map and appends index lines, so the audio callback never touches disk.
+    Positions passed to mark() are the stream's own sample counts; the
+    journal shifts them by where this session started in the file.
+    """
+
+    def __init__(self, directory: str, hours: float = 4.0, sample_rate: int = 16000, max_pending: int = 1000):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.capacity = max(1, round(hours * 3600 * sample_rate))
+        self.max_pending = max_pending
+        os.makedirs(directory, exist_ok=True)
+        self.audio_path, self.index_path = _paths(directory)
+
+        self._open_audio()
+        self.base = self.head             # Absolute position of this session's sample 0
+        self._compact()
+        self._index = open(self.index_path, "a", encoding="utf-8")
+
+        self.position = 0                 # Samples handed to write() (stream positions)
+        self.dropped = 0                  # Frames zero-filled because the writer fell behind
+        self._queue = queue.SimpleQueue()
+        # Each counter is only updated by one thread, so their difference needs no lock
+        self._queued = 0                  # Frames queued (callback thread)
+        self._stored = 0                  # Frames stored (writer thread)
+        self._next = self.base            # Next absolute position the writer expects
+        self._thread = threading.Thread(target=self._run, name="audio-journal", daemon=True)
+        self._thread.start()
+        self.mark("session", 0, sample_rate=sample_rate, capacity=self.capacity)
+
+    # ---------- FILE ----------
+
+    def _open_audio(self):
+        size = HEADER_BYTES + self.capacity * 2
+        head, created = 0, time.time()
+        if os.path.exists(self.audio_path) and os.path.getsize(self.audio_path) == size:
+            with open(self.audio_path, "rb") as f:
+                magic, rate, capacity, old_head, old_created = HEADER.unpack(f.read(HEADER.size))
+            if magic == MAGIC and rate == self.sample_rate and capacity == self.capacity:
+                head, created = old_head, old_created
+        if head == 0:
+            # New or incompatible: start over (the old index no longer matches)
+            with open(self.audio_path, "wb") as f:
+                f.truncate(size)
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+
+        self._file = open(self.audio_path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), size)
+        HEADER.pack_into(self._map, 0, MAGIC, self.sample_rate, self.capacity, head, created)
+        self._pcm = np.frombuffer(self._map, dtype=np.int16, count=self.capacity, offset=HEADER_BYTES)
+        self.head = head
+
+    def _compact(self):
+        """Drop index entries whose audio has been overwritten"""
+        events = _read_index(self.index_path)
+        oldest = self.head - self.capacity
+        kept = [e for e in events if e.get("sample", 0) >= oldest]
+        if len(kept) != len(events):
+            tmp = self.index_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for e in kept:
+                    f.write(json.dumps(e, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.index_path)
+
+    # ---------- CALLBACK SIDE ----------
+
+    def write(self, frame: np.ndarray):
+        """Queue one float32 frame (copied). Never blocks."""
+        start = self.position
+        self.position += len(frame)
+        if self._queued - self._stored >= self.max_pending:
+            # The disk stalled: lose the frame (the writer zero-fills the gap)
+            self.dropped += 1
+            return
+        self._queued += 1
+        self._queue.put(("audio", start, frame.copy()))
+
+    def mark(self, event: str, position: int, start: Optional[int] = None, **fields):
+        """Record an event at a stream sample position (with the wall-clock time now)"""
+        record = {"sample": self.base + position, "t": round(time.time(), 3), "event": event}
+        if start is not None:
+            record["start"] = self.base + start
+        record.update(fields)
+        self._queue.put(("mark", position, record))
+
+    # ---------- WRITER ----------
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            kind, position, payload = item
+            if kind == "mark":
+                self._index.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            else:
+                start = self.base + position
+                if start > self._next:
+                    # Dropped frames: silence rather than hours-old audio
+                    self._store(self._next, np.zeros(start - self._next, dtype=np.int16))
+                self._store(start, np.clip(payload * 32768.0, -32768, 32767).astype(np.int16))
+                self._stored += 1
+            if self._queue.empty():
+                self._index.flush()
+
+    def _store(self, start: int, samples: np.ndarray):
+        if len(samples) > self.capacity:
+            start, samples = start + len(samples) - self.capacity, samples[-self.capacity:]
+        offset = start % self.capacity
+        first = min(len(samples), self.capacity - offset)
+        self._pcm[offset:offset + first] = samples[:first]
+        if first < len(samples):
+            self._pcm[:len(samples) - first] = samples[first:]
+        # Publish the new head last, so readers never see unwritten samples
+        self.head = self._next = max(self.head, start + len(samples))
+        struct.pack_into("<q", self._map, HEAD_OFFSET, self.head)
+
+    def close(self):
+        """Finish queued writes and release the file"""
+        if self._thread is None:
+            return
+        self.mark("session_end", self.position, dropped=self.dropped)
+        self._queue.put(None)
+        self._thread.join(timeout=5.0)
+        self._thread = None
+        self._index.close()
+        self._map.flush()
+        del self._pcm
+        self._map.close()
+        self._file.close()
+
+
+class JournalReader:
+    """
+    Reads a journal (while it is being written, or afterwards): the turns
+    in its index and the audio still in the ring.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.audio_path, self.index_path = _paths(directory)
+        if not os.path.exists(self.audio_path):
+            raise FileNotFoundError(f"No journal in {directory}")
+        self._file = open(self.audio_path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.sample_rate, self.capacity, _, self.created = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.audio_path} is not a journal")
+
+    @property
+    def head(self) -> int:
+        return struct.unpack_from("<q", self._map, HEAD_OFFSET)[0]
+
+    @property
+    def oldest(self) -> int:
+        return max(0, self.head - self.capacity)
+
+    def events(self) -> List[dict]:
+        oldest = self.oldest
+        return [e for e in _read_index(self.index_path) if e.get("sample", 0) >= oldest]
+
+    def turns(self, since_hours: Optional[float] = None) -> List[dict]:
+        """
+        One dict per utterance still in the ring, oldest first: start, end
+        (absolute samples), t (wall clock at the endpoint), seconds, text
+        (None if never transcribed), rejected (the turn gate's reason, or
+        None), barge_in, and the session's own turn id.
+        """
+        turns: Dict[tuple, dict] = {}
+        barge_ins = []
+        session = None
+        oldest = self.oldest
+        cutoff = time.time() - since_hours * 3600 if since_hours else None
+        for e in _read_index(self.index_path):
+            event = e.get("event")
+            if event == "session":
+                session = e["sample"]        # Turn ids restart with every session
+            elif event == "barge_in":
+                barge_ins.append(e["sample"])
+            elif event == "speech_end" and e.get("start", e["sample"]) >= oldest:
+                turns[(session, e["turn"])] = {
+                    "turn": e["turn"], "start": e["start"], "end": e["sample"], "t": e["t"],
+                    "seconds": (e["sample"] - e["start"]) / self.sample_rate, "text": None,
+                    "rejected": None,
+                }
+            elif event == "transcript" and (session, e.get("turn")) in turns:
+                turns[(session, e["turn"])]["text"] = e.get("text", "")
+            elif event == "rejected" and (session, e.get("turn")) in turns:
+                turns[(session, e["turn"])]["rejected"] = e.get("reason", "")
+        result = [t for t in turns.values() if cutoff is None or t["t"] >= cutoff]
+        for t in result:
+            t["barge_in"] = any(t["start"] <= b < t["end"] for b in barge_ins)
+        return result
+
+    def audio(self, start: int, end: int) -> np.ndarray:
+        """int16 samples [start, end), clipped to what the ring still holds"""
+        start, end = max(start, self.oldest), min(end, self.head)
+        if end <= start:
+            return np.zeros(0, dtype=np.int16)
+        pcm = np.frombuffer(self._map, dtype=np.int16, count=self.capacity, offset=HEADER_BYTES)
+        offset = start % self.capacity
+        n = end - start
+        if offset + n <= self.capacity:
+            return pcm[offset:offset + n].copy()
+        return np.concatenate([pcm[offset:], pcm[:n - (self.capacity - offset)]])
+
+    def close(self):
+        self._map.close()
+        self._file.close()
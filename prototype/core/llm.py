@@ -1,40 +1,90 @@
-from llama_cpp import  Llama
+from llama_cpp import  Llama, LlamaGrammar
+import json
 import os
 import sys
+import threading
+import time
+from config import settings
+from core import tracing
 
-# Configuration
-# Path to the GGUF model we downloaded
-from prompt_templates.prompts import PromptManager
-
-# Configuration
-# Path to the GGUF model we downloaded
-MODEL_PATH = "./models/gemma-2b-it.Q4_K_M.gguf"
-CONTEXT_WINDOW = 2048
+from prompt_templates.prompts import PromptManager, LLM_ERROR_REPLY, SEARCH_CONTEXT_ERROR_REPLY
 
 class PocketLLM:
-    def __init__(self):
-        print(f"Loading LLM from {MODEL_PATH}...")
-        if not os.path.exists(MODEL_PATH):
-            print(f"Error: Model file {MODEL_PATH} not found!")
+    def __init__(self, n_threads: int = None):
+        model_path = settings.LLM_MODEL_PATH
+        print(f"Loading LLM from {model_path}...")
+        if not os.path.exists(model_path):
+            print(f"Error: Model file {model_path} not found!")
             print("Please run download_models.py first.")
             self.llm = None
             return
 
         # Initialize Llama model
         self.llm = Llama(
-            model_path=MODEL_PATH,
-            n_ctx=CONTEXT_WINDOW,
-            n_threads=4,      # Adjust based on CPU cores
+            model_path=model_path,
+            n_ctx=settings.LLM_CONTEXT_WINDOW,
+            n_threads=n_threads or settings.LLM_THREADS,
+            n_batch=settings.LLM_BATCH,
+            use_mmap=settings.LLM_USE_MMAP,     # weights stay in the page cache across reloads
+            use_mlock=settings.LLM_USE_MLOCK,
             verbose=False     # Set to True for debug
         )
         print("LLM loaded.")
         
+        # One generation at a time: the Llama context is not thread-safe
+        self._lock = threading.Lock()
+        
         # Initialize Prompt Manager
         self.prompts = PromptManager()
+        
+        # Compile the search-decision grammar once
+        self.decision_grammar = LlamaGrammar.from_string(self.prompts.DECISION_GRAMMAR, verbose=False)
+
+    def warmup(self):
+        """
+        One-token eval of the few-shot prompt. Pages the weights in and leaves
+        the shared prompt prefix in the KV cache for the first real turn.
+        """
+        if not self.llm:
+            return
+        with self._lock:
+            self.llm.create_chat_completion(
+                messages=self.prompts.construct_messages("Hello"),
+                max_tokens=1,
+                temperature=0.0
+            )
+
+    def _stream_completion(self, messages, cancel_event=None, on_token=None, **kwargs):
+        """
+        Runs a streaming chat completion and returns the full text.
+        Calls on_token(text) for each token as it arrives.
+        Checks cancel_event between tokens; returns None if cancelled.
+        """
+        with self._lock:
+            started = time.monotonic()
+            stream = self.llm.create_chat_completion(messages=messages, stream=True, **kwargs)
+            parts = []
+            try:
+                for chunk in stream:
+                    if cancel_event is not None and cancel_event.is_set():
+                        return None
+                    token = chunk['choices'][0]['delta'].get('content', '')
+                    if token:
+                        if not parts:
+                            tracing.tracer.record("llm.first_token", (time.monotonic() - started) * 1000)
+                        parts.append(token)
+                        if on_token is not None:
+                            on_token(token)
+            finally:
+                # Stops llama.cpp from evaluating further tokens
+                stream.close()
+            return "".join(parts).strip()
 
-    def generate_response(self, user_text):
+    def generate_response(self, user_text, cancel_event=None, on_token=None):
         """
         Generates a response from the LLM.
+        on_token receives each token as it is generated (for streaming TTS).
+        Returns None if cancel_event is set before generation finishes.
         """
         if not self.llm:
             return "Error: LLM not loaded."
@@ -43,25 +93,61 @@ class PocketLLM:
         messages = self.prompts.construct_messages(user_text)
         
         try:
-            response = self.llm.create_chat_completion(
-                messages=messages,
-                max_tokens=512,       # Increased for better info
-                temperature=0.6,      # Calm/Stable
-                stop=["<end_of_turn>", "User:", "\nUser", "<start_of_turn>"] 
-            )
-            return response['choices'][0]['message']['content'].strip()
+            with tracing.tracer.span("llm.generate"):
+                return self._stream_completion(
+                    messages,
+                    cancel_event=cancel_event,
+                    on_token=on_token,
+                    max_tokens=settings.LLM_MAX_TOKENS,
+                    temperature=settings.LLM_TEMPERATURE,
+                    stop=["<end_of_turn>", "User:", "\nUser", "<start_of_turn>"] 
+                )
         except Exception as e:
             print(f"Error during inference: {e}")
-            return "I'm having trouble thinking."
+            return LLM_ERROR_REPLY
+
+    def decide_search(self, user_text):
+        """
+        Cheap tool-routing pass: asks the model whether to search, with output
+        constrained by a GBNF grammar to {"search": bool, "query": str}.
+        Capped at a few dozen tokens; the prompt shares its prefix with
+        generate_response, so llama.cpp reuses the already-evaluated KV cache.
+        Returns dict with 'search' and 'query', or None if undecided.
+        """
+        if not self.llm:
+            return None
+
+        messages = self.prompts.construct_decision_messages(user_text)
+
+        try:
+            with tracing.tracer.span("llm.decide"):
+                raw = self._stream_completion(
+                    messages,
+                    max_tokens=settings.LLM_DECISION_MAX_TOKENS,
+                    temperature=0.0,
+                    grammar=self.decision_grammar
+                )
+            decision = json.loads(raw)
+        except Exception as e:
+            # Includes output truncated by max_tokens (invalid JSON)
+            print(f"Error during search decision: {e}")
+            return None
+
+        return {
+            'search': bool(decision.get('search')),
+            'query': decision.get('query', '').strip()
+        }
 
-    # Intent detection is now handled by the LLM's response (Tool Use)
     def check_search_intent(self, user_text):
-        """Deprecated: Logic moved to LLM prompt."""
-        return False
+        """True if the model's decision pass asks for a web search."""
+        decision = self.decide_search(user_text)
+        return bool(decision and decision['search'])
 
-    def generate_response_with_search(self, user_text, search_context):
+    def generate_response_with_search(self, user_text, search_context, cancel_event=None, on_token=None):
         """
         Generates a response using search context.
+        on_token receives each token as it is generated (for streaming TTS).
+        Returns None if cancel_event is set before generation finishes.
         """
         if not self.llm:
             return "Error: LLM not loaded."
@@ -79,16 +165,18 @@ class PocketLLM:
         messages = [{"role": "user", "content": full_content}]
           
         try:
-            response = self.llm.create_chat_completion(
-                messages=messages,
-                max_tokens=512,
-                temperature=0.3,  # Lower temperature for more factual
-                stop=["<end_of_turn>", "User:", "<start_of_turn>"]
-            )
-            return response['choices'][0]['message']['content'].strip()
+            with tracing.tracer.span("llm.generate_grounded"):
+                return self._stream_completion(
+                    messages,
+                    cancel_event=cancel_event,
+                    on_token=on_token,
+                    max_tokens=settings.LLM_GROUNDED_MAX_TOKENS,
+                    temperature=settings.LLM_GROUNDED_TEMPERATURE,  # lower: stick to the context
+                    stop=["<end_of_turn>", "User:", "<start_of_turn>"]
+                )
         except Exception as e:
             print(f"Error during search inference: {e}")
-            return "I couldn't process the search results."
+            return SEARCH_CONTEXT_ERROR_REPLY
 
 if __name__ == "__main__":
     bot = PocketLLM()
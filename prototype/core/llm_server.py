@@ -0,0 +1,375 @@
+import heapq
+import importlib
+import itertools
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from config import settings
+from core import tracing
+
+# Lower number runs first
+PRIORITY_HIGH = 0      # search decision pass (blocks the turn, a few tokens)
+PRIORITY_NORMAL = 5    # spoken replies
+PRIORITY_LOW = 10      # background work (warm-up, batch)
+
+# Methods the server will call on the model object
+STREAMING_METHODS = ("generate_response", "generate_response_with_search")
+METHODS = STREAMING_METHODS + ("decide_search", "warmup")
+
+
+# ---------- CHILD PROCESS ----------
+
+class _Worker:
+    """
+    Runs inside the LLM process.
+    A receiver thread reads requests into a priority heap and handles cancel
+    and stats messages immediately; the main thread generates one request at
+    a time and streams tokens back over the pipe.
+    """
+
+    def __init__(self, conn, model):
+        self.conn = conn
+        self.model = model
+        self._send_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._heap = []
+        self._cancel = {}          # request id -> threading.Event
+        self._running = True
+
+        # Stats
+        self._started = time.monotonic()
+        self._busy = 0.0
+        self._active = None
+        self.completed = 0
+        self.cancelled = 0
+        self.errors = 0
+
+    def send(self, msg):
+        with self._send_lock:
+            self.conn.send(msg)
+
+    def _receive(self):
+        while True:
+            try:
+                msg = self.conn.recv()
+            except (EOFError, OSError):
+                msg = ("shutdown",)
+
+            kind = msg[0]
+            if kind == "call":
+                _, req_id, priority, method, args = msg
+                with self._cond:
+                    self._cancel[req_id] = threading.Event()
+                    heapq.heappush(self._heap, (priority, req_id, method, args))
+                    self._cond.notify()
+            elif kind == "cancel":
+                with self._cond:
+                    event = self._cancel.get(msg[1])
+                if event is not None:
+                    # Takes effect between tokens, or before the request starts
+                    event.set()
+            elif kind == "stats":
+                self.send(("stats", msg[1], self.stats()))
+            elif kind == "shutdown":
+                with self._cond:
+                    self._running = False
+                    self._cond.notify()
+                return
+
+    def stats(self) -> dict:
+        with self._cond:
+            depth = len(self._heap)
+            active = self._active
+        uptime = time.monotonic() - self._started
+        busy = self._busy + (time.monotonic() - active if active else 0.0)
+        return {
+            "queue_depth": depth,
+            "busy": active is not None,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+            "utilisation": busy / uptime if uptime > 0 else 0.0,
+        }
+
+    def run(self):
+        threading.Thread(target=self._receive, name="llm-server-recv", daemon=True).start()
+
+        while True:
+            with self._cond:
+                while self._running and not self._heap:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                _, req_id, method, args = heapq.heappop(self._heap)
+                cancel_event = self._cancel[req_id]
+                self._active = time.monotonic()
+
+            # Out of the queue: the parent can tell queueing apart from generation
+            self.send(("started", req_id, None))
+            try:
+                if cancel_event.is_set():
+                    result = None
+                elif method in STREAMING_METHODS:
+                    on_token = lambda token, req_id=req_id: self.send(("token", req_id, token))
+                    result = getattr(self.model, method)(*args, cancel_event=cancel_event, on_token=on_token)
+                else:
+                    result = getattr(self.model, method)(*args)
+                self.send(("done", req_id, result))
+                if cancel_event.is_set():
+                    self.cancelled += 1
+                else:
+                    self.completed += 1
+            except Exception as e:
+                self.errors += 1
+                self.send(("error", req_id, str(e)))
+            finally:
+                with self._cond:
+                    self._busy += time.monotonic() - self._active
+                    self._active = None
+                    self._cancel.pop(req_id, None)
+
+
+def _serve(conn, model_factory: str, cpus=None, model_kwargs=None, config=None):
+    """Entry point of the LLM process: load the model, then serve requests."""
+    if config:
+        # Same settings as the parent, including CLI overrides
+        settings.apply(config, "parent process")
+    if cpus:
+        # Before the model loads, so every llama.cpp thread inherits the mask
+        os.sched_setaffinity(0, cpus)
+    module_name, _, attr = model_factory.partition(":")
+    model = getattr(importlib.import_module(module_name), attr)(**(model_kwargs or {}))
+    conn.send(("ready", None, getattr(model, "llm", True) is not None))
+    _Worker(conn, model).run()
+
+
+# ---------- PARENT PROCESS ----------
+
+class LLMRequest:
+    """Handle for one queued generation: wait for it, or cancel it."""
+
+    def __init__(self, server, req_id: int, on_token: Optional[Callable] = None):
+        self.server = server
+        self.id = req_id
+        self.on_token = on_token
+        self.future = Future()
+        self.submitted = time.monotonic()
+        self.started: Optional[float] = None     # When the LLM process took it off its queue
+        self.first_token: Optional[float] = None
+
+    def cancel(self):
+        self.server._send(("cancel", self.id))
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None, cancel_event=None):
+        """
+        Wait for the result. If cancel_event is set while waiting, the request
+        is cancelled and the (None) result of the cancelled generation returned.
+        """
+        if cancel_event is None:
+            return self.future.result(timeout)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.future.done():
+            if cancel_event.wait(0.02):
+                self.cancel()
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                break
+        return self.future.result(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+
+class LLMServer:
+    """
+    Hosts the GGUF model in a separate process.
+
+    Requests go into a prioritised queue in that process; tokens stream back
+    over a pipe as they are generated. Generation never holds the GIL of the
+    process running audio capture and VAD, and any request can be cancelled
+    between tokens.
+
+    cpus pins the process (and the model's threads) to a core set (Linux);
+    model_kwargs are passed to the model constructor.
+    """
+
+    def __init__(self, model_factory: str = "core.llm:PocketLLM", cpus=None, model_kwargs=None):
+        self.model_factory = model_factory
+        self.cpus = sorted(cpus) if cpus else None
+        self.model_kwargs = model_kwargs or {}
+        self.model_loaded = False
+        self._process = None
+        self._conn = None
+        self._reader = None
+        self._send_lock = threading.Lock()
+        self._pending = {}         # request id -> LLMRequest (or Future for stats)
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def start(self, timeout: Optional[float] = None):
+        """Spawn the LLM process and wait until the model is loaded."""
+        if self._process is not None:
+            return self
+
+        timeout = timeout or settings.LLM_SERVER_START_TIMEOUT
+        ctx = mp.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe(duplex=True)
+        self._process = ctx.Process(target=_serve, args=(child_conn, self.model_factory, self.cpus, self.model_kwargs,
+                                                                settings.snapshot()),
+                                    name="pocketmindly-llm", daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+        if not self._conn.poll(timeout):
+            self.stop()
+            raise TimeoutError(f"LLM server did not start within {timeout}s")
+        try:
+            kind, _, loaded = self._conn.recv()
+        except EOFError:
+            self.stop()
+            raise RuntimeError("LLM server exited while loading the model")
+        self.model_loaded = bool(loaded)
+
+        self._reader = threading.Thread(target=self._read, name="llm-server-read", daemon=True)
+        self._reader.start()
+        return self
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process is not None else None
+
+    def _send(self, msg):
+        with self._send_lock:
+            self._conn.send(msg)
+
+    def _read(self):
+        while True:
+            try:
+                kind, req_id, payload = self._conn.recv()
+            except (EOFError, OSError):
+                break
+
+            if kind == "started":
+                request = self._pending.get(req_id)
+                if isinstance(request, LLMRequest):
+                    request.started = time.monotonic()
+                continue
+
+            if kind == "token":
+                request = self._pending.get(req_id)
+                if request is not None and request.first_token is None:
+                    # Timed here: the LLM process's own tracer is never collected
+                    request.first_token = time.monotonic()
+                    since = request.started or request.submitted
+                    tracing.tracer.record("llm.first_token", (request.first_token - since) * 1000)
+                if request is not None and request.on_token is not None:
+                    try:
+                        request.on_token(payload)
+                    except Exception as e:
+                        print(f"Error in token callback: {e}")
+                continue
+
+            with self._pending_lock:
+                pending = self._pending.pop(req_id, None)
+            if pending is None:
+                continue
+            future = pending if isinstance(pending, Future) else pending.future
+            if kind == "error":
+                future.set_exception(RuntimeError(payload))
+            else:
+                future.set_result(payload)
+
+        # Process gone: fail whatever is still waiting
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for item in pending.values():
+            future = item if isinstance(item, Future) else item.future
+            if not future.done():
+                future.set_exception(RuntimeError("LLM server stopped"))
+
+    def submit(self, method: str, *args, priority: int = PRIORITY_NORMAL,
+               on_token: Optional[Callable] = None) -> LLMRequest:
+        """Queue a call to a PocketLLM method. Returns an LLMRequest handle."""
+        if method not in METHODS:
+            raise ValueError(f"Unknown LLM method: {method}")
+        request = LLMRequest(self, next(self._ids), on_token=on_token)
+        with self._pending_lock:
+            self._pending[request.id] = request
+        self._send(("call", request.id, priority, method, args))
+        return request
+
+    def stats(self, timeout: float = 1.0) -> dict:
+        """Queue depth, utilisation and counters, as reported by the LLM process."""
+        if self._process is None:
+            return {}
+        future = Future()
+        req_id = next(self._ids)
+        with self._pending_lock:
+            self._pending[req_id] = future
+        self._send(("stats", req_id))
+        return future.result(timeout)
+
+    def stop(self, timeout: float = 3.0):
+        if self._process is None:
+            return
+        try:
+            self._send(("shutdown",))
+        except (OSError, ValueError):
+            pass
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._conn.close()
+        self._process = None
+
+
+class RemoteLLM:
+    """Drop-in replacement for PocketLLM that forwards calls to an LLMServer."""
+
+    def __init__(self, server: LLMServer):
+        self.server = server
+
+    @property
+    def llm(self):
+        # Mirrors PocketLLM.llm: falsy when no model is loaded
+        return self.server.model_loaded or None
+
+    def generate_response(self, user_text, cancel_event=None, on_token=None, priority=PRIORITY_NORMAL):
+        with tracing.tracer.span("llm.generate"):
+            request = self.server.submit("generate_response", user_text, priority=priority, on_token=on_token)
+            return request.result(cancel_event=cancel_event or threading.Event())
+
+    def generate_response_with_search(self, user_text, search_context, cancel_event=None, on_token=None,
+                                      priority=PRIORITY_NORMAL):
+        with tracing.tracer.span("llm.generate_grounded"):
+            request = self.server.submit("generate_response_with_search", user_text, search_context,
+                                         priority=priority, on_token=on_token)
+            return request.result(cancel_event=cancel_event or threading.Event())
+
+    def decide_search(self, user_text, priority=PRIORITY_HIGH):
+        with tracing.tracer.span("llm.decide"):
+            return self.server.submit("decide_search", user_text, priority=priority).result()
+
+    def check_search_intent(self, user_text):
+        """True if the model's decision pass asks for a web search."""
+        decision = self.decide_search(user_text)
+        return bool(decision and decision['search'])
+
+    def warmup(self):
+        self.server.submit("warmup", priority=PRIORITY_LOW).result()
+
+
+if __name__ == "__main__":
+    server = LLMServer().start()
+    bot = RemoteLLM(server)
+    if bot.llm:
+        print("Test Response:", bot.generate_response("Hello, who are you?",
+                                                      on_token=lambda t: print(t, end="", flush=True)))
+        print(server.stats())
+    server.stop()
@@ -0,0 +1,210 @@
+import ctypes
+import gc
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+def process_rss_mb(pid: Optional[int] = None) -> float:
+    """Resident set size of a process (this one by default), in MB. 0.0 if unknown."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        if pid is not None:
+            return 0.0
+        import resource
+        # Peak RSS; KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def _release_heap():
+    """Collect, then hand freed heap pages back to the OS (glibc keeps them otherwise)"""
+    gc.collect()
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+class ManagedModel:
+    """
+    A model the governor may unload when idle and reload on demand.
+
+    Stands in for the model itself: attribute access loads it if needed, and
+    calls count as "in use" so it is never unloaded mid-call. Callers keep
+    writing `stt.transcribe(...)` whether or not it was evicted meanwhile.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], object], unloader: Optional[Callable] = None,
+                 idle_timeout: Optional[float] = None, rss_fn: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.loader = loader
+        self.unloader = unloader
+        self.idle_timeout = idle_timeout
+        self.rss_fn = rss_fn          # exact footprint (e.g. a child process); else the load delta
+
+        self._model = None
+        self._type = None             # class of the model, once loaded
+        self._lock = threading.RLock()
+        self._busy = 0
+        self._preloading = None
+
+        # Stats
+        self.last_used = time.monotonic()
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+        self.load_delta_mb = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        """Load (if not loaded) and return the underlying model"""
+        with self._lock:
+            if self._model is None:
+                before = process_rss_mb()
+                started = time.monotonic()
+                self._model = self.loader()
+                self._type = type(self._model)
+                self.load_seconds = time.monotonic() - started
+                self.load_delta_mb = max(0.0, process_rss_mb() - before)
+                self.loads += 1
+                if self.loads > 1:
+                    print(f"📦 {self.name.upper()} reloaded in {self.load_seconds:.2f}s")
+            self.last_used = time.monotonic()
+            return self._model
+
+    def preload(self):
+        """Start loading in the background (no-op if loaded or already loading)"""
+        if self._model is not None or (self._preloading is not None and self._preloading.is_alive()):
+            return
+        self._preloading = threading.Thread(target=self.load, name=f"preload-{self.name}", daemon=True)
+        self._preloading.start()
+
+    def unload(self, idle_only: bool = False) -> bool:
+        """Drop the model. With idle_only, only if unused for idle_timeout seconds."""
+        if not self._lock.acquire(blocking=not idle_only):
+            return False     # Loading or in use right now
+        try:
+            if self._model is None or self._busy:
+                return False
+            if idle_only and (self.idle_timeout is None
+                              or time.monotonic() - self.last_used < self.idle_timeout):
+                return False
+            model, self._model = self._model, None
+            if self.unloader is not None:
+                self.unloader(model)
+            del model
+            self.evictions += 1
+        finally:
+            self._lock.release()
+        _release_heap()
+        return True
+
+    def rss_mb(self) -> float:
+        if self._model is None:
+            return 0.0
+        if self.rss_fn is not None:
+            return self.rss_fn()
+        return self.load_delta_mb
+
+    def __getattr__(self, attr):
+        # Only called for attributes ManagedModel doesn't define itself
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        # Methods of an evicted model don't reload it until they are called
+        known_method = self._type is not None and callable(getattr(self._type, attr, None))
+        if not known_method:
+            value = getattr(self.load(), attr)
+            if not callable(value):
+                return value
+
+        def call(*args, **kwargs):
+            with self._lock:
+                method = getattr(self.load(), attr)
+                self._busy += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self.last_used = time.monotonic()
+        return call
+
+
+class MemoryGovernor:
+    """
+    Tracks the footprint of each model and unloads the ones that sit idle
+    past their timeout. Models reload on next use, or ahead of it via
+    preload() (the assistant calls it when the VAD hears speech start).
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self.models: Dict[str, ManagedModel] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name: str, loader: Callable[[], object], **kwargs) -> ManagedModel:
+        model = ManagedModel(name, loader, **kwargs)
+        self.models[name] = model
+        return model
+
+    def start(self):
+        if self._thread is None and any(m.idle_timeout is not None for m in self.models.values()):
+            self._thread = threading.Thread(target=self._run, name="memory-governor", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            for model in list(self.models.values()):
+                before = process_rss_mb()
+                if model.unload(idle_only=True):
+                    freed = before - process_rss_mb()
+                    print(f"💤 {model.name.upper()} unloaded after {model.idle_timeout:g}s idle"
+                          f" ({freed:.0f} MB freed in-process)")
+
+    def preload(self, *names: str):
+        """Load unloaded (evicted or not yet loaded) models in the background; all by default"""
+        for name in names or list(self.models):
+            self.models[name].preload()
+
+    def footprint(self) -> dict:
+        return {
+            "process_mb": round(process_rss_mb(), 1),
+            "models": {
+                name: {
+                    "loaded": m.loaded,
+                    "rss_mb": round(m.rss_mb(), 1),
+                    "idle_s": round(time.monotonic() - m.last_used, 1),
+                    "idle_timeout": m.idle_timeout,
+                    "loads": m.loads,
+                    "evictions": m.evictions,
+                }
+                for name, m in self.models.items()
+            },
+        }
+
+    def report(self) -> str:
+        fp = self.footprint()
+        lines = [f"  process          {fp['process_mb']:8.0f} MB"]
+        for name, m in fp["models"].items():
+            state = "loaded" if m["loaded"] else "unloaded"
+            timeout = f"{m['idle_timeout']:g}s" if m["idle_timeout"] is not None else "never"
+            lines.append(f"  {name:<16} {m['rss_mb']:8.0f} MB  {state:<9} evict after {timeout}"
+                         f"  ({m['loads']} loads, {m['evictions']} evictions)")
+        return "\n".join(lines)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
@@ -0,0 +1,268 @@
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class EventLoopThread:
+    """
+    One long-lived asyncio event loop running on its own thread.
+    Everything async in the assistant (stages, searches, timers) lives here,
+    so connection pools, caches and in-flight work survive across turns.
+    """
+
+    def __init__(self, name: str = "pocketmindly-loop"):
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return self.loop
+
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.call_soon(ready.set)
+            self.loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.loop
+
+    def submit(self, coro):
+        """Schedule a coroutine from any thread. Returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback: Callable, *args):
+        """Run a plain callback on the loop thread (thread-safe)."""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self, timeout: float = 2.0):
+        if self._thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+
+class CancelEvent(threading.Event):
+    """
+    A turn's cancel flag. Setting it also sets every child() event, so a
+    speculative generation with its own flag still stops on barge-in.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._children: List[threading.Event] = []
+
+    def child(self) -> threading.Event:
+        """An event set with this one, that can also be set on its own"""
+        child = threading.Event()
+        self._children.append(child)
+        if self.is_set():
+            child.set()
+        return child
+
+    def set(self):
+        super().set()
+        for child in list(self._children):
+            child.set()
+
+
+class Turn:
+    """
+    One user utterance travelling through the pipeline.
+    Stages fill in fields as they go; marks hold monotonic timestamps.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, audio=None):
+        self.id = next(self._ids)
+        self.audio = audio
+        self.span: Optional[Tuple[int, int]] = None   # Stream sample positions [start, end) of audio
+        self.text = ""
+        self.route: Optional[dict] = None
+        self.needs_search = False
+        self.search_query = ""
+        self.search_task = None
+        self.search_context = None
+        self.response = None
+        # Set by barge-in; generation and playback stop between tokens/blocks
+        self.cancel = CancelEvent()
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, name: str):
+        self.marks[name] = time.monotonic()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel.is_set()
+
+
+class Stage:
+    """
+    One pipeline stage: reads items from a bounded inbox, runs the handler,
+    and forwards non-None results to the next stage.
+
+    Handlers may be plain functions (run on the stage's own executor, so a
+    slow model never blocks the loop) or coroutines (awaited on the loop;
+    they can use run_blocking() for their blocking parts).
+
+    A handler that raises drops its item; on_error(stage_name, item, error)
+    is then called on the loop so the owner can clean up after it.
+    """
+
+    def __init__(self, name: str, handler: Callable, queue_size: int = 4, workers: int = 1,
+                 on_error: Optional[Callable] = None):
+        self.name = name
+        self.handler = handler
+        self.on_error = on_error
+        self.queue_size = queue_size
+        self.workers = workers
+        self.is_async = asyncio.iscoroutinefunction(handler)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"stage-{name}")
+
+        self.inbox: Optional[asyncio.Queue] = None
+        self.next: Optional["Stage"] = None
+        self._tasks: List[asyncio.Task] = []
+
+        # Stats
+        self.processed = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+
+    async def run_blocking(self, fn: Callable, *args):
+        """Run a blocking call on this stage's executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    def start(self, loop):
+        self.inbox = asyncio.Queue(maxsize=self.queue_size)
+        # An async stage gets one task per worker so slow awaits can overlap
+        for _ in range(self.workers if self.is_async else 1):
+            self._tasks.append(loop.create_task(self._run()))
+
+    async def _run(self):
+        while True:
+            item = await self.inbox.get()
+            started = time.monotonic()
+            try:
+                if self.is_async:
+                    result = await self.handler(item)
+                else:
+                    result = await self.run_blocking(self.handler, item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in {self.name} stage: {e}")
+                result = None
+                if self.on_error is not None:
+                    try:
+                        self.on_error(self.name, item, e)
+                    except Exception as hook_error:
+                        print(f"Error handling {self.name} failure: {hook_error}")
+            finally:
+                self.busy_seconds += time.monotonic() - started
+                self.processed += 1
+
+            if result is not None and self.next is not None:
+                # Backpressure: a full downstream queue slows this stage down
+                await self.next.inbox.put(result)
+
+    def offer(self, item) -> bool:
+        """Non-blocking put (loop thread only). Drops the item if the inbox is full."""
+        try:
+            self.inbox.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.executor.shutdown(wait=False)
+
+
+class Pipeline:
+    """
+    Ordered chain of stages joined by bounded asyncio queues, running on an
+    EventLoopThread. feed() is the thread-safe entry point for the capture side.
+    on_error is handed to every stage (see Stage).
+    """
+
+    def __init__(self, runtime: EventLoopThread, on_error: Optional[Callable] = None):
+        self.runtime = runtime
+        self.on_error = on_error
+        self.stages: List[Stage] = []
+
+    def add_stage(self, name: str, handler: Callable, queue_size: int = 4, workers: int = 1) -> Stage:
+        stage = Stage(name, handler, queue_size=queue_size, workers=workers, on_error=self.on_error)
+        if self.stages:
+            self.stages[-1].next = stage
+        self.stages.append(stage)
+        return stage
+
+    def stage(self, name: str) -> Stage:
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(name)
+
+    def start(self):
+        loop = self.runtime.start()
+        started = threading.Event()
+
+        def create():
+            for stage in self.stages:
+                stage.start(loop)
+            started.set()
+
+        self.runtime.call_soon(create)
+        started.wait()
+
+    def feed(self, item: Any, block: bool = False):
+        """
+        Hand an item to the first stage from any thread.
+        Dropped if the stage is backed up, unless block=True (waits for space;
+        used when replaying audio faster than real time).
+        """
+        if block:
+            self.runtime.submit(self.stages[0].inbox.put(item)).result()
+        else:
+            self.runtime.call_soon(self.stages[0].offer, item)
+
+    def inject(self, stage_name: str, item: Any):
+        """Hand an item to a specific stage from any thread (waits for queue space)."""
+        stage = self.stage(stage_name)
+        self.runtime.call_soon(lambda: asyncio.ensure_future(stage.inbox.put(item)))
+
+    def stats(self) -> dict:
+        return {
+            stage.name: {
+                "queued": stage.inbox.qsize() if stage.inbox is not None else 0,
+                "processed": stage.processed,
+                "dropped": stage.dropped,
+                "busy_s": round(stage.busy_seconds, 3),
+            }
+            for stage in self.stages
+        }
+
+    def stop(self, timeout: float = 2.0):
+        """Cancel every stage and wait for their tasks to finish (from any thread)."""
+        async def cancel_all():
+            for stage in self.stages:
+                await stage.stop()
+
+        try:
+            self.runtime.submit(cancel_all()).result(timeout=timeout)
+        except Exception as e:
+            print(f"Pipeline stop: {e}")
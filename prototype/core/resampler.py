@@ -0,0 +1,118 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+# Filter design per preset:
+#   zero_crossings: sinc lobes on each side of the centre, at the lower of the two rates
+#   beta:           Kaiser window shape (higher = deeper stopband, wider transition)
+#   rolloff:        passband edge as a fraction of the lower Nyquist frequency
+QUALITY_PRESETS = {
+    "fast": {"zero_crossings": 4, "beta": 5.0, "rolloff": 0.80},
+    "balanced": {"zero_crossings": 8, "beta": 7.5, "rolloff": 0.88},
+    "high": {"zero_crossings": 16, "beta": 10.0, "rolloff": 0.93},
+}
+
+
+class Resampler:
+    """
+    Streaming polyphase FIR resampler (in_rate -> out_rate, float32 mono).
+
+    Converts by up/down = out_rate/in_rate reduced by their gcd (48k -> 16k
+    is 1/3, 44.1k -> 16k is 160/441) with a Kaiser-windowed sinc lowpass
+    split into `up` phases. Only the taps that land on real input samples
+    are evaluated, all outputs of a block at once. The filter history and
+    the phase carry over between calls, so feeding a signal in chunks of
+    any size gives the same samples as feeding it in one piece.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, quality: str = "balanced"):
+        if quality not in QUALITY_PRESETS:
+            raise ValueError(f"Unknown resampler quality: {quality} (choose from {', '.join(QUALITY_PRESETS)})")
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.quality = quality
+        g = math.gcd(self.in_rate, self.out_rate)
+        self.up = self.out_rate // g
+        self.down = self.in_rate // g
+
+        preset = QUALITY_PRESETS[quality]
+        ratio = max(self.up, self.down)
+        # Prototype filter at in_rate * up, padded to a whole number of taps per phase
+        self.taps_per_phase = math.ceil((2 * preset["zero_crossings"] * ratio + 1) / self.up)
+        n = self.taps_per_phase * self.up
+        # Centred on a whole upsampled sample so the delay is exact (the last tap may be 0)
+        self._centre = (n - 1) // 2
+        window = np.zeros(n)
+        window[:2 * self._centre + 1] = np.kaiser(2 * self._centre + 1, preset["beta"])
+        cutoff = preset["rolloff"] / ratio          # Cycles per upsampled sample, x2
+        h = cutoff * np.sinc(cutoff * (np.arange(n) - self._centre)) * window
+        h *= self.up / h.sum()                      # Unity DC gain after zero-stuffing
+
+        # phases[p, k] weights input sample (base - k) for an output at phase p
+        self.phases = h.reshape(self.taps_per_phase, self.up).T.astype(np.float32).copy()
+        self._offsets = np.arange(self.taps_per_phase - 1, -1, -1)
+        self.reset()
+
+    @property
+    def passthrough(self) -> bool:
+        return self.up == self.down
+
+    @property
+    def latency_ms(self) -> float:
+        """Group delay of the filter"""
+        if self.passthrough:
+            return 0.0
+        return self._centre / (self.in_rate * self.up) * 1000
+
+    def reset(self, align: bool = False):
+        """
+        Forget the history (e.g. between unrelated recordings). align=True
+        starts the output one filter delay in, so output 0 lines up with
+        input 0 (for whole recordings; live streams keep the delay).
+        """
+        self._history = np.zeros(self.taps_per_phase - 1, dtype=np.float32)
+        # Next output's position, in upsampled samples from the block start
+        self._t = self._centre if align and not self.passthrough else 0
+
+    def output_length(self, n: int) -> int:
+        """Samples the next process() call returns for n input samples"""
+        if self.passthrough:
+            return n
+        return max(0, -(-(n * self.up - self._t) // self.down))
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Resample the next block of a stream"""
+        block = np.asarray(block, dtype=np.float32).ravel()
+        if self.passthrough:
+            return block.copy()
+
+        n_out = self.output_length(len(block))
+        buffer = np.concatenate((self._history, block))
+        t = self._t + np.arange(n_out) * self.down
+        bases = t // self.up
+        # Row i: the taps_per_phase input samples ending at output i's base sample
+        window = buffer[bases[:, None] + self._offsets]
+        out = np.einsum("ij,ij->i", window, self.phases[t % self.up])
+
+        self._t += n_out * self.down - len(block) * self.up
+        if len(self._history):
+            self._history = buffer[-len(self._history):].copy()
+        return out
+
+    def flush(self) -> np.ndarray:
+        """Push zeros through to get the samples still held in the filter"""
+        tail = self.process(np.zeros(self._centre // self.up + 1, dtype=np.float32))
+        self.reset()
+        return tail
+
+
+def resample(audio: np.ndarray, in_rate: int, out_rate: int, quality: Optional[str] = None) -> np.ndarray:
+    """Resample a whole recording, delay-compensated (same duration in seconds)"""
+    from config import settings
+    resampler = Resampler(in_rate, out_rate, quality or settings.RESAMPLER_QUALITY)
+    if resampler.passthrough:
+        return np.asarray(audio, dtype=np.float32).copy()
+    resampler.reset(align=True)
+    out = np.concatenate((resampler.process(audio), resampler.flush()))
+    return out[:-(-len(audio) * resampler.up // resampler.down)]
@@ -0,0 +1,286 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+from config import settings
+
+# Words are lowercase runs of letters/digits, keeping contractions ("who's")
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?", re.IGNORECASE)
+
+SEARCH = "search"
+OFFLINE = "offline"
+BORDERLINE = "borderline"
+
+
+def tokenize(text: str):
+    """Return (tokens, spans) for text. Tokens are lowercase words."""
+    tokens = []
+    spans = []
+    for match in _TOKEN_RE.finditer(text):
+        tokens.append(match.group(0).lower())
+        spans.append(match.span())
+    return tokens, spans
+
+
+class PhraseTrie:
+    """
+    Trie over word sequences.
+    Matching walks whole tokens, so "find" never matches inside "findings".
+    """
+
+    _END = "__end__"
+
+    def __init__(self):
+        self._root = {}
+        self.max_depth = 0
+
+    def add(self, phrase: str, label: str):
+        tokens, _ = tokenize(phrase)
+        if not tokens:
+            return
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[self._END] = (phrase, label)
+        self.max_depth = max(self.max_depth, len(tokens))
+
+    def find_all(self, tokens: List[str]):
+        """
+        Yield (start, end, phrase, label) for every phrase occurring in tokens.
+        end is exclusive, in token indices.
+        """
+        root = self._root
+        end_key = self._END
+        for start in range(len(tokens)):
+            node = root
+            for i in range(start, min(len(tokens), start + self.max_depth)):
+                node = node.get(tokens[i])
+                if node is None:
+                    break
+                hit = node.get(end_key)
+                if hit is not None:
+                    yield start, i + 1, hit[0], hit[1]
+
+    def find_first(self, tokens: List[str]):
+        """Return the earliest match, or None."""
+        for hit in self.find_all(tokens):
+            return hit
+        return None
+
+    def match_at(self, tokens: List[str], start: int):
+        """Return the longest phrase starting exactly at tokens[start], or None."""
+        node = self._root
+        best = None
+        for i in range(start, min(len(tokens), start + self.max_depth)):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            hit = node.get(self._END)
+            if hit is not None:
+                best = (start, i + 1, hit[0], hit[1])
+        return best
+
+
+class NaiveBayesIntentClassifier:
+    """
+    Tiny multinomial Naive Bayes over unigrams and bigrams.
+    Trained in milliseconds from a small labelled JSONL set:
+        {"text": "...", "label": "search" | "offline"}
+    """
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+        self._log_prior = {}
+        self._log_likelihood = {}
+        self._log_unseen = {}
+
+    @staticmethod
+    def features(text: str) -> List[str]:
+        tokens, _ = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def fit(self, examples):
+        """examples: iterable of (text, label)"""
+        counts: Dict[str, Counter] = {}
+        docs = Counter()
+        vocab = set()
+
+        for text, label in examples:
+            feats = self.features(text)
+            counts.setdefault(label, Counter()).update(feats)
+            docs[label] += 1
+            vocab.update(feats)
+
+        total_docs = sum(docs.values())
+        vocab_size = len(vocab) or 1
+
+        for label, counter in counts.items():
+            total = sum(counter.values()) + self.alpha * vocab_size
+            self._log_prior[label] = math.log(docs[label] / total_docs)
+            self._log_likelihood[label] = {
+                feat: math.log((n + self.alpha) / total) for feat, n in counter.items()
+            }
+            self._log_unseen[label] = math.log(self.alpha / total)
+        return self
+
+    @classmethod
+    def from_jsonl(cls, path: str):
+        examples = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    item = json.loads(line)
+                    examples.append((item["text"], item["label"]))
+        return cls().fit(examples)
+
+    def predict_proba(self, text: str) -> float:
+        """Probability that text needs a web search."""
+        if SEARCH not in self._log_prior:
+            return 0.0
+
+        feats = self.features(text)
+        scores = {}
+        for label, prior in self._log_prior.items():
+            table = self._log_likelihood[label]
+            unseen = self._log_unseen[label]
+            scores[label] = prior + sum(table.get(f, unseen) for f in feats)
+
+        # Softmax over labels
+        top = max(scores.values())
+        exp = {label: math.exp(s - top) for label, s in scores.items()}
+        return exp[SEARCH] / sum(exp.values())
+
+
+class IntentRouter:
+    """
+    Decides whether an utterance needs a web search and extracts the query.
+
+    Phrases are compiled once into a word-level trie, so routing a turn is a
+    single pass over its tokens. Phrase lists live in config/router.json and
+    an optional classifier covers utterances no phrase matches.
+
+    Borderline triggers ("how many", "tomorrow") hint at a lookup the offline
+    model may well answer; they make a turn 'borderline' unless the classifier
+    is confident either way.
+    """
+
+    def __init__(self, search_triggers=(), entities=(), query_prefixes=(),
+                 classifier: Optional[NaiveBayesIntentClassifier] = None,
+                 search_threshold: float = 0.7, offline_threshold: float = 0.3,
+                 borderline_triggers=(), leading_fillers=()):
+        self._triggers = PhraseTrie()
+        for phrase in search_triggers:
+            self._triggers.add(phrase, "trigger")
+        for phrase in entities:
+            self._triggers.add(phrase, "entity")
+        for phrase in borderline_triggers:
+            self._triggers.add(phrase, BORDERLINE)
+
+        self._prefixes = PhraseTrie()
+        for phrase in query_prefixes:
+            self._prefixes.add(phrase, "prefix")
+        self._fillers = {token for phrase in leading_fillers for token in tokenize(phrase)[0]}
+
+        self.classifier = classifier
+        self.search_threshold = search_threshold
+        self.offline_threshold = offline_threshold
+
+    @classmethod
+    def from_config(cls, path: Optional[str] = None):
+        """Build a router from a JSON config (defaults to settings.ROUTER_CONFIG_PATH)."""
+        path = path or settings.ROUTER_CONFIG_PATH
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+
+        classifier = None
+        clf_config = config.get("classifier", {})
+        if clf_config.get("enabled"):
+            training_file = clf_config["training_file"]
+            if not os.path.isabs(training_file):
+                training_file = os.path.join(os.path.dirname(os.path.abspath(path)), training_file)
+            classifier = NaiveBayesIntentClassifier.from_jsonl(training_file)
+
+        return cls(
+            search_triggers=config.get("search_triggers", []),
+            entities=config.get("entities", []),
+            query_prefixes=config.get("query_prefixes", []),
+            borderline_triggers=config.get("borderline_triggers", []),
+            leading_fillers=config.get("leading_fillers", []),
+            classifier=classifier,
+            search_threshold=clf_config.get("search_threshold", 0.7),
+            offline_threshold=clf_config.get("offline_threshold", 0.3),
+        )
+
+    def extract_query(self, text: str, tokens=None, spans=None) -> str:
+        """
+        Strip a leading request phrase ("who is", "tell me about") from text.
+        Only at the start, or just after filler words ("so", "um"); the same
+        words later on are part of the query ("what did Trump find in ...").
+        """
+        if tokens is None:
+            tokens, spans = tokenize(text)
+
+        start = 0
+        while start < len(tokens) and tokens[start] in self._fillers:
+            start += 1
+        hit = self._prefixes.match_at(tokens, start)
+        if hit is None:
+            return text.strip()
+
+        _, end, _, _ = hit
+        if end >= len(tokens):
+            return text.strip()
+
+        query = text[spans[end][0]:].strip(" \t?!.,")
+        return query or text.strip()
+
+    def route(self, text: str) -> dict:
+        """
+        Route an utterance.
+        Returns dict with:
+            - 'intent': 'search', 'offline' or 'borderline'
+            - 'needs_search': True only for 'search'
+            - 'query': search query extracted from the text
+            - 'matches': phrases that fired
+            - 'source': 'keywords', 'classifier' or 'none'
+            - 'score': classifier probability (None if not consulted)
+        """
+        tokens, spans = tokenize(text)
+        hits = list(self._triggers.find_all(tokens))
+        matches = [phrase for _, _, phrase, label in hits if label != BORDERLINE]
+        weak = [phrase for _, _, phrase, label in hits if label == BORDERLINE]
+
+        intent = OFFLINE
+        source = "none"
+        score = None
+
+        if matches:
+            intent = SEARCH
+            source = "keywords"
+        else:
+            if weak:
+                intent = BORDERLINE
+                source = "keywords"
+            if self.classifier is not None and tokens:
+                score = self.classifier.predict_proba(text)
+                source = "classifier"
+                if score >= self.search_threshold:
+                    intent = SEARCH
+                elif score > self.offline_threshold:
+                    intent = BORDERLINE
+                else:
+                    intent = OFFLINE
+            matches = weak
+
+        return {
+            'intent': intent,
+            'needs_search': intent == SEARCH,
+            'query': self.extract_query(text, tokens, spans) if intent != OFFLINE else text.strip(),
+            'matches': matches,
+            'source': source,
+            'score': score,
+        }
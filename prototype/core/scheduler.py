@@ -0,0 +1,103 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from core.tracing import RollingHistogram
+
+
+class FairScheduler:
+    """
+    Shares one blocking resource (a Whisper model, a GGUF model) between
+    sessions. Each session has its own FIFO; the dispatcher serves sessions
+    round-robin, so one chatty client can't starve the others. At most
+    `concurrency` jobs run at once, on a dedicated executor.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, name: str, concurrency: int = 1):
+        self.name = name
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"sched-{name}")
+
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._running = 0
+
+        # Stats
+        self.completed = 0
+        self.wait_ms = RollingHistogram()
+        self.run_ms = RollingHistogram()
+        self._busy = 0.0
+        self._started = time.monotonic()
+
+    @property
+    def backlog(self) -> int:
+        """Jobs queued but not yet running"""
+        return sum(len(q) for q in self._queues.values())
+
+    async def run(self, session_id: str, fn: Callable, *args):
+        """Queue fn(*args) for session_id and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session_id, deque()).append((fn, args, future, time.monotonic()))
+        self._dispatch()
+        return await future
+
+    def drop_session(self, session_id: str):
+        """Cancel everything a departed session still has queued."""
+        for _, _, future, _ in self._queues.pop(session_id, ()):
+            future.cancel()
+
+    def _next_job(self):
+        # Round-robin: take from the first non-empty queue, then move that session to the back
+        for session_id in list(self._queues):
+            queue = self._queues[session_id]
+            if queue:
+                self._queues.move_to_end(session_id)
+                return queue.popleft()
+            del self._queues[session_id]
+        return None
+
+    def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while self._running < self.concurrency:
+            job = self._next_job()
+            if job is None:
+                return
+            fn, args, future, queued = job
+            if future.cancelled():
+                continue
+            self._running += 1
+            self.wait_ms.add((time.monotonic() - queued) * 1000)
+            started = time.monotonic()
+            task = loop.run_in_executor(self.executor, fn, *args)
+            task.add_done_callback(lambda t, f=future, s=started: self._finished(t, f, s))
+
+    def _finished(self, task, future, started):
+        self._running -= 1
+        elapsed = time.monotonic() - started
+        self._busy += elapsed
+        self.run_ms.add(elapsed * 1000)
+        self.completed += 1
+        if not future.cancelled():
+            if task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+        self._dispatch()
+
+    def stats(self) -> Dict[str, object]:
+        uptime = time.monotonic() - self._started
+        return {
+            "backlog": self.backlog,
+            "running": self._running,
+            "completed": self.completed,
+            "utilisation": self._busy / (uptime * self.concurrency) if uptime > 0 else 0.0,
+            "wait_ms": self.wait_ms.summary(),
+            "run_ms": self.run_ms.summary(),
+        }
+
+    def shutdown(self):
+        for session_id in list(self._queues):
+            self.drop_session(session_id)
+        self.executor.shutdown(wait=False)
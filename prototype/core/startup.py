@@ -0,0 +1,48 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTimeline:
+    """
+    Records when each startup step began and ended (relative to creation),
+    from any thread, and prints them as a timeline.
+    """
+
+    def __init__(self):
+        self._t0 = time.monotonic()
+        self._steps = []           # (name, start, end)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.monotonic() - self._t0
+        try:
+            yield
+        finally:
+            end = time.monotonic() - self._t0
+            with self._lock:
+                self._steps.append((name, start, end))
+
+    def mark(self, name: str):
+        """A zero-length event (e.g. 'mic up')."""
+        now = time.monotonic() - self._t0
+        with self._lock:
+            self._steps.append((name, now, now))
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._t0
+
+    def report(self, width: int = 40) -> str:
+        with self._lock:
+            steps = sorted(self._steps, key=lambda s: s[1])
+        if not steps:
+            return ""
+        total = max(end for _, _, end in steps) or 1e-9
+        lines = []
+        for name, start, end in steps:
+            left = int(start / total * width)
+            bar = "|" if end == start else "█" * max(1, int((end - start) / total * width))
+            lines.append(f"  {name:<16} {' ' * left}{bar:<{width - left}}  {start:6.2f}s → {end:6.2f}s")
+        return "\n".join(lines)
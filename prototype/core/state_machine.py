@@ -1,7 +1,10 @@
+import asyncio
+import queue
 import threading
-from enum import Enum, auto
-from typing import Callable, Optional
 import time
+from collections import deque
+from enum import Enum, auto
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional
 
 class State(Enum):
     """Voice assistant states"""
@@ -12,23 +15,51 @@ class State(Enum):
     THINKING = auto()
     SPEAKING = auto()
 
+
+class Transition(NamedTuple):
+    """One state change, as delivered to subscribers and kept in the trace"""
+    old: State
+    new: State
+    at: float          # time.monotonic()
+
+
 class StateMachine:
     """
-    Thread-safe state machine for voice assistant.
-    Manages state transitions and callbacks.
+    Thread-safe state machine for voice assistant, published as an event bus.
+
+    Reading `state` takes no lock (it's checked on every audio frame).
+    Transitions are validated against a precomputed table; subscribers are
+    called on a dispatcher thread, or on an event loop if one is given, so a
+    slow callback never runs on the thread that changed the state.
+    The last `trace_size` transitions are kept for diagnostics.
     """
-    
-    def __init__(self):
+
+    TRANSITIONS: Dict[State, FrozenSet[State]] = {
+        State.IDLE: frozenset({State.LISTENING}),
+        State.LISTENING: frozenset({State.RECORDING, State.IDLE}),
+        State.RECORDING: frozenset({State.PROCESSING, State.IDLE}),
+        State.PROCESSING: frozenset({State.THINKING, State.LISTENING, State.IDLE}),
+        State.THINKING: frozenset({State.SPEAKING, State.LISTENING, State.IDLE}),  # LISTENING = no reply
+        State.SPEAKING: frozenset({State.IDLE, State.LISTENING, State.RECORDING}),  # RECORDING = barge-in
+    }
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None, trace_size: int = 256,
+                 verbose: bool = True):
         self._state = State.IDLE
-        self._lock = threading.Lock()
-        self._callbacks = {}
-        
+        self._lock = threading.Lock()      # serialises writers, their trace entries and events
+        self._subscribers = []             # (from_state | None, to_state | None, callback)
+        self._trace = deque(maxlen=trace_size)
+        self.verbose = verbose
+
+        self._loop = loop
+        self._events = None
+        self._dispatcher = None
+
     @property
     def state(self) -> State:
-        """Get current state (thread-safe)"""
-        with self._lock:
-            return self._state
-    
+        """Get current state (lock-free; a plain attribute read is atomic)"""
+        return self._state
+
     def transition(self, new_state: State) -> bool:
         """
         Transition to a new state.
@@ -36,52 +67,107 @@ class StateMachine:
         """
         with self._lock:
             old_state = self._state
-            
-            # Validate transition
-            if not self._is_valid_transition(old_state, new_state):
-                print(f"❌ Invalid transition: {old_state.name} -> {new_state.name}")
-                return False
-            
-            self._state = new_state
+            valid = new_state in self.TRANSITIONS[old_state]
+            if valid:
+                self._state = new_state
+                # Traced and queued under the lock, so both keep the order the states changed in
+                event = Transition(old_state, new_state, time.monotonic())
+                self._trace.append(event)
+                self._publish(event)
+
+        if not valid:
+            print(f"❌ Invalid transition: {old_state.name} -> {new_state.name}")
+            return False
+
+        if self.verbose:
             print(f"🔄 State: {old_state.name} -> {new_state.name}")
-            
-            # Trigger callbacks
-            self._trigger_callbacks(old_state, new_state)
-            
-            return True
-    
-    def _is_valid_transition(self, old: State, new: State) -> bool:
-        """Check if state transition is valid"""
-        valid_transitions = {
-            State.IDLE: [State.LISTENING],
-            State.LISTENING: [State.RECORDING, State.IDLE],
-            State.RECORDING: [State.PROCESSING, State.IDLE],
-            State.PROCESSING: [State.THINKING, State.LISTENING, State.IDLE],
-            State.THINKING: [State.SPEAKING, State.IDLE],
-            State.SPEAKING: [State.IDLE, State.LISTENING],
-        }
-        
-        return new in valid_transitions.get(old, [])
-    
-    def on_transition(self, from_state: State, to_state: State, callback: Callable):
-        """Register a callback for a specific state transition"""
-        key = (from_state, to_state)
-        if key not in self._callbacks:
-            self._callbacks[key] = []
-        self._callbacks[key].append(callback)
-    
-    def _trigger_callbacks(self, old_state: State, new_state: State):
-        """Trigger callbacks for this transition"""
-        key = (old_state, new_state)
-        if key in self._callbacks:
-            for callback in self._callbacks[key]:
-                try:
-                    callback()
-                except Exception as e:
-                    print(f"Error in callback: {e}")
-    
+        return True
+
     def reset(self):
         """Reset to IDLE state"""
         with self._lock:
+            old_state = self._state
             self._state = State.IDLE
-            print("🔄 State: RESET -> IDLE")
+            self._trace.append(Transition(old_state, State.IDLE, time.monotonic()))
+        print("🔄 State: RESET -> IDLE")
+
+    # ---------- SUBSCRIBERS ----------
+
+    def subscribe(self, callback: Callable[[Transition], None],
+                  from_state: Optional[State] = None, to_state: Optional[State] = None):
+        """
+        Call callback(transition) for every matching transition.
+        None matches any state. Returns the callback, for unsubscribe().
+        """
+        self._subscribers = self._subscribers + [(from_state, to_state, callback)]
+        return callback
+
+    def unsubscribe(self, callback: Callable):
+        self._subscribers = [s for s in self._subscribers if s[2] is not callback]
+
+    def on_transition(self, from_state: State, to_state: State, callback: Callable):
+        """Register a callback (no arguments) for a specific state transition"""
+        self.subscribe(lambda event: callback(), from_state, to_state)
+
+    def _publish(self, event: Transition):
+        """Queue event for its subscribers (caller holds the lock); never runs a callback here"""
+        matched = [cb for src, dst, cb in self._subscribers
+                   if (src is None or src is event.old) and (dst is None or dst is event.new)]
+        if not matched:
+            return
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._deliver, matched, event)
+            return
+        if self._dispatcher is None:
+            self._start_dispatcher()
+        self._events.put((matched, event))
+
+    def _start_dispatcher(self):
+        # Only called from _publish, under the lock
+        self._events = queue.SimpleQueue()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="state-events", daemon=True)
+        self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        # One thread, so subscribers see transitions in order
+        while True:
+            item = self._events.get()
+            if item is None:
+                return
+            self._deliver(*item)
+
+    @staticmethod
+    def _deliver(callbacks: List[Callable], event: Transition):
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in callback: {e}")
+
+    def close(self):
+        """Stop the dispatcher thread after it has delivered what's queued"""
+        with self._lock:
+            dispatcher, events, self._dispatcher = self._dispatcher, self._events, None
+        if dispatcher is not None:
+            events.put(None)
+            dispatcher.join(timeout=1.0)
+
+    # ---------- DIAGNOSTICS ----------
+
+    def trace(self, limit: Optional[int] = None, since: Optional[float] = None) -> List[Transition]:
+        """Recent transitions, oldest first; optionally only the last `limit` or those after `since`"""
+        events = list(self._trace)
+        if since is not None:
+            events = [e for e in events if e.at > since]
+        if limit is not None:
+            events = events[-limit:]
+        return events
+
+    def time_in_states(self) -> Dict[str, float]:
+        """Seconds spent in each state over the traced window (the current state up to now)"""
+        events = list(self._trace)
+        totals = {}
+        for event, following in zip(events, events[1:] + [None]):
+            end = following.at if following is not None else time.monotonic()
+            totals[event.new.name] = totals.get(event.new.name, 0.0) + end - event.at
+        return totals
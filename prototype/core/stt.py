@@ -2,70 +2,97 @@ from faster_whisper import WhisperModel
 import os
 import time
 from config import settings
-
-# Configuration
-MODEL_SIZE = settings.STT_MODEL_SIZE
-# Use the local model path we downloaded to
-MODEL_PATH = settings.STT_MODEL_PATH
-COMPUTE_TYPE = settings.STT_COMPUTE_TYPE
-DEVICE = settings.STT_DEVICE
+from core import tracing
+from core.turn_gate import confident_text, segment_is_confident
 
 class PocketSTT:
     def __init__(self):
-        print(f"Loading Whisper model '{MODEL_SIZE}'...")
+        print(f"Loading Whisper model '{settings.STT_MODEL_SIZE}' ({settings.STT_COMPUTE_TYPE})...")
         start_time = time.time()
-        # Ensure path exists, otherwise default to downloading/cache
-        if os.path.exists(MODEL_PATH):
-            download_root = MODEL_PATH
+        # Use the local model path we downloaded to; otherwise default to downloading/cache
+        if os.path.exists(settings.STT_MODEL_PATH):
+            download_root = settings.STT_MODEL_PATH
         else:
             download_root = None # Let it download if missing
             
         self.model = WhisperModel(
-            MODEL_SIZE, 
-            device=DEVICE, 
-            compute_type=COMPUTE_TYPE,
+            settings.STT_MODEL_SIZE, 
+            device=settings.STT_DEVICE, 
+            compute_type=settings.STT_COMPUTE_TYPE,
+            cpu_threads=settings.STT_CPU_THREADS,
             download_root=download_root
         )
         print(f"STT Model loaded in {time.time() - start_time:.2f}s")
 
+    def warmup(self):
+        """Decode half a second of silence so the first real decode isn't cold"""
+        import numpy as np
+
+        segments, _ = self.model.transcribe(
+            np.zeros(8000, dtype=np.float32),
+            beam_size=1,
+            language="en",
+            condition_on_previous_text=False
+        )
+        list(segments)  # segments are lazy; this runs the decode
+
     def transcribe(self, audio_file):
         """
-        Transcribes the given audio file.
+        Transcribes the given audio file (or float32 16 kHz NumPy array).
         Returns the text string.
         """
-        if not os.path.exists(audio_file):
+        return self.transcribe_detailed(audio_file)['text']
+
+    def transcribe_detailed(self, audio_file):
+        """
+        Like transcribe(), with Whisper's own confidence. Returns dict with:
+            - 'text': the confident segments' text
+            - 'segments': every segment (text, start, end, no_speech_prob, avg_logprob)
+            - 'dropped': how many segments were left out for low confidence
+        """
+        with tracing.tracer.span("stt.transcribe"):
+            return self._transcribe(audio_file)
+
+    @staticmethod
+    def _segments(segments):
+        """Run the (lazy) decode and keep what the confidence check needs"""
+        return [{'text': s.text, 'start': s.start, 'end': s.end,
+                 'no_speech_prob': s.no_speech_prob, 'avg_logprob': s.avg_logprob} for s in segments]
+
+    def _transcribe(self, audio_file):
+        if isinstance(audio_file, str) and not os.path.exists(audio_file):
             print(f"Error: Audio file {audio_file} not found.")
-            return ""
+            return {'text': "", 'segments': [], 'dropped': 0}
 
         print("Transcribing...")
         start_time = time.time()
         
         segments, info = self.model.transcribe(
             audio_file, 
-            beam_size=5, 
+            beam_size=settings.STT_BEAM_SIZE, 
             language="en", 
-            condition_on_previous_text=False
+            condition_on_previous_text=False,
+            no_speech_threshold=None  # Keep every segment; the confidence check below decides
         )
+        segments = self._segments(segments)
         
-        full_text = ""
-        for segment in segments:
-            full_text += segment.text + " "
-            
-        full_text = full_text.strip()
-        
-        # Filter common Whisper hallucinations
-        hallucinations = ["You", "Thank you.", "Thank you", "MBC", "You."]
-        if full_text in hallucinations:
-            return ""
-            
-        
-        return full_text
+        # Noise decoded as "You" / "Thank you." comes back as low-confidence segments
+        kept = [s for s in segments if segment_is_confident(s)]
+        return {
+            'text': confident_text(kept),
+            'segments': segments,
+            'dropped': len(segments) - len(kept)
+        }
 
     def transcribe_stream(self, audio_buffer, sample_rate=16000):
         """
         Transcribe audio buffer for streaming (real-time partial transcripts).
         Returns dict with 'text' and 'is_final'.
         """
+        with tracing.tracer.span("stt.partial"):
+            return self._transcribe_stream(audio_buffer, sample_rate)
+
+    def _transcribe_stream(self, audio_buffer, sample_rate=16000):
         import numpy as np
         import scipy.io.wavfile as wav
         import tempfile
@@ -86,22 +113,15 @@ class PocketSTT:
             # Quick transcription for partial results
             segments, info = self.model.transcribe(
                 temp_path,
-                beam_size=1,  # Faster for partial
+                beam_size=settings.STT_PARTIAL_BEAM_SIZE,  # Faster for partial
                 language="en",
                 condition_on_previous_text=False,
+                no_speech_threshold=None,
                 vad_filter=False  # We handle VAD externally
             )
             
-            text = ""
-            for segment in segments:
-                text += segment.text + " "
-            
-            text = text.strip()
-            
-            # Filter hallucinations
-            hallucinations = ["You", "Thank you.", "Thank you", "MBC", "You."]
-            if text in hallucinations:
-                text = ""
+            # Drop low-confidence segments (hallucinations over noise)
+            text = confident_text(self._segments(segments))
             
             return {
                 'text': text,
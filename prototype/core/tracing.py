@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from config import settings
+
+class RollingHistogram:
+    """
+    Keeps the last `window` samples (ms) and reports percentiles over them.
+    Thread-safe: spans end on any thread, and reports can run while they do.
+    """
+
+    def __init__(self, window: int = 500):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value_ms: float):
+        with self._lock:
+            self._samples.append(value_ms)
+            self.count += 1
+            self.total += value_ms
+
+    @staticmethod
+    def _at(samples: list, p: float) -> float:
+        """p-th percentile of already sorted samples"""
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def percentile(self, p: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        return self._at(samples, p)
+
+    def summary(self) -> dict:
+        # One snapshot, so count, mean and percentiles agree with each other
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total = self.count, self.total
+        return {
+            "count": count,
+            "total": total,
+            "mean": sum(samples) / len(samples) if samples else 0.0,
+            "p50": self._at(samples, 50),
+            "p95": self._at(samples, 95),
+            "p99": self._at(samples, 99),
+        }
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, (time.monotonic() - self.start) * 1000)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    """Tracing disabled: every call is a constant-time no-op."""
+
+    enabled = False
+
+    def span(self, name: str):
+        return _NULL_SPAN
+
+    def record(self, name: str, duration_ms: float):
+        pass
+
+    def finish_turn(self, turn, **fields):
+        pass
+
+    def summary(self) -> Dict[str, dict]:
+        return {}
+
+    def report(self) -> str:
+        return ""
+
+    def close(self):
+        pass
+
+
+class Tracer(NullTracer):
+    """
+    Collects component spans and per-turn milestones.
+
+    span(name) times a block into a rolling histogram. finish_turn(turn)
+    writes the turn's marks as one JSON line (ms since speech start) and
+    adds each milestone's latency from the VAD endpoint to its histogram,
+    e.g. 'turn.first_audio' is the delay the user actually hears.
+    """
+
+    enabled = True
+
+    def __init__(self, path: Optional[str] = None, window: int = 500):
+        self.path = path
+        self.window = window
+        self._histograms: Dict[str, RollingHistogram] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+
+    def span(self, name: str):
+        return _Span(self, name)
+
+    def record(self, name: str, duration_ms: float):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, RollingHistogram(self.window))
+        histogram.add(duration_ms)
+
+    def finish_turn(self, turn, **fields):
+        """Record a finished Turn (anything with .id and .marks)."""
+        marks = turn.marks
+        origin = marks.get("speech_start", marks.get("vad_endpoint"))
+        endpoint = marks.get("vad_endpoint")
+        if origin is None:
+            return
+
+        for name, t in marks.items():
+            if endpoint is not None and name not in ("speech_start", "vad_endpoint") and t >= endpoint:
+                self.record(f"turn.{name}", (t - endpoint) * 1000)
+
+        if self._file is not None:
+            record = {
+                "turn": turn.id,
+                "time": time.time(),
+                "marks": {name: round((t - origin) * 1000, 1)
+                          for name, t in sorted(marks.items(), key=lambda item: item[1])},
+            }
+            record.update(fields)
+            with self._lock:
+                self._file.write(json.dumps(record) + "\n")
+                self._file.flush()
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            items = list(self._histograms.items())
+        return {name: histogram.summary() for name, histogram in sorted(items)}
+
+    def report(self) -> str:
+        """Percentile table of everything recorded so far."""
+        lines = [f"{'stage':<28}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)"]
+        for name, s in self.summary().items():
+            lines.append(f"{name:<28}{s['count']:>6}{s['p50']:>9.1f}{s['p95']:>9.1f}{s['p99']:>9.1f}")
+        return "\n".join(lines)
+
+    def close(self):
+        if self._file is not None:
+            with self._lock:
+                self._file.close()
+                self._file = None
+
+
+def from_settings():
+    """A Tracer if settings.TRACE_ENABLED, else a NullTracer"""
+    if settings.TRACE_ENABLED:
+        return Tracer(settings.TRACE_PATH, window=settings.TRACE_WINDOW)
+    return NullTracer()
+
+
+# Process-wide tracer; components look it up at call time (tracing.tracer.span(...))
+tracer = from_settings()
+
+
+def set_tracer(new_tracer):
+    """Swap the process-wide tracer (e.g. enable tracing for a benchmark)."""
+    global tracer
+    old, tracer = tracer, new_tracer
+    return old
@@ -0,0 +1,531 @@
+import os
+import queue
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+import time
+import wave
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from config import settings
+from core import tracing
+
+
+def _pcm_from_wav_bytes(data: bytes):
+    """
+    Extract (int16 pcm, sample_rate) from WAV bytes.
+    Tolerates the bogus chunk sizes espeak-ng writes when streaming to stdout.
+    """
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("Not a WAV stream")
+
+    sample_rate = 16000
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        chunk_size = struct.unpack("<I", data[pos + 4:pos + 8])[0]
+        if chunk_id == b"fmt ":
+            sample_rate = struct.unpack("<I", data[pos + 12:pos + 16])[0]
+        elif chunk_id == b"data":
+            payload = data[pos + 8:]
+            payload = payload[:len(payload) - len(payload) % 2]
+            return np.frombuffer(payload, dtype=np.int16).copy(), sample_rate
+        pos += 8 + chunk_size
+
+    raise ValueError("WAV stream has no data chunk")
+
+
+# ---------- BACKENDS ----------
+
+class TTSBackend:
+    """
+    Speech synthesis backend.
+    synthesize() turns one sentence into mono int16 PCM at self.sample_rate.
+    """
+
+    name = "base"
+    sample_rate = 22050
+
+    def __init__(self, voice: Optional[str] = None, rate: Optional[int] = None):
+        self.voice = voice or settings.TTS_VOICE
+        self.rate = rate or settings.TTS_RATE
+
+    @classmethod
+    def available(cls) -> bool:
+        return False
+
+    def synthesize(self, text: str) -> np.ndarray:
+        raise NotImplementedError
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng (or espeak) via its --stdout WAV output."""
+
+    name = "espeak"
+
+    def __init__(self, voice=None, rate=None):
+        super().__init__(voice, rate)
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    @classmethod
+    def available(cls) -> bool:
+        return bool(shutil.which("espeak-ng") or shutil.which("espeak"))
+
+    def synthesize(self, text):
+        result = subprocess.run(
+            [self.binary, "--stdout", "-v", self.voice, "-s", str(self.rate), text],
+            check=True,
+            capture_output=True
+        )
+        pcm, self.sample_rate = _pcm_from_wav_bytes(result.stdout)
+        return pcm
+
+
+class PiperBackend(TTSBackend):
+    """Piper neural TTS, reading raw int16 from --output_raw."""
+
+    name = "piper"
+
+    def __init__(self, voice=None, rate=None, model_path=None):
+        super().__init__(voice, rate)
+        self.model_path = model_path or settings.TTS_PIPER_MODEL
+        self.binary = shutil.which("piper")
+        self.sample_rate = self._read_sample_rate()
+
+    @classmethod
+    def available(cls) -> bool:
+        return bool(shutil.which("piper")) and os.path.exists(settings.TTS_PIPER_MODEL)
+
+    def _read_sample_rate(self):
+        import json
+        config_path = self.model_path + ".json"
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                return int(json.load(f)["audio"]["sample_rate"])
+        except Exception:
+            return 22050
+
+    def synthesize(self, text):
+        # Piper's length_scale is inverse speed; 175 wpm is its natural pace
+        length_scale = 175.0 / float(self.rate)
+        result = subprocess.run(
+            [self.binary, "--model", self.model_path, "--output_raw",
+             "--length_scale", f"{length_scale:.2f}"],
+            input=text.encode("utf-8"),
+            check=True,
+            capture_output=True
+        )
+        return np.frombuffer(result.stdout, dtype=np.int16).copy()
+
+
+class SayBackend(TTSBackend):
+    """macOS 'say', rendered to a temporary WAV instead of the speakers."""
+
+    name = "say"
+
+    @classmethod
+    def available(cls) -> bool:
+        return sys.platform == "darwin" and bool(shutil.which("say"))
+
+    def synthesize(self, text):
+        import tempfile
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+            temp_path = f.name
+        try:
+            subprocess.run(
+                ["say", "-r", str(self.rate), "--data-format=LEI16@22050", "-o", temp_path, text],
+                check=True
+            )
+            with open(temp_path, "rb") as f:
+                pcm, self.sample_rate = _pcm_from_wav_bytes(f.read())
+            return pcm
+        finally:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+
+class NullBackend(TTSBackend):
+    """
+    Silent backend for tests and headless runs.
+    Produces silence roughly as long as the sentence would take to speak,
+    and optionally writes each sentence to output_dir as a WAV file.
+    """
+
+    name = "null"
+    sample_rate = 16000
+
+    def __init__(self, voice=None, rate=None, output_dir=None, seconds_per_word=None):
+        super().__init__(voice, rate)
+        self.output_dir = output_dir
+        # Default pace follows the configured words-per-minute rate
+        self.seconds_per_word = seconds_per_word if seconds_per_word is not None else 60.0 / self.rate
+        self.sentences: List[str] = []
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    def synthesize(self, text):
+        self.sentences.append(text)
+        n_samples = int(len(text.split()) * self.seconds_per_word * self.sample_rate)
+        pcm = np.zeros(max(n_samples, 1), dtype=np.int16)
+
+        if self.output_dir:
+            path = os.path.join(self.output_dir, f"tts_{len(self.sentences):04d}.wav")
+            with wave.open(path, "wb") as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(self.sample_rate)
+                w.writeframes(pcm.tobytes())
+        return pcm
+
+
+BACKENDS = {
+    "piper": PiperBackend,
+    "espeak": EspeakBackend,
+    "say": SayBackend,
+    "null": NullBackend,
+}
+
+
+def create_backend(name: Optional[str] = None) -> TTSBackend:
+    """
+    Build a backend by name. "auto" picks the first available of
+    piper, espeak, say, falling back to null.
+    """
+    name = name or settings.TTS_BACKEND
+    if name != "auto":
+        return BACKENDS[name]()
+
+    for candidate in ("piper", "espeak", "say"):
+        if BACKENDS[candidate].available():
+            return BACKENDS[candidate]()
+
+    print("⚠️ No TTS engine found (install espeak-ng or piper), speech is muted")
+    return NullBackend()
+
+
+# ---------- PLAYBACK ----------
+
+class SoundDevicePlayer:
+    """
+    Plays PCM through PortAudio in small blocks so playback can be cut instantly.
+    One output stream stays open across sentences and replies: opening the
+    device per sentence adds latency and a click at every sentence boundary.
+    """
+
+    block_ms = 50
+
+    def __init__(self):
+        self._stream = None
+        self._sample_rate = None
+
+    def _open(self, sample_rate: int):
+        import sounddevice as sd
+
+        if self._stream is not None and self._sample_rate != sample_rate:
+            self.close()
+        if self._stream is None:
+            self._stream = sd.OutputStream(samplerate=sample_rate, channels=1, dtype='int16')
+            self._sample_rate = sample_rate
+        if not self._stream.active:
+            self._stream.start()
+        return self._stream
+
+    def play(self, pcm: np.ndarray, sample_rate: int, stop_event: threading.Event, on_block=None):
+        """on_block(rms) reports the level of each block as it is played (echo reference)."""
+        stream = self._open(sample_rate)
+        block = int(sample_rate * self.block_ms / 1000)
+        for start in range(0, len(pcm), block):
+            if stop_event.is_set():
+                # Drops what is buffered; the next sentence restarts the stream
+                stream.abort()
+                return
+            chunk = pcm[start:start + block]
+            if on_block is not None:
+                samples = chunk.astype(np.float32) / 32768.0
+                on_block(float(np.sqrt(np.mean(samples * samples))))
+            stream.write(chunk.reshape(-1, 1))
+
+    def end(self):
+        """Nothing more queued: let the buffered tail play out (the stream stays open)."""
+        if self._stream is not None and self._stream.active:
+            self._stream.stop()
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close(ignore_errors=True)
+            self._stream = None
+
+
+class NullPlayer:
+    """Discards audio. With realtime=True it still takes as long as the audio lasts."""
+
+    def __init__(self, realtime: bool = False):
+        self.realtime = realtime
+
+    def play(self, pcm, sample_rate, stop_event, on_block=None):
+        if self.realtime:
+            stop_event.wait(len(pcm) / sample_rate)
+
+    def end(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def create_player(backend: TTSBackend):
+    if isinstance(backend, NullBackend):
+        return NullPlayer()
+    return SoundDevicePlayer()
+
+
+# ---------- SENTENCES ----------
+
+class SentenceSplitter:
+    """
+    Incremental sentence segmentation for streamed LLM text.
+    feed() returns sentences completed so far; flush() returns the remainder.
+    """
+
+    _BOUNDARY = re.compile(r"[.!?]+[\"')\]]*\s+|\n+")
+    _ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "e.g.", "i.e.", "etc.", "no."}
+
+    def __init__(self, min_chars: int = 12):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        sentences = []
+        start = 0
+
+        for match in self._BOUNDARY.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            last_word = candidate.split()[-1].lower() if candidate else ""
+            if len(candidate) < self.min_chars or last_word in self._ABBREVIATIONS:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return [rest] if rest else []
+
+
+def clean_for_speech(text: str) -> str:
+    """Drop markdown symbols the LLM emits that TTS would read aloud."""
+    return re.sub(r"[*#`_]+", "", text).strip()
+
+
+# ---------- ENGINE ----------
+
+class TTSEngine:
+    """
+    Pipelined text-to-speech.
+
+    Text is split into sentences as it arrives; a synthesis thread renders
+    sentence N+1 while a playback thread plays sentence N. Speech therefore
+    starts after the first sentence, not after the whole reply.
+    """
+
+    _DONE = object()
+
+    def __init__(self, backend: Optional[TTSBackend] = None, player=None, cache=None):
+        self.backend = backend or create_backend()
+        self.player = player or create_player(self.backend)
+
+        # Serve repeated sentences from the PCM cache instead of re-synthesising
+        if cache is not None:
+            from core.tts_cache import CachedBackend
+            self.backend = CachedBackend(self.backend, cache)
+
+        self._splitter = SentenceSplitter()
+        self._feed_lock = threading.Lock()
+
+        self._text_queue = queue.Queue()
+        # Small bound keeps synthesis one sentence ahead of playback
+        self._audio_queue = queue.Queue(maxsize=2)
+
+        self._stop_event = threading.Event()
+        # Bumped by stop(); queued work from an older generation is dropped
+        self._generation = 0
+        self._idle = threading.Event()
+        self._idle.set()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+        # Level of what is playing right now, for barge-in echo rejection
+        self.playback_level = 0.0
+
+        # Metrics
+        self._utterance_start = None
+        self.last_time_to_first_audio = None
+        self.on_first_audio: Optional[Callable[[float], None]] = None
+
+        self._running = True
+        self._synth_thread = threading.Thread(target=self._synth_loop, name="tts-synth", daemon=True)
+        self._play_thread = threading.Thread(target=self._play_loop, name="tts-play", daemon=True)
+        self._synth_thread.start()
+        self._play_thread.start()
+
+        print(f"🔊 TTS backend: {self.backend.name}")
+
+    # ---------- INPUT ----------
+
+    def begin_utterance(self):
+        """Start timing a new reply (time-to-first-audio is measured from here)."""
+        self._stop_event.clear()
+        self._utterance_start = time.monotonic()
+        self.last_time_to_first_audio = None
+
+    def feed(self, text: str):
+        """Add streamed text; complete sentences are queued for synthesis."""
+        with self._feed_lock:
+            sentences = self._splitter.feed(text)
+        for sentence in sentences:
+            self._enqueue(sentence)
+
+    def flush(self):
+        """Queue whatever text is left as the final sentence."""
+        with self._feed_lock:
+            sentences = self._splitter.flush()
+        for sentence in sentences:
+            self._enqueue(sentence)
+
+    def speak(self, text: str):
+        """Queue a complete reply."""
+        self.feed(text)
+        self.flush()
+
+    def _enqueue(self, sentence):
+        sentence = clean_for_speech(sentence)
+        if not sentence:
+            return
+        with self._pending_lock:
+            self._pending += 1
+            self._idle.clear()
+        self._text_queue.put((self._generation, sentence))
+
+    def _finish_one(self):
+        with self._pending_lock:
+            self._pending -= 1
+            if self._pending <= 0:
+                self._pending = 0
+                self.playback_level = 0.0
+                self._idle.set()
+
+    # ---------- CONTROL ----------
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued has been played (or dropped)."""
+        return self._idle.wait(timeout)
+
+    def stop(self):
+        """Cut playback and drop all queued sentences."""
+        self._generation += 1
+        self._stop_event.set()
+        with self._feed_lock:
+            self._splitter.flush()
+        for q in (self._text_queue, self._audio_queue):
+            while True:
+                try:
+                    item = q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not self._DONE:
+                    self._finish_one()
+
+    def prewarm(self, phrases, background: bool = True):
+        """Pre-synthesise known phrases into the cache (no-op without a cache)."""
+        if not hasattr(self.backend, "prewarm"):
+            return
+
+        def run():
+            count = self.backend.prewarm(phrases)
+            if count:
+                print(f"🔊 Pre-warmed {count} TTS phrases")
+
+        if background:
+            threading.Thread(target=run, name="tts-prewarm", daemon=True).start()
+        else:
+            run()
+
+    def close(self):
+        self.stop()
+        self._running = False
+        self._text_queue.put(self._DONE)
+        self._synth_thread.join(timeout=1.0)
+        self._play_thread.join(timeout=1.0)
+        self.player.close()
+
+    @property
+    def is_speaking(self) -> bool:
+        return not self._idle.is_set()
+
+    # ---------- WORKERS ----------
+
+    def _synth_loop(self):
+        while self._running:
+            item = self._text_queue.get()
+            if item is self._DONE:
+                self._audio_queue.put(self._DONE)
+                return
+            generation, sentence = item
+            if generation != self._generation:
+                self._finish_one()
+                continue
+            try:
+                with tracing.tracer.span("tts.synthesize"):
+                    pcm = self.backend.synthesize(sentence)
+            except Exception as e:
+                print(f"Error in TTS: {e}")
+                self._finish_one()
+                continue
+            self._audio_queue.put((generation, pcm, self.backend.sample_rate))
+
+    def _play_loop(self):
+        while True:
+            item = self._audio_queue.get()
+            if item is self._DONE:
+                return
+            generation, pcm, sample_rate = item
+            try:
+                if generation == self._generation:
+                    self._mark_first_audio()
+                    self.player.play(pcm, sample_rate, self._stop_event, self._on_block)
+            except Exception as e:
+                print(f"Error in TTS playback: {e}")
+            finally:
+                if self._pending <= 1:
+                    # Last sentence queued: wait for its tail before reporting idle
+                    try:
+                        self.player.end()
+                    except Exception as e:
+                        print(f"Error in TTS playback: {e}")
+                self._finish_one()
+
+    def _on_block(self, rms: float):
+        # Peak-hold with decay covers the acoustic delay back into the mic
+        self.playback_level = max(rms, self.playback_level * 0.7)
+
+    def _mark_first_audio(self):
+        if self._utterance_start is None or self.last_time_to_first_audio is not None:
+            return
+        self.last_time_to_first_audio = time.monotonic() - self._utterance_start
+        if self.on_first_audio is not None:
+            self.on_first_audio(self.last_time_to_first_audio)
@@ -0,0 +1,251 @@
+import hashlib
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import numpy as np
+
+from config import settings
+
+# On-disk entry: 16-byte header followed by raw little-endian int16 PCM
+_MAGIC = b"PMPCM\x00\x01\x00"
+_HEADER = struct.Struct("<8sII")   # magic, sample_rate, n_samples
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesised speech.
+
+    Entries are keyed by a hash of (backend, voice, rate, text).
+    Tier 1 is an in-memory LRU bounded in bytes. Tier 2 is a directory of
+    raw PCM files that are memory-mapped on read, so replaying a cached
+    phrase costs no decode and no copy. A phrase is written to disk once it
+    has been used persist_after times, or immediately when pre-warmed.
+    Use counts are kept for the max_tracked most recent phrases only.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None,
+                 max_memory_bytes: Optional[int] = None,
+                 max_disk_bytes: Optional[int] = None,
+                 persist_after: int = 2, max_tracked: int = 4096):
+        self.cache_dir = cache_dir or settings.TTS_CACHE_DIR
+        self.max_memory_bytes = max_memory_bytes or settings.TTS_CACHE_MEMORY_MB * 1024 * 1024
+        self.max_disk_bytes = max_disk_bytes or settings.TTS_CACHE_DISK_MB * 1024 * 1024
+        self.persist_after = persist_after
+        self.max_tracked = max_tracked
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._memory = OrderedDict()   # key -> (pcm, sample_rate)
+        self._memory_bytes = 0
+        self._seen = OrderedDict()     # key -> times synthesised or served (LRU, max_tracked)
+        self._lock = threading.Lock()
+
+        # Stats
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(text: str, voice: str, rate, backend: str) -> str:
+        normalized = " ".join(text.split())
+        raw = f"{backend}\x1f{voice}\x1f{rate}\x1f{normalized}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pcm")
+
+    # ---------- LOOKUP ----------
+
+    def has(self, key: str) -> bool:
+        """True if key is cached in memory or on disk (does not count as a hit)."""
+        with self._lock:
+            if key in self._memory:
+                return True
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str):
+        """Return (pcm, sample_rate) or None."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                persist = self._count_use(key) == self.persist_after and not isinstance(entry[0], np.memmap)
+
+        if entry is not None:
+            # A phrase that keeps coming back is worth keeping across restarts
+            if persist and not os.path.exists(self._path(key)):
+                self._write_to_disk(key, entry[0], entry[1])
+            else:
+                self._touch(key)
+            return entry
+
+        entry = self._load_from_disk(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, entry)
+        self._touch(key)
+        return entry
+
+    def _touch(self, key):
+        """Mark a cached file as just used (atime isn't updated on noatime mounts)"""
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _load_from_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                magic, sample_rate, n_samples = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                return None
+            if n_samples == 0:
+                return np.zeros(0, dtype=np.int16), sample_rate
+            pcm = np.memmap(path, dtype="<i2", mode="r", offset=_HEADER.size, shape=(n_samples,))
+            return pcm, sample_rate
+        except (OSError, ValueError, struct.error):
+            return None
+
+    # ---------- STORE ----------
+
+    def put(self, key: str, pcm: np.ndarray, sample_rate: int, persist: bool = False):
+        """Cache a synthesis result; write it to disk if persistent or seen often."""
+        pcm = np.ascontiguousarray(pcm, dtype=np.int16)
+
+        with self._lock:
+            self._remember(key, (pcm, sample_rate))
+            persist = self._count_use(key) >= self.persist_after or persist
+
+        if persist and not os.path.exists(self._path(key)):
+            self._write_to_disk(key, pcm, sample_rate)
+
+    def _count_use(self, key) -> int:
+        """Count one more use of key (lock held); forgets the least recently used keys."""
+        count = self._seen.pop(key, 0) + 1
+        self._seen[key] = count
+        while len(self._seen) > self.max_tracked:
+            self._seen.popitem(last=False)
+        return count
+
+    def _remember(self, key, entry):
+        """Insert into the memory LRU (lock held)."""
+        pcm, _ = entry
+        # Memory-mapped entries live in the page cache, not on our heap
+        size = 0 if isinstance(pcm, np.memmap) else pcm.nbytes
+
+        old = self._memory.pop(key, None)
+        if old is not None and not isinstance(old[0], np.memmap):
+            self._memory_bytes -= old[0].nbytes
+
+        self._memory[key] = entry
+        self._memory_bytes += size
+
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            if not isinstance(evicted, np.memmap):
+                self._memory_bytes -= evicted.nbytes
+
+    def _write_to_disk(self, key, pcm, sample_rate):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, int(sample_rate), len(pcm)))
+                f.write(pcm.astype("<i2", copy=False).tobytes())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"TTS cache write failed: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        self._enforce_disk_budget()
+
+    def _enforce_disk_budget(self):
+        """Delete least recently used files (by mtime, see _touch()) once the directory exceeds its budget."""
+        try:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".pcm"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        except OSError:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+
+
+class CachedBackend:
+    """Wraps a TTSBackend so repeated sentences are served from a TTSCache."""
+
+    def __init__(self, backend, cache: TTSCache):
+        self.backend = backend
+        self.cache = cache
+        self.name = backend.name
+        self.sample_rate = backend.sample_rate
+
+    def _key(self, text):
+        return self.cache.make_key(text, self.backend.voice, self.backend.rate, self.backend.name)
+
+    def synthesize(self, text: str, persist: bool = False):
+        key = self._key(text)
+        entry = self.cache.get(key)
+        if entry is None:
+            pcm = self.backend.synthesize(text)
+            entry = (pcm, self.backend.sample_rate)
+            self.cache.put(key, pcm, self.backend.sample_rate, persist=persist)
+
+        pcm, self.sample_rate = entry
+        return pcm
+
+    def prewarm(self, phrases: Iterable[str]):
+        """Synthesise known phrases ahead of time, sentence by sentence as the engine speaks them."""
+        from core.tts import SentenceSplitter, clean_for_speech
+
+        count = 0
+        for phrase in phrases:
+            splitter = SentenceSplitter()
+            for sentence in splitter.feed(phrase) + splitter.flush():
+                sentence = clean_for_speech(sentence)
+                if not sentence:
+                    continue
+                if not self.cache.has(self._key(sentence)):
+                    try:
+                        self.synthesize(sentence, persist=True)
+                        count += 1
+                    except Exception as e:
+                        print(f"TTS prewarm failed for '{sentence[:30]}': {e}")
+        return count
@@ -0,0 +1,123 @@
+from collections import Counter
+from typing import Iterable, List, Optional
+
+from config import settings
+
+
+# ---------- WHISPER SEGMENTS ----------
+# PocketSTT hands back one dict per segment: text, no_speech_prob, avg_logprob,
+# start, end. Noise that Whisper turns into "Thank you." or "You" comes back
+# as a segment it either thinks is silence or barely believes itself.
+
+def segment_is_confident(segment: dict, no_speech_threshold: Optional[float] = None,
+                         logprob_threshold: Optional[float] = None) -> bool:
+    """Whether a Whisper segment is speech it actually decoded, not a guess over noise"""
+    if no_speech_threshold is None:
+        no_speech_threshold = settings.STT_NO_SPEECH_THRESHOLD
+    if logprob_threshold is None:
+        logprob_threshold = settings.STT_LOGPROB_THRESHOLD
+    return (segment['no_speech_prob'] <= no_speech_threshold
+            and segment['avg_logprob'] >= logprob_threshold)
+
+
+def confident_text(segments: Iterable[dict], **thresholds) -> str:
+    """The text of the confident segments, joined"""
+    return " ".join(s['text'].strip() for s in segments
+                    if segment_is_confident(s, **thresholds) and s['text'].strip())
+
+
+class TurnGate:
+    """
+    Decides, as cheaply as possible, whether an utterance deserves a turn.
+
+    Before STT: the endpointer's stats for the utterance (see
+    Endpointer.utterance_stats()) must show enough speech, voiced densely
+    enough, with a confident enough VAD. A cough, a door slam or a burst of
+    TV noise fails one of these and never costs a Whisper decode.
+
+    After STT: a transcript whose Whisper segments were all dropped for low
+    confidence never costs an LLM turn.
+
+    Counts what it rejected, and so how many decodes and LLM turns it saved.
+    """
+
+    def __init__(self, min_speech_seconds: float = 0.3, min_voiced_ratio: float = 0.4,
+                 min_vad_probability: float = 0.6, enabled: bool = True):
+        self.min_speech_seconds = min_speech_seconds
+        self.min_voiced_ratio = min_voiced_ratio
+        self.min_vad_probability = min_vad_probability
+        self.enabled = enabled
+
+        # Stats
+        self.utterances = 0
+        self.rejected_before_stt = 0
+        self.rejected_after_stt = 0
+        self.stt_seconds_saved = 0.0      # audio never sent to Whisper
+        self.reasons = Counter()
+
+    @classmethod
+    def from_settings(cls) -> "TurnGate":
+        return cls(min_speech_seconds=settings.GATE_MIN_SPEECH_SECONDS,
+                   min_voiced_ratio=settings.GATE_MIN_VOICED_RATIO,
+                   min_vad_probability=settings.GATE_MIN_VAD_PROBABILITY,
+                   enabled=settings.GATE_ENABLED)
+
+    # ---------- BEFORE STT ----------
+
+    def reasons_to_reject(self, stats: dict) -> List[str]:
+        """Which acoustic checks an utterance fails (empty = worth decoding)"""
+        reasons = []
+        if stats['speech_seconds'] < self.min_speech_seconds:
+            reasons.append("too short")
+        if stats['voiced_ratio'] < self.min_voiced_ratio:
+            reasons.append("sparse")
+        if stats['mean_probability'] < self.min_vad_probability:
+            reasons.append("low vad")
+        return reasons
+
+    def check_audio(self, stats: Optional[dict]) -> Optional[str]:
+        """None to decode the utterance, else why it was rejected"""
+        self.utterances += 1
+        if not self.enabled or stats is None:
+            return None
+        reasons = self.reasons_to_reject(stats)
+        if not reasons:
+            return None
+        self.rejected_before_stt += 1
+        self.stt_seconds_saved += stats['seconds']
+        self.reasons.update(reasons)
+        return ", ".join(reasons)
+
+    # ---------- AFTER STT ----------
+
+    def check_transcript(self, result: dict) -> Optional[str]:
+        """
+        None to answer a transcript (or to ignore an empty one as before),
+        else why it was rejected: Whisper heard something and trusted none of it.
+        """
+        if not self.enabled or result['text'] or not result['dropped']:
+            return None
+        self.rejected_after_stt += 1
+        self.reasons["low confidence"] += 1
+        return "low confidence"
+
+    # ---------- STATS ----------
+
+    def stats(self) -> dict:
+        return {
+            "utterances": self.utterances,
+            "rejected_before_stt": self.rejected_before_stt,
+            "rejected_after_stt": self.rejected_after_stt,
+            "stt_seconds_saved": round(self.stt_seconds_saved, 2),
+            "llm_turns_saved": self.rejected_before_stt + self.rejected_after_stt,
+            "reasons": dict(self.reasons),
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        line = (f"🚪 Turn gate: {s['llm_turns_saved']} of {s['utterances']} utterances rejected "
+                f"({s['rejected_before_stt']} before STT, {s['stt_seconds_saved']:.1f}s not decoded; "
+                f"{s['rejected_after_stt']} after STT)")
+        if s["reasons"]:
+            line += "\n    " + ", ".join(f"{reason}: {n}" for reason, n in self.reasons.most_common())
+        return line
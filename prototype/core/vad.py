@@ -1,22 +1,25 @@
 import onnxruntime
 import numpy as np
-import os
 from config import settings
+from core import tracing
 
 class SileroVAD:
     def __init__(self, model_path=None):
         if model_path is None:
             # Default to the downloaded path
-            model_path = os.path.join("models", "onnx", "model.onnx")
+            model_path = settings.VAD_MODEL_PATH
             
         print(f"Loading VAD model from {model_path}...")
         
         # Initialize ONNX Runtime
         opts = onnxruntime.SessionOptions()
         opts.log_severity_level = 3
+        # Shares the CPU with Whisper and the LLM: keep to its thread budget
+        opts.intra_op_num_threads = settings.VAD_THREADS
+        opts.inter_op_num_threads = 1
         
         try:
-            self.session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+            self.session = onnxruntime.InferenceSession(model_path, sess_options=opts, providers=['CPUExecutionProvider'])
             print("ONNX Inputs:", [i.name for i in self.session.get_inputs()])
         except Exception as e:
             print(f"Error loading VAD ONNX: {e}")
@@ -27,7 +30,7 @@ class SileroVAD:
         self.reset_states()
         
         # Audio params
-        self.sr = 16000
+        self.sr = settings.SAMPLE_RATE
 
     def reset_states(self):
         """Resets the internal hidden states of the RNN."""
@@ -71,6 +74,24 @@ class SileroVAD:
             print(f"VAD Error: {e}")
             return 0.0
 
+    def fork(self):
+        """
+        A VAD with its own RNN state that shares this one's ONNX session
+        (one per client stream in the voice server; session.run is thread-safe).
+        """
+        clone = object.__new__(SileroVAD)
+        clone.session = self.session
+        clone.sr = getattr(self, "sr", 16000)
+        clone.reset_for_new_utterance()
+        return clone
+
+    def warmup(self):
+        """Run one silent frame so the first real frame isn't a cold ONNX call"""
+        if self.session is None:
+            return
+        self.is_speech(np.zeros(512, dtype=np.float32))
+        self.reset_states()
+
     def validate_chunk_size(self, size):
         """Silero allows 512, 1024, 1536 samples for 16k."""
         return size in [512, 1024, 1536]
@@ -83,7 +104,8 @@ class SileroVAD:
             - 'is_speech': boolean
             - 'event': 'speech_start', 'speech_end', or None
         """
-        prob = self.is_speech(audio_frame, threshold)
+        with tracing.tracer.span("vad.frame"):
+            prob = self.is_speech(audio_frame, threshold)
         is_speech_now = prob > threshold
         
         # Detect events
@@ -2,248 +2,715 @@
 """
 PocketMindly - FULL Streaming Voice Assistant
 Complete streaming pipeline: VAD + STT both run in real-time.
+
+Stages (joined by bounded asyncio queues on one long-lived event loop):
+    capture -> VAD/endpoint -> STT -> route -> search -> LLM -> TTS
 """
 
+import argparse
 import time
+import threading
+import wave
 import numpy as np
-import scipy.io.wavfile as wav
 import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from functools import partial
 from core.audio_stream import AudioStream
-from core.vad import SileroVAD
 from core.state_machine import StateMachine, State
-from core.stt import PocketSTT
-from core.llm import PocketLLM
-from core.audio import speak_text
+from core.llm_server import LLMServer, RemoteLLM
+from core.router import IntentRouter, SEARCH, BORDERLINE
+from core.tts import TTSEngine
+from core.tts_cache import TTSCache
+from core.endpointer import Endpointer
+from core.turn_gate import TurnGate
+from core.pipeline import EventLoopThread, Pipeline, Turn
+from core import tracing
+from core.startup import StartupTimeline
+from core.memory import MemoryGovernor, process_rss_mb
 from tools.web_search import AsyncWebSearchTool
+from tools.search_prefetch import SearchPrefetcher, RateLimiter
+from config import settings
+from prompt_templates.prompts import CANNED_REPLIES, LLM_ERROR_REPLY, OFFLINE_REPLY, SEARCH_ERROR_REPLY
 
 class FullStreamingAssistant:
-    def __init__(self):
+    def __init__(self, audio_source=None, vad=None, stt=None, llm=None, web_tool=None, tts=None):
+        """
+        Components default to the real models; pass stand-ins to run headless
+        (benchmarks replay WAV files through stub VAD/STT/LLM and a null TTS).
+        """
         print("🚀 Initializing PocketMindly (Full Streaming)...")
+        if settings.TUNED_PROFILE:
+            tuned = settings.TUNED_PROFILE.get("settings", {})
+            print(f"⚙️  Tuned profile ({settings.TUNED_PROFILE.get('created', '?')}): "
+                  + ", ".join(f"{k}={v}" for k, v in tuned.items()))
+        self.timeline = StartupTimeline()
+        self.memory = MemoryGovernor(check_interval=settings.MEMORY_CHECK_INTERVAL)
+        
+        # Load the three models in parallel; STT and LLM may still be loading
+        # when the microphone comes up (their stages wait for them)
+        self.vad = self.stt = self.llm = self.llm_server = None
+        loader = ThreadPoolExecutor(max_workers=3, thread_name_prefix="load")
+        vad_future = loader.submit(self._load_vad, vad)
+        self._loading = {
+            "stt": loader.submit(self._load_stt, stt),
+            "llm": loader.submit(self._load_llm, llm),
+        }
+        loader.shutdown(wait=False)
+        
+        # One event loop for the whole session (searches, stages, timers)
+        self.runtime = EventLoopThread()
         
         # Core components
-        self.audio_stream = AudioStream(sample_rate=16000, frame_duration_ms=30)
-        self.vad = SileroVAD()
+        self.sample_rate = settings.SAMPLE_RATE
+        self.audio_stream = AudioStream(sample_rate=self.sample_rate, frame_duration_ms=settings.FRAME_MS,
+                                        source=audio_source)
         self.state_machine = StateMachine()
-        self.stt = PocketSTT()
-        self.llm = PocketLLM()
-        self.web_tool = AsyncWebSearchTool()
+        self.router = IntentRouter.from_config()
+        self.web_tool = web_tool or AsyncWebSearchTool()
+        self.prefetcher = SearchPrefetcher(
+            self.web_tool,
+            limiter=RateLimiter(settings.SEARCH_PREFETCH_RATE, settings.SEARCH_PREFETCH_BURST),
+            loop=self.runtime.loop
+        )
+        self.tts = tts or TTSEngine(cache=TTSCache() if settings.TTS_CACHE_ENABLED else None)
+        if settings.TTS_PREWARM:
+            self.tts.prewarm(CANNED_REPLIES + settings.TTS_PREWARM_PHRASES)
+        self.tts.on_first_audio = self._on_first_audio
+        self._speaking = False
+        
+        # Barge-in: user speech during SPEAKING interrupts the reply
+        self._active_turn = None
+        self._barge_in_frames = deque(maxlen=settings.BARGE_IN_PREROLL_FRAMES)
+        self._barge_in_count = 0
+        
+        # The microphone needs the VAD, nothing else
+        vad_future.result()
         
         # State tracking
-        self.silence_start = None
-        self.silence_threshold = 1.5  # 1.5 seconds (more forgiving)
-        self.recording_buffer = []
+        self.silence_threshold = settings.SILENCE_THRESHOLD
+        self.endpointer = Endpointer(self.vad, sample_rate=self.sample_rate, silence_threshold=self.silence_threshold,
+                                     vad_threshold=settings.VAD_THRESHOLD)
+        # False triggers stop here instead of costing a Whisper decode or an LLM turn
+        self.gate = TurnGate.from_settings()
         self.is_running = True
+        self._speech_start_time = None
         
         # Streaming STT state
-        self.stt_buffer_size = 1.0  # Process STT every 1 second of audio
+        self.stt_buffer_size = settings.PARTIAL_STT_INTERVAL  # seconds of audio per partial decode
         self.stt_buffer = []
         self.last_partial_text = ""
+        self.committed_partial_text = ""
+        self._partial_query = ""
+        
+        # Staged pipeline; each blocking stage gets its own executor
+        workers = settings.PIPELINE_WORKERS
+        self.pipeline = Pipeline(self.runtime, on_error=self._on_stage_error)
+        self._vad_stage = self.pipeline.add_stage("vad", self.vad_stage, queue_size=settings.PIPELINE_FRAME_QUEUE, workers=workers["vad"])
+        self._stt_stage = self.pipeline.add_stage("stt", self.stt_stage, queue_size=settings.PIPELINE_TURN_QUEUE, workers=workers["stt"])
+        self._route_stage = self.pipeline.add_stage("route", self.route_stage, queue_size=settings.PIPELINE_TURN_QUEUE, workers=workers["route"])
+        self._search_stage = self.pipeline.add_stage("search", self.search_stage, queue_size=settings.PIPELINE_TURN_QUEUE, workers=workers["search"])
+        self._llm_stage = self.pipeline.add_stage("llm", self.llm_stage, queue_size=settings.PIPELINE_TURN_QUEUE, workers=workers["llm"])
+        self._tts_stage = self.pipeline.add_stage("tts", self.tts_stage, queue_size=settings.PIPELINE_TURN_QUEUE, workers=workers["tts"])
         
         # Subscribe to audio frames
         self.audio_stream.subscribe(self.on_audio_frame)
+        self.journal = self.audio_stream.journal
         
-        print("✅ System Ready\n")
+        threading.Thread(target=self._report_startup, name="startup-report", daemon=True).start()
+        loading = [name.upper() for name, f in self._loading.items() if not f.done()]
+        note = f" ({', '.join(loading)} still loading)" if loading else ""
+        print(f"✅ System Ready{note}\n")
+    
+    # ---------- STARTUP ----------
+    
+    # Each model is registered with the memory governor; the loaders run again
+    # whenever an idle-evicted model is needed
+    
+    def _load_vad(self, vad):
+        def load():
+            model = vad
+            with self.timeline.step("vad load"):
+                if model is None:
+                    from core.vad import SileroVAD
+                    model = SileroVAD()
+            if settings.STARTUP_WARMUP and hasattr(model, "warmup"):
+                with self.timeline.step("vad warm-up"):
+                    model.warmup()
+            return model
+        
+        # Runs on every frame: always resident, used directly
+        self.vad = self.memory.register("vad", load).load()
+    
+    def _load_stt(self, stt):
+        def load():
+            model = stt
+            with self.timeline.step("stt load"):
+                if model is None:
+                    from core.stt import PocketSTT
+                    model = PocketSTT()
+            if settings.STARTUP_WARMUP and hasattr(model, "warmup"):
+                with self.timeline.step("stt warm-up"):
+                    model.warmup()
+            return model
+        
+        self.stt = self.memory.register("stt", load, idle_timeout=settings.MEMORY_IDLE_TIMEOUTS.get("stt"))
+        if not settings.MEMORY_LAZY_LOAD:
+            self.stt.load()
+    
+    def _load_llm(self, llm):
+        def load():
+            model = llm
+            with self.timeline.step("llm load"):
+                if model is None and settings.LLM_OUT_OF_PROCESS:
+                    # The GGUF model runs in its own process
+                    self.llm_server = LLMServer().start()
+                    model = RemoteLLM(self.llm_server)
+                elif model is None:
+                    # Imported here so stubbed runs don't need llama-cpp
+                    from core.llm import PocketLLM
+                    model = PocketLLM()
+            if settings.STARTUP_WARMUP and hasattr(model, "warmup"):
+                with self.timeline.step("llm warm-up"):
+                    model.warmup()
+            return model
+        
+        def unload(model):
+            # Stopping the process returns all of its memory; the mmapped GGUF
+            # stays in the page cache, so the next start is quick
+            if isinstance(model, RemoteLLM):
+                model.server.stop()
+                if self.llm_server is model.server:
+                    self.llm_server = None
+        
+        def rss():
+            # Out of process the footprint is exact: the server's own RSS
+            return process_rss_mb(self.llm_server.pid) if self.llm_server is not None else 0.0
+        
+        self.llm = self.memory.register(
+            "llm", load, unloader=unload,
+            idle_timeout=settings.MEMORY_IDLE_TIMEOUTS.get("llm"),
+            rss_fn=rss if llm is None and settings.LLM_OUT_OF_PROCESS else None
+        )
+        if not settings.MEMORY_LAZY_LOAD:
+            self.llm.load()
+    
+    def _report_startup(self):
+        """Print the startup timeline once every model is loaded"""
+        wait_futures(list(self._loading.values()))
+        for name, future in self._loading.items():
+            if future.exception() is not None:
+                print(f"❌ {name.upper()} failed to load: {future.exception()}")
+        print(f"\n⏱️  Startup timeline ({self.timeline.elapsed:.2f}s):")
+        print(self.timeline.report())
+        print("\n📦 Memory:")
+        print(self.memory.report())
+        self.memory.start()
+    
+    def _wait_loaded(self, name: str) -> bool:
+        """Block until a background-loaded (or evicted) model is ready; False if it failed to load"""
+        future = self._loading[name]
+        if not future.done():
+            print(f"⏳ Waiting for {name.upper()} to finish loading...")
+        try:
+            future.result()
+            model = self.memory.models[name]
+            if not model.loaded:
+                print(f"⏳ Loading {name.upper()}...")
+                model.load()
+        except Exception as e:
+            print(f"❌ {name.upper()} unavailable: {e}")
+            return False
+        return True
+    
+    async def _wait_loaded_async(self, name: str) -> bool:
+        future = self._loading[name]
+        if not future.done():
+            print(f"⏳ Waiting for {name.upper()} to finish loading...")
+        try:
+            await asyncio.wrap_future(future)
+            model = self.memory.models[name]
+            if not model.loaded:
+                print(f"⏳ Loading {name.upper()}...")
+                await asyncio.get_running_loop().run_in_executor(None, model.load)
+        except Exception as e:
+            print(f"❌ {name.upper()} unavailable: {e}")
+            return False
+        return True
+    
+    # ---------- CAPTURE ----------
     
     def on_audio_frame(self, audio_chunk: np.ndarray):
-        """Process each audio frame from the stream"""
+        """Capture stage: hand each frame to the pipeline without blocking the audio callback"""
+        # With its stream position (the sample after it), so events land exactly in the journal,
+        # and the AGC gain it got, so barge-in can compare the raw mic level with the echo.
+        # Faster-than-real-time replay waits for the VAD stage instead of dropping frames
+        dsp = self.audio_stream.dsp
+        gain = dsp.gain if dsp else 1.0
+        self.pipeline.feed((self.audio_stream.position, audio_chunk, gain), block=not self.audio_stream.realtime)
+    
+    # ---------- VAD / ENDPOINT ----------
+    
+    def vad_stage(self, item):
+        """Run VAD and endpointing on one (position, frame, input gain). Returns a Turn when an utterance ends."""
+        position, audio_chunk, gain = item
         current_state = self.state_machine.state
         
+        # While speaking, only listen for the user interrupting
+        if current_state == State.SPEAKING and settings.BARGE_IN_ENABLED:
+            self._check_barge_in(audio_chunk, position, gain)
+            return None
+        
         # Only process when listening or recording
         if current_state not in [State.LISTENING, State.RECORDING]:
-            return
+            return None
         
-        # Run VAD
-        result = self.vad.process_frame(audio_chunk)
-        is_speech = result['is_speech']
-        event = result['event']
+        result = self.endpointer.process(audio_chunk)
         
         # Handle speech start
-        if event == 'speech_start':
-            if current_state == State.LISTENING:
-                print("\n🎤 Recording...")
-                self.state_machine.transition(State.RECORDING)
-                self.recording_buffer = []
-                self.stt_buffer = []
-                self.last_partial_text = ""
-                self.silence_start = None
-        
-        # Buffer audio if recording
-        if current_state == State.RECORDING:
-            self.recording_buffer.append(audio_chunk)
-            self.stt_buffer.append(audio_chunk)
+        if result['event'] == 'speech_start' and current_state == State.LISTENING:
+            print("\n🎤 Recording...")
+            self._speech_start_time = time.monotonic()
+            # Bring back anything evicted while the user is still talking
+            self.memory.preload()
+            self.state_machine.transition(State.RECORDING)
+            self.stt_buffer = []
+            self.last_partial_text = ""
+            self.committed_partial_text = ""
+            self._partial_query = ""
+            if self.journal:
+                self.journal.mark("speech_start", position - len(audio_chunk))
+        
+        if result['event'] == 'speech_end':
+            self.state_machine.transition(State.PROCESSING)
+            turn = Turn(audio=result['audio'])
+            turn.span = (position - len(turn.audio), position)
+            if self._speech_start_time is not None:
+                turn.marks['speech_start'] = self._speech_start_time
+            turn.mark('vad_endpoint')
+            if self.journal:
+                self.journal.mark("speech_end", position, start=turn.span[0], turn=turn.id)
             
-            # Process STT streaming (every 1 second)
-            buffer_duration = len(self.stt_buffer) * len(audio_chunk) / 16000
+            # Coughs, bangs and TV noise: not worth a decode
+            reason = self.gate.check_audio(result['stats'])
+            if reason:
+                self._reject(turn, f"{result['stats']['seconds']:.1f}s, {reason}", reason)
+                return None
+            return turn
+        
+        # Partial STT while recording (every 1 second)
+        if self.endpointer.recording:
+            self.stt_buffer.append(audio_chunk)
+            buffer_duration = len(self.stt_buffer) * len(audio_chunk) / self.sample_rate
             if buffer_duration >= self.stt_buffer_size:
-                self.process_partial_stt()
-            
-            # Track silence for end detection
-            if not is_speech:
-                if self.silence_start is None:
-                    self.silence_start = time.time()
-                else:
-                    silence_duration = time.time() - self.silence_start
-                    if silence_duration >= self.silence_threshold:
-                        self.on_speech_end()
-            else:
-                self.silence_start = None
+                audio_data = np.concatenate(self.stt_buffer)
+                # Keep only last 0.5s for context
+                keep_samples = int(self.sample_rate * 0.5)
+                self.stt_buffer = [audio_data[-keep_samples:]] if len(audio_data) > keep_samples else []
+                self.process_partial_stt(audio_data)
+        
+        return None
     
-    def process_partial_stt(self):
+    def process_partial_stt(self, audio_data: np.ndarray):
         """Process accumulated audio for partial transcript"""
         # DISABLED: Partial transcripts are too noisy and distracting
         # They cause more confusion than help
         # Final transcript on speech end is sufficient
-        return
-        
-        if not self.stt_buffer:
+        # Exception: partials may still be decoded (silently) to prefetch searches
+        if not (settings.SEARCH_PREFETCH_ENABLED and settings.SEARCH_PREFETCH_ON_PARTIALS):
             return
         
-        # Concatenate buffer
-        audio_data = np.concatenate(self.stt_buffer)
-        
-        # Get partial transcript
-        result = self.stt.transcribe_stream(audio_data, sample_rate=16000)
+        # Decode on the STT executor so VAD keeps up with the microphone
+        self._stt_stage.executor.submit(self._partial_prefetch, audio_data)
+    
+    def _partial_prefetch(self, audio_data: np.ndarray):
+        """Decode a partial transcript and prefetch a search once its query is stable"""
+        if not self._loading["stt"].done():
+            return
+        result = self.stt.transcribe_stream(audio_data, sample_rate=self.sample_rate)
         partial_text = result['text']
         
-        # Only show if different from last
+        # Text is "committed" once two consecutive partials agree on it
         if partial_text and partial_text != self.last_partial_text:
-            print(f"\r💬 {partial_text}...", end="", flush=True)
+            committed = self._common_prefix(self.last_partial_text, partial_text)
+            if committed:
+                self.committed_partial_text = committed
             self.last_partial_text = partial_text
+        if not self.committed_partial_text:
+            return
         
-        # Keep only last 0.5s for context
-        keep_samples = int(16000 * 0.5)
-        if len(audio_data) > keep_samples:
-            self.stt_buffer = [audio_data[-keep_samples:]]
+        # Search only once the routed query stops growing ("the" -> "the president of ...");
+        # each speculative search spends a rate-limiter token the final query may need
+        route = self.router.route(self.committed_partial_text)
+        query = route['query'] if route['needs_search'] else ""
+        if query and query == self._partial_query:
+            self.prefetcher.prefetch(query)
+        self._partial_query = query
+    
+    @staticmethod
+    def _common_prefix(a: str, b: str) -> str:
+        """Longest common word prefix of two partial transcripts"""
+        words = []
+        for wa, wb in zip(a.split(), b.split()):
+            if wa.lower() != wb.lower():
+                break
+            words.append(wb)
+        return " ".join(words)
+    
+    def _check_barge_in(self, audio_chunk: np.ndarray, position: int, gain: float = 1.0):
+        """
+        Detect the user talking over TTS.
+        Needs a confident VAD decision and more mic energy than the speaker echo
+        would explain, for several consecutive frames. The mic level is taken
+        before the AGC (gain divided out), like the playback level it is compared with.
+        """
+        self._barge_in_frames.append(audio_chunk)
+        
+        prob = self.vad.process_frame(audio_chunk, threshold=settings.BARGE_IN_VAD_THRESHOLD)['probability']
+        mic_rms = float(np.sqrt(np.mean(audio_chunk * audio_chunk))) / gain
+        echo_rms = self.tts.playback_level * settings.BARGE_IN_ECHO_RATIO
+        
+        if prob > settings.BARGE_IN_VAD_THRESHOLD and mic_rms > echo_rms:
+            self._barge_in_count += 1
         else:
-            self.stt_buffer = []
+            self._barge_in_count = 0
+        
+        if self._barge_in_count >= settings.BARGE_IN_CONFIRM_FRAMES:
+            self._barge_in(position)
     
-    def on_speech_end(self):
-        """Handle end of speech - finalize transcript"""
-        if self.state_machine.state != State.RECORDING:
+    def _barge_in(self, position: int):
+        """Cut playback, cancel generation and start recording the interruption"""
+        print("\n✋ Barge-in: stopping playback")
+        if self.journal:
+            self.journal.mark("barge_in", position)
+        if self._active_turn is not None:
+            self._active_turn.cancel.set()
+        self.tts.stop()
+        
+        if not self.state_machine.transition(State.RECORDING):
             return
         
-        self.state_machine.transition(State.PROCESSING)
-        
+        # Keep the frames that triggered the barge-in as the start of the utterance
+        self.endpointer.start(self._barge_in_frames)
+        self.stt_buffer = list(self._barge_in_frames)
+        self.last_partial_text = ""
+        self.committed_partial_text = ""
+        self._partial_query = ""
+        self._barge_in_frames.clear()
+        self._barge_in_count = 0
+        self._speech_start_time = time.monotonic()
+        print("🎤 Recording...")
+    
+    # ---------- STT ----------
+    
+    def stt_stage(self, turn: Turn):
+        """Transcribe a finished utterance"""
         # Save full audio for final transcription
-        audio_data = np.concatenate(self.recording_buffer)
-        audio_int16 = (audio_data * 32767).astype(np.int16)
-        wav.write("input.wav", 16000, audio_int16)
+        audio_int16 = (turn.audio * 32767).astype(np.int16)
+        with wave.open(settings.UTTERANCE_WAV_PATH, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.sample_rate)
+            w.writeframes(audio_int16.tobytes())
+        
+        if not self._wait_loaded("stt"):
+            # Nothing can transcribe this turn; keep listening in case a reload works later
+            self.reset_to_listening()
+            return None
         
         # Final transcription
         print("\n💭 Finalizing...", end="", flush=True)
-        user_text = self.stt.transcribe("input.wav")
+        result = self.stt.transcribe_detailed(settings.UTTERANCE_WAV_PATH)
+        user_text = result['text']
+        turn.mark('stt_done')
+        if self.journal and turn.span:
+            self.journal.mark("transcript", turn.span[1], turn=turn.id, text=user_text)
+        
+        # Whisper heard something but trusted none of it: not worth an LLM turn
+        reason = self.gate.check_transcript(result)
+        if reason:
+            heard = " ".join(s['text'].strip() for s in result['segments'])
+            self._reject(turn, f"{reason}: {heard!r}", reason)
+            return None
         
         if not user_text:
             print(" [No speech detected]")
             self.reset_to_listening()
-            return
+            return None
         
         print(f"\n👤 You: {user_text}")
+        turn.text = user_text
+        
+        # Kick off the likely search now; the search stage claims it once routing agrees
+        if settings.SEARCH_PREFETCH_ENABLED:
+            route = self.router.route(user_text)
+            if route['needs_search']:
+                self.prefetcher.prefetch(route['query'])
         
-        # Process with LLM
         self.state_machine.transition(State.THINKING)
-        self.process_with_llm(user_text)
-    
-    async def process_with_llm_async(self, user_text: str):
-        """Process user text with LLM and web search if needed (async)"""
-        await asyncio.sleep(0.2)
-        
-        loop = asyncio.get_event_loop()
-        
-        # RULE-BASED SEARCH DETECTION (because Gemma 2B refuses to output SEARCH)
-        # Check if question needs web search
-        user_lower = user_text.lower()
-        
-        # Expanded patterns that indicate need for search
-        search_keywords = [
-            # Question words about people/things
-            "who is", "who's", "what is", "what's", "where is", "where's",
-            # Time-sensitive
-            "latest", "current", "today", "recent", "news",
-            # Information requests
-            "tell me about", "information about", "find", "search",
-            # Specific entities (expand as needed)
-            "modi", "musk", "trump", "biden", "china", "russia", "india"
-        ]
-        
-        needs_search = any(keyword in user_lower for keyword in search_keywords)
-        
-        if needs_search:
-            # Extract search query
-            search_query = user_text
-            for prefix in ["who is ", "who's ", "what is ", "what's ", "tell me about ", "give me ", "find "]:
-                if prefix in user_lower:
-                    search_query = user_text.lower().replace(prefix, "").strip()
-                    break
-            
-            print(f"🔍 Auto-search triggered: {search_query}")
+        return turn
+    
+    def _reject(self, turn: Turn, detail: str, reason: str):
+        """Drop a turn the gate turned down and go back to listening"""
+        print(f"\n🚪 Ignored ({detail})")
+        if self.journal and turn.span:
+            self.journal.mark("rejected", turn.span[1], turn=turn.id, reason=reason)
+        self.reset_to_listening()
+    
+    # ---------- ROUTE ----------
+    
+    def _wants_llm_decision(self, route: dict) -> bool:
+        """Whether this route should be double-checked by the LLM decision pass"""
+        mode = settings.LLM_SEARCH_DECISION
+        if mode == "borderline":
+            # Borderline turns race both paths instead, when racing is on
+            return route['intent'] == BORDERLINE and not settings.BORDERLINE_RACE
+        if mode == "unmatched":
+            return route['intent'] != SEARCH
+        return False
+    
+    async def route_stage(self, turn: Turn):
+        """Decide whether the turn needs a web search"""
+        llm_ready = await self._wait_loaded_async("llm")
+        route = self.router.route(turn.text)
+        turn.route = route
+        turn.needs_search = route['needs_search']
+        turn.search_query = route['query']
+        
+        if not llm_ready:
+            # No model to answer with: say so rather than searching for nothing
+            turn.response = LLM_ERROR_REPLY
+        elif self._wants_llm_decision(route):
+            # Let the LLM settle cases the router can't (a few grammar-constrained tokens)
+            decision = await self._llm_stage.run_blocking(self.llm.decide_search, turn.text)
+            if decision is not None:
+                print(f"🧭 LLM decision: search={decision['search']} {decision['query']}")
+                turn.needs_search = decision['search']
+                turn.search_query = decision['query'] or turn.search_query
+        
+        turn.mark('route_decided')
+        return turn
+    
+    # ---------- SEARCH ----------
+    
+    async def search_stage(self, turn: Turn):
+        """Fetch search context (reusing any prefetch) for turns that need it"""
+        if turn.response is not None:
+            # Canned reply already chosen (LLM unavailable)
+            return turn
+        
+        if turn.route['intent'] == BORDERLINE and settings.BORDERLINE_RACE:
+            # Not sure a search is needed: the LLM stage races it against an offline answer
+            turn.search_task = asyncio.ensure_future(self.prefetcher.get_context(turn.search_query))
+            turn.search_task.add_done_callback(lambda _: turn.mark('search_done'))
+            return turn
+        
+        if not turn.needs_search:
+            return turn
+        
+        print(f"🔍 Auto-search triggered: {turn.search_query}")
+        
+        try:
+            # Run async search (reuses the prefetch if one is in flight)
+            turn.search_context = await self.prefetcher.get_context(turn.search_query)
+            turn.mark('search_done')
+        except Exception as e:
+            # Network error or search failed - give direct offline message
+            error_msg = str(e)
+            if "nodename nor servname" in error_msg or "Cannot connect" in error_msg:
+                print(f"⚠️ Network error: Offline")
+                turn.response = OFFLINE_REPLY
+            else:
+                print(f"⚠️ Search error: {error_msg[:50]}")
+                turn.response = SEARCH_ERROR_REPLY
+        
+        return turn
+    
+    # ---------- LLM ----------
+    
+    def _start_speaking(self):
+        """Enter SPEAKING; without barge-in, stop feeding the mic to VAD while TTS plays"""
+        self._speaking = True
+        self._barge_in_count = 0
+        self._barge_in_frames.clear()
+        if settings.BARGE_IN_ENABLED:
+            # Fresh VAD state so the raised barge-in threshold starts clean
+            self.vad.reset_for_new_utterance()
+        self.state_machine.transition(State.SPEAKING)
+        if not settings.BARGE_IN_ENABLED:
+            self.audio_stream.pause()
+    
+    def _on_token(self, turn: Turn, token: str):
+        """Stream LLM tokens into TTS; speech starts with the first full sentence"""
+        if turn.cancelled:
+            return
+        if 'first_token' not in turn.marks:
+            turn.mark('first_token')
+        if not self._speaking:
+            self._start_speaking()
+        self.tts.feed(token)
+    
+    def _on_first_audio(self, seconds: float):
+        print(f"🔊 First audio after {seconds * 1000:.0f} ms")
+        if self._active_turn is not None:
+            self._active_turn.mark('first_audio')
+    
+    async def _generate(self, turn: Turn, search_context=None, cancel_event=None):
+        """Run one (optionally grounded) generation on the LLM executor, streaming into TTS"""
+        cancel_event = cancel_event or turn.cancel
+        if search_context is None:
+            fn = partial(self.llm.generate_response, turn.text,
+                         cancel_event=cancel_event, on_token=partial(self._on_token, turn))
+        else:
+            fn = partial(self.llm.generate_response_with_search, turn.text, search_context,
+                         cancel_event=cancel_event, on_token=partial(self._on_token, turn))
+        return await self._llm_stage.run_blocking(fn)
+    
+    async def llm_stage(self, turn: Turn):
+        """Generate the answer"""
+        self._active_turn = turn
+        self._speaking = False
+        self.tts.begin_utterance()
+        
+        if turn.response is not None:
+            # Canned reply already chosen (search failed, LLM unavailable)
+            return turn
+        
+        if turn.search_task is not None:
+            turn.response = await self._race_offline_and_search(turn)
+        elif turn.needs_search:
+            search_context = turn.search_context
             
-            try:
-                # Run async search
-                search_context = await self.web_tool.get_context(search_query)
+            # Check if we got valid results
+            if search_context and len(search_context) > 100:
+                # DEBUG: Show search context
+                print(f"[DEBUG] Search context length: {len(search_context)} chars")
+                print(f"[DEBUG] Search context preview: {search_context[:200]}...")
                 
-                # Check if we got valid results
-                if search_context and len(search_context) > 100:
-                    # DEBUG: Show search context
-                    print(f"[DEBUG] Search context length: {len(search_context)} chars")
-                    if len(search_context) > 100:
-                        print(f"[DEBUG] Search context preview: {search_context[:200]}...")
-                    
-                    # Generate answer using search context (in executor)
-                    print("🤔 Generating answer from search...")
-                    loop = asyncio.get_event_loop()
-                    response_text = await loop.run_in_executor(
-                        None, 
-                        self.llm.generate_response_with_search, 
-                        user_text, 
-                        search_context
-                    )
-                else:
-                    # Search returned empty results
-                    print("⚠️ Search returned no results, using LLM")
-                    loop = asyncio.get_event_loop()
-                    response_text = await loop.run_in_executor(None, self.llm.generate_response, user_text)
-                    
-            except Exception as e:
-                # Network error or search failed - give direct offline message
-                error_msg = str(e)
-                if "nodename nor servname" in error_msg or "Cannot connect" in error_msg:
-                    print(f"⚠️ Network error: Offline")
-                    response_text = "I'm currently offline and cannot search the web. Please check your internet connection and try again."
-                else:
-                    print(f"⚠️ Search error: {error_msg[:50]}")
-                    response_text = "The web search encountered an error. Please try again."
+                # Generate answer using search context
+                print("🤔 Generating answer from search...")
+                turn.response = await self._generate(turn, search_context)
+            else:
+                # Search returned empty results
+                print("⚠️ Search returned no results, using LLM")
+                turn.response = await self._generate(turn)
         else:
             # Normal LLM response
             print("🤔 Thinking...")
-            loop = asyncio.get_event_loop()
-            response_text = await loop.run_in_executor(None, self.llm.generate_response, user_text)
-            print(f"[DEBUG] LLM returned: '{response_text}'")
-        
-        print(f"🤖 AI: {response_text}\n")
+            turn.response = await self._generate(turn)
+            print(f"[DEBUG] LLM returned: '{turn.response}'")
         
-        # Speak response
-        self.state_machine.transition(State.SPEAKING)
-        self.audio_stream.pause()
-        
-        # Run TTS in executor (blocking)
-        await loop.run_in_executor(None, speak_text, response_text)
+        return turn
+    
+    async def _race_offline_and_search(self, turn: Turn):
+        """
+        Speculative dual path for borderline intent.
+        The offline answer and the web search start together; the grounded answer
+        wins if search context arrives within the latency budget, otherwise the
+        offline answer is used. The losing path is cancelled.
+        """
+        print(f"🏁 Racing offline answer against search: {turn.search_query}")
+        
+        # Cancelled when the search wins, or with the turn on barge-in
+        cancel_offline = turn.cancel.child()
+        offline_future = self._llm_stage.run_blocking(
+            partial(self.llm.generate_response, turn.text, cancel_event=cancel_offline)
+        )
+        offline_task = asyncio.ensure_future(offline_future)
         
-        self.audio_stream.resume()
-        self.reset_to_listening()
+        try:
+            # wait_for cancels the search if it misses the budget
+            search_context = await asyncio.wait_for(turn.search_task, timeout=settings.BORDERLINE_SEARCH_BUDGET)
+        except asyncio.TimeoutError:
+            print(f"⏱️ Search missed the {settings.BORDERLINE_SEARCH_BUDGET}s budget")
+            search_context = None
+        except Exception as e:
+            print(f"⚠️ Search error: {str(e)[:50]}")
+            search_context = None
+        
+        if search_context and len(search_context) > 100:
+            print("🏁 Search won, cancelling offline answer")
+            # Stops between tokens, which frees the LLM for the grounded answer
+            cancel_offline.set()
+            await offline_task
+            return await self._generate(turn, search_context)
+        
+        print("🏁 Using offline answer")
+        return await offline_task
     
-    def process_with_llm(self, user_text: str):
-        """Wrapper to run async processing"""
-        asyncio.run(self.process_with_llm_async(user_text))
+    # ---------- TTS ----------
+    
+    async def tts_stage(self, turn: Turn):
+        """Speak what wasn't streamed, wait for playback, then listen again"""
+        try:
+            if turn.cancelled:
+                # Barge-in: the user has moved on, drop the rest of this reply
+                print("🤖 AI: [interrupted]\n")
+                return None
+            
+            print(f"🤖 AI: {turn.response}\n")
+            
+            # Speak whatever wasn't streamed (canned messages, race winner)
+            if not self._speaking:
+                self._start_speaking()
+                self.tts.feed(turn.response or "")
+            self.tts.flush()
+            
+            # Wait for playback on this stage's executor
+            await self._tts_stage.run_blocking(self.tts.wait)
+        finally:
+            # Drop any speculative searches this turn didn't use
+            self.prefetcher.discard()
+            self.audio_stream.resume()
+            turn.mark('reply_done')
+            tracing.tracer.finish_turn(
+                turn,
+                intent=turn.route['intent'] if turn.route else None,
+                search=turn.needs_search,
+                cancelled=turn.cancelled
+            )
+        
+        # A barge-in has already moved us on to recording the next utterance
+        if not turn.cancelled:
+            self.reset_to_listening()
+        return None
+    
+    def _on_stage_error(self, stage_name: str, item, error: Exception):
+        """A stage failed on a turn: end the turn instead of leaving the assistant deaf"""
+        if not isinstance(item, Turn):
+            return
+        print(f"⚠️ Turn {item.id} dropped ({stage_name} failed)")
+        barged_in = item.cancelled
+        # Stop whatever this turn still has running (generation, playback, searches)
+        item.cancel.set()
+        if self._active_turn is item:
+            self.tts.stop()
+            self._speaking = False
+        self.prefetcher.discard()
+        self.audio_stream.resume()
+        item.mark('reply_done')
+        tracing.tracer.finish_turn(item, failed=stage_name, cancelled=barged_in)
+        # A barge-in has already moved us on to recording the next utterance
+        if not barged_in:
+            self.reset_to_listening()
     
     def reset_to_listening(self):
         """Reset state for next utterance"""
-        self.vad.reset_for_new_utterance()
-        self.recording_buffer = []
+        self.endpointer.reset()
         self.stt_buffer = []
         self.last_partial_text = ""
-        self.silence_start = None
+        self.committed_partial_text = ""
+        self._partial_query = ""
+        self.state_machine.transition(State.LISTENING)
+        print("👂 Listening...")
+    
+    def start(self):
+        """Start the pipeline, then listening (returns immediately)"""
+        self.pipeline.start()
         self.state_machine.transition(State.LISTENING)
+        self.audio_stream.start()
+        self.timeline.mark("mic up")
+        
         print("👂 Listening...")
     
     def run(self):
@@ -255,19 +722,63 @@ class FullStreamingAssistant:
         print("=" * 60)
         print()
         
-        # Start listening
-        self.state_machine.transition(State.LISTENING)
-        self.audio_stream.start()
-        
-        print("👂 Listening...")
+        self.start()
         
         try:
             while self.is_running:
                 time.sleep(0.1)
         except KeyboardInterrupt:
             print("\n\n👋 Shutting down...")
-            self.audio_stream.stop()
+            self.shutdown()
+    
+    def shutdown(self):
+        """Stop capture, the pipeline and the event loop"""
+        self.audio_stream.close()
+        self.pipeline.stop()
+        self.prefetcher.close()
+        # The search connection pool lives on the runtime loop, so close it there
+        try:
+            self.runtime.submit(self.web_tool.close()).result(timeout=2.0)
+        except Exception as e:
+            print(f"⚠️ Search session not closed: {e}")
+        self.runtime.stop()
+        self.tts.close()
+        self.state_machine.close()
+        self.memory.stop()
+        print("📦 Memory:\n" + self.memory.report())
+        
+        if self.llm_server is not None:
+            try:
+                llm_stats = self.llm_server.stats()
+                print(f"🧠 LLM server: {llm_stats['completed']} done, {llm_stats['cancelled']} cancelled, "
+                      f"{llm_stats['utilisation'] * 100:.0f}% busy")
+            except Exception as e:
+                print(f"⚠️ LLM server stats unavailable: {e}")
+            self.llm_server.stop()
+        
+        if self.gate.utterances:
+            print(self.gate.report())
+        
+        stats = self.prefetcher.stats()
+        if stats["hits"]:
+            print(f"⚡ Search prefetch: {stats['hits']} reused, avg {stats['avg_saved_ms']:.0f} ms saved per search turn")
+        if tracing.tracer.enabled:
+            print("\n📊 Latency (ms from VAD endpoint for turn.*):")
+            print(tracing.tracer.report())
+            tracing.tracer.close()
+            states = self.state_machine.time_in_states()
+            print("⏱️ Time in state: " + ", ".join(f"{name} {secs:.1f}s" for name, secs in states.items()))
+        
+        dropped = self._vad_stage.dropped
+        if dropped:
+            print(f"⚠️ {dropped} audio frames dropped (VAD stage fell behind)")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PocketMindly streaming voice assistant")
+    settings.add_arguments(parser)
+    if not settings.apply_args(parser.parse_args()):
+        raise SystemExit(0)
+    tracing.set_tracer(tracing.from_settings())
+    
     assistant = FullStreamingAssistant()
     assistant.run()
@@ -1,5 +1,13 @@
 from typing import List, Dict
 
+# Fixed replies spoken by the pipeline. Pre-synthesised into the TTS cache at startup.
+OFFLINE_REPLY = "I'm currently offline and cannot search the web. Please check your internet connection and try again."
+SEARCH_ERROR_REPLY = "The web search encountered an error. Please try again."
+LLM_ERROR_REPLY = "I'm having trouble thinking."
+SEARCH_CONTEXT_ERROR_REPLY = "I couldn't process the search results."
+
+CANNED_REPLIES = [OFFLINE_REPLY, SEARCH_ERROR_REPLY, LLM_ERROR_REPLY, SEARCH_CONTEXT_ERROR_REPLY]
+
 class PromptManager:
     """
     Manages the construction of prompts for the LLM, including:
@@ -15,32 +23,35 @@ Your goals:
 - Reason normally about abstract, philosophical, or opinion-based questions.
 - Use common sense and general knowledge freely.
 
-Web search rules:
-- Only request web search when the question requires:
-  1) very recent information (news, prices, current events)
-  2) precise factual lookup you are unsure about
-- Do NOT request web search for:
-  - philosophical questions
-  - opinions or beliefs
-  - hypothetical questions
-  - general knowledge you can explain
-
-If web search is needed, respond EXACTLY in this format:
-SEARCH_REQUEST: <concise search query>
+Your replies are spoken aloud as you write them, so answer in plain sentences.
+Whether to search the web is decided before you answer; when it is, the
+results are given to you with the question.
 
-Otherwise, answer normally.
-
-Be brief. Be natural. Do not mention tools unless requesting search.
+Be brief. Be natural. Do not mention tools.
 """
 
     # Few-Shot Examples: (User Input, Ideal AI Output)
     FEW_SHOT_EXAMPLES = [
     ("What is the capital of France?", "Paris."),
-    ("What are today’s bitcoin prices?", "SEARCH_REQUEST: current bitcoin price"),
     ("Does consciousness come from the brain?", 
      "This is a debated topic. Many scientists believe consciousness emerges from brain activity, but there is no single accepted explanation.")
 ]
 
+    # Appended to the user turn for the cheap search-decision pass.
+    # Output is constrained by DECISION_GRAMMAR, so the wording only has to steer.
+    DECISION_INSTRUCTION = (
+        "Before answering, decide if this question needs a web search "
+        "(recent events, prices, news, or facts you are unsure about). "
+        "Reply only with JSON."
+    )
+
+    # GBNF grammar for llama.cpp: {"search": false} or {"search": true, "query": "..."}
+    DECISION_GRAMMAR = r'''
+root  ::= "{\"search\": " ( "false" | "true, \"query\": " query ) "}"
+query ::= "\"" char+ "\""
+char  ::= [^"\\\n]
+'''
+
     def construct_messages(self, user_text: str) -> List[Dict[str, str]]:
         """
         Constructs the message list for the chat completion API.
@@ -70,3 +81,16 @@ Be brief. Be natural. Do not mention tools unless requesting search.
         messages.append({"role": "user", "content": f"User: {user_text}"})
 
         return messages
+
+    def construct_decision_messages(self, user_text: str) -> List[Dict[str, str]]:
+        """
+        Same conversation as construct_messages, with the decision instruction
+        added to the final user turn. Everything up to the user text is identical,
+        so llama.cpp reuses the evaluated prefix for the answer that follows.
+        """
+        messages = self.construct_messages(user_text)
+        messages[-1] = {
+            "role": "user",
+            "content": f"{messages[-1]['content']}\n\n{self.DECISION_INSTRUCTION}"
+        }
+        return messages
@@ -0,0 +1,73 @@
+"""
+Benchmark the intent router against the old inline keyword scan.
+Reports microseconds per routing decision and accuracy on the fixtures.
+
+Usage (from prototype/):
+    python scripts/bench_router.py [--iterations 2000] [--classifier]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.router import IntentRouter, NaiveBayesIntentClassifier
+from config import settings
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "tests", "fixtures", "router_cases.jsonl")
+
+LEGACY_KEYWORDS = [
+    "who is", "who's", "what is", "what's", "where is", "where's",
+    "latest", "current", "today", "recent", "news",
+    "tell me about", "information about", "find", "search",
+    "modi", "musk", "trump", "biden", "china", "russia", "india"
+]
+
+
+def legacy_route(user_text):
+    """The substring scan main.py used before core/router.py"""
+    user_lower = user_text.lower()
+    return any(keyword in user_lower for keyword in LEGACY_KEYWORDS)
+
+
+def bench(fn, texts, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            fn(text)
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(texts)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--classifier", action="store_true", help="Enable the Naive Bayes fallback")
+    args = parser.parse_args()
+
+    with open(FIXTURES, "r", encoding="utf-8") as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+    texts = [c["text"] for c in cases]
+
+    router = IntentRouter.from_config()
+    if args.classifier:
+        training = os.path.join(os.path.dirname(settings.ROUTER_CONFIG_PATH), "router_training.jsonl")
+        router.classifier = NaiveBayesIntentClassifier.from_jsonl(training)
+
+    legacy_us = bench(legacy_route, texts, args.iterations)
+    router_us = bench(router.route, texts, args.iterations)
+
+    legacy_correct = sum(legacy_route(c["text"]) == (c["intent"] == "search") for c in cases)
+    router_correct = sum(router.route(c["text"])["intent"] == c["intent"] for c in cases)
+
+    print(f"Fixtures: {len(cases)}")
+    print(f"Legacy substring scan: {legacy_us:6.2f} us/turn  accuracy {legacy_correct}/{len(cases)}")
+    print(f"IntentRouter:          {router_us:6.2f} us/turn  accuracy {router_correct}/{len(cases)}")
+
+
+if __name__ == "__main__":
+    main()
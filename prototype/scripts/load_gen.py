@@ -0,0 +1,131 @@
+"""
+Load generator for voice_server.py.
+Replays a WAV file as N simulated clients, each speaking in real time and
+waiting for the reply before its next turn, then reports latency
+percentiles, refusals and turns per minute.
+
+Usage (from prototype/):
+    python voice_server.py &
+    python scripts/load_gen.py --clients 4 --turns 3 [--wav benchmarks/fixtures/utterance_a.wav]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.audio_source import ReplaySource
+from core.tracing import RollingHistogram
+
+CHUNK = 480  # 30 ms at 16 kHz
+
+
+async def client(index, args, pcm, results):
+    """One simulated client. Latencies are measured from the end of its speech."""
+    await asyncio.sleep(index * args.ramp)
+    try:
+        async with aiohttp.ClientSession() as http:
+            async with http.ws_connect(args.url) as ws:
+                messages = asyncio.Queue()
+
+                async def read():
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            await messages.put(json.loads(msg.data))
+                    await messages.put({"type": "closed"})
+
+                reader = asyncio.ensure_future(read())
+                hello = await messages.get()
+                if hello["type"] == "busy":
+                    results["rejected"] += 1
+                    return
+
+                silence = np.zeros(int(args.pad * 16000), dtype=np.int16)
+                for _ in range(args.turns):
+                    # Speak in real time, then trailing silence for the endpointer
+                    started = time.monotonic()
+                    for i, start in enumerate(range(0, len(pcm), CHUNK)):
+                        await ws.send_bytes(pcm[start:start + CHUNK].tobytes())
+                        await asyncio.sleep(max(0.0, started + (i + 1) * CHUNK / 16000 - time.monotonic()))
+                    speech_end = time.monotonic()
+                    for start in range(0, len(silence), CHUNK):
+                        await ws.send_bytes(silence[start:start + CHUNK].tobytes())
+                        await asyncio.sleep(CHUNK / 16000)
+
+                    first_token = first_audio = None
+                    while True:
+                        try:
+                            msg = await asyncio.wait_for(messages.get(), args.timeout)
+                        except asyncio.TimeoutError:
+                            results["timeouts"] += 1
+                            break
+                        now = (time.monotonic() - speech_end) * 1000
+                        if msg["type"] == "token" and first_token is None:
+                            first_token = now
+                        elif msg["type"] == "audio" and first_audio is None:
+                            first_audio = now
+                        elif msg["type"] == "reply":
+                            results["reply"].add(now)
+                            results["server_reply"].add(msg["latency_ms"]["reply"])
+                            if first_token is not None:
+                                results["first_token"].add(first_token)
+                            if first_audio is not None:
+                                results["first_audio"].add(first_audio)
+                            results["turns"] += 1
+                            break
+                        elif msg["type"] == "rejected" or (msg["type"] == "transcript" and not msg["text"]):
+                            # Nothing to answer (no speech, or the turn gate dropped it)
+                            results["empty"] += 1
+                            break
+                        elif msg["type"] == "error":
+                            results["errors"] += 1
+                            break
+                        elif msg["type"] == "closed":
+                            return
+                reader.cancel()
+    except aiohttp.ClientError as e:
+        print(f"client {index}: {e}")
+        results["errors"] += 1
+
+
+async def main(args):
+    pcm = ReplaySource(args.wav, realtime=False).audio
+    results = {
+        "reply": RollingHistogram(10000), "server_reply": RollingHistogram(10000),
+        "first_token": RollingHistogram(10000), "first_audio": RollingHistogram(10000),
+        "turns": 0, "rejected": 0, "timeouts": 0, "empty": 0, "errors": 0,
+    }
+
+    started = time.monotonic()
+    await asyncio.gather(*(client(i, args, pcm, results) for i in range(args.clients)))
+    elapsed = time.monotonic() - started
+
+    print(f"\n📊 {args.clients} clients x {args.turns} turns in {elapsed:.1f}s")
+    print(f"   completed {results['turns']}, refused {results['rejected']}, "
+          f"timeouts {results['timeouts']}, empty {results['empty']}, errors {results['errors']}")
+    print(f"   {results['turns'] / elapsed * 60:.1f} turns/min")
+    print(f"\n{'ms after speech end':<24}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name in ("first_token", "first_audio", "reply", "server_reply"):
+        s = results[name].summary()
+        if s["count"]:
+            print(f"{name:<24}{s['count']:>6}{s['p50']:>9.0f}{s['p95']:>9.0f}{s['p99']:>9.0f}")
+    print("(server_reply is measured from the server's VAD endpoint)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated clients for voice_server.py")
+    parser.add_argument("--url", default="ws://127.0.0.1:8765/ws")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--wav", default=os.path.join("benchmarks", "fixtures", "utterance_a.wav"))
+    parser.add_argument("--pad", type=float, default=2.0, help="seconds of silence after each utterance")
+    parser.add_argument("--ramp", type=float, default=0.25, help="seconds between client connects")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    asyncio.run(main(parser.parse_args()))
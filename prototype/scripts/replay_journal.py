@@ -0,0 +1,146 @@
+"""
+List, export and re-run turns from the capture journal.
+
+The journal (JOURNAL_ENABLED=true) keeps the last JOURNAL_HOURS of input
+audio as the stream delivered it, before the DSP front-end. This script
+finds a turn in it and replays that audio through the assistant, with the
+settings given here. Include some context before the turn (--context) so
+the VAD and the AGC are in the same state they were in live.
+
+Turns are numbered as --list shows them; negative numbers count from the
+newest (-1 = the last turn).
+
+Usage (from prototype/):
+    python scripts/replay_journal.py --list [--hours 2]
+    python scripts/replay_journal.py --export -1 -o turn.wav
+    python scripts/replay_journal.py --run -1 [--realtime] [--mute] [--profile low-latency]
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+
+PROTOTYPE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROTOTYPE_DIR)
+
+from config import settings
+from core.journal import JournalReader
+
+
+def pick_turn(turns, number: int) -> dict:
+    if not turns:
+        raise SystemExit("❌ The journal has no turns")
+    index = number - 1 if number > 0 else number
+    try:
+        return turns[index]
+    except IndexError:
+        raise SystemExit(f"❌ No turn {number} (1..{len(turns)})") from None
+
+
+def turn_audio(reader: JournalReader, turn: dict, context: float) -> np.ndarray:
+    """The turn with `context` seconds before it and the endpointing silence after it"""
+    before = int(context * reader.sample_rate)
+    after = int((settings.SILENCE_THRESHOLD + 0.5) * reader.sample_rate)
+    return reader.audio(turn["start"] - before, turn["end"] + after)
+
+
+def list_turns(turns):
+    print(f"{'#':>4}  {'time':<19} {'seconds':>8}  transcript")
+    for i, turn in enumerate(turns, 1):
+        when = datetime.datetime.fromtimestamp(turn["t"]).strftime("%Y-%m-%d %H:%M:%S")
+        text = "(not transcribed)" if turn["text"] is None else (turn["text"] or "(no speech)")
+        flag = "  [barge-in]" if turn["barge_in"] else ""
+        if turn["rejected"]:
+            flag += f"  [rejected: {turn['rejected']}]"
+        print(f"{i:>4}  {when:<19} {turn['seconds']:>8.1f}  {text}{flag}")
+
+
+def export(reader, turn, audio, path):
+    import scipy.io.wavfile as wav
+    wav.write(path, reader.sample_rate, audio)
+    print(f"💾 {len(audio) / reader.sample_rate:.1f}s written to {path}")
+
+
+def run(reader, turn, audio, args):
+    """Replay through FullStreamingAssistant; its output shows what the pipeline makes of it now"""
+    settings.JOURNAL_ENABLED = False     # Don't journal the replay itself
+    from core.audio_source import ReplaySource
+    from core.state_machine import State
+    from main import FullStreamingAssistant
+
+    components = {}
+    if args.mute:
+        from core.tts import TTSEngine, NullBackend, NullPlayer
+        components["tts"] = TTSEngine(backend=NullBackend(), player=NullPlayer())
+    if args.stub_models:
+        sys.path.insert(0, os.path.join(PROTOTYPE_DIR, "benchmarks"))
+        from stubs import EnergyVAD, ScriptedSTT, ScriptedLLM
+        stt = ScriptedSTT()
+        stt.transcript = turn["text"] or ""
+        components.update(vad=EnergyVAD(), stt=stt, llm=ScriptedLLM())
+
+    source = ReplaySource(audio, sample_rate=reader.sample_rate, realtime=args.realtime,
+                          blocksize=reader.sample_rate * settings.FRAME_MS // 1000)
+    print(f"▶️  Replaying {source.duration:.1f}s (journal transcript: {turn['text']!r})")
+    assistant = FullStreamingAssistant(audio_source=source, **components)
+    assistant.start()
+    try:
+        source.wait()
+        # Then until the VAD has seen every frame and any turn has finished
+        deadline = time.monotonic() + args.timeout
+        while time.monotonic() < deadline:
+            vad = assistant.pipeline.stats()["vad"]
+            if (vad["processed"] + vad["dropped"] >= source.blocks_delivered
+                    and assistant.state_machine.state == State.LISTENING):
+                break
+            time.sleep(0.05)
+        else:
+            print(f"⚠️ Turn still in progress after {args.timeout:.0f}s")
+    finally:
+        assistant.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay turns from the capture journal")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--list", action="store_true", help="list the turns still in the journal")
+    action.add_argument("--export", type=int, metavar="N", help="write turn N to a WAV file")
+    action.add_argument("--run", type=int, metavar="N", help="re-run turn N through the assistant")
+    parser.add_argument("--dir", help="journal directory (default: settings.JOURNAL_DIR)")
+    parser.add_argument("--hours", type=float, help="only turns from the last N hours")
+    parser.add_argument("-o", "--output", default="turn.wav")
+    parser.add_argument("--context", type=float, default=3.0, help="seconds of audio before the turn")
+    parser.add_argument("--realtime", action="store_true", help="replay at real-time pace")
+    parser.add_argument("--mute", action="store_true", help="don't play the reply")
+    parser.add_argument("--stub-models", action="store_true",
+                        help="energy VAD and scripted STT/LLM: check endpointing and the pipeline only")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    settings.add_arguments(parser)
+    args = parser.parse_args()
+    if not settings.apply_args(args):
+        return 0
+
+    reader = JournalReader(args.dir or settings.JOURNAL_DIR)
+    try:
+        turns = reader.turns(since_hours=args.hours)
+        if args.list:
+            list_turns(turns)
+            return 0
+        turn = pick_turn(turns, args.export if args.export is not None else args.run)
+        audio = turn_audio(reader, turn, args.context)
+    finally:
+        reader.close()
+
+    if args.export is not None:
+        export(reader, turn, audio, args.output)
+    else:
+        run(reader, turn, audio, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""
+Tune thread counts, batch size and compute type for this machine.
+
+Detects cores, caches and SIMD features, then microbenchmarks each model
+with the load it shares cores with in the assistant. The VAD runs for the
+whole session, so a VAD thread keeps running at real-time pace throughout.
+STT and the LLM take turns (a turn is transcribed, then answered), so each
+is measured on the cores the VAD leaves, without the other running:
+    - VAD: ONNX Runtime intra-op threads
+    - STT: CTranslate2 threads x compute type, on a fixture utterance
+    - LLM: llama.cpp threads, then n_batch at the best thread count
+Models that aren't downloaded are skipped and get a heuristic value.
+
+Writes config/tuned_profile.json; config/settings.py applies its
+"settings" at startup.
+
+Usage (from prototype/):
+    python scripts/tune_hardware.py [--quick] [--output config/tuned_profile.json]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+
+PROTOTYPE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROTOTYPE_DIR)
+
+from config import settings
+
+FIXTURE = os.path.join(PROTOTYPE_DIR, "benchmarks", "fixtures", "utterance_a.wav")
+SIMD_FLAGS = ["sse4_2", "avx", "avx2", "fma", "f16c", "avx512f", "avx512_vnni", "avx_vnni",
+              "neon", "asimd", "asimddp", "sve"]
+
+# A candidate within this fraction of the best is preferred if it uses fewer threads
+TIE_MARGIN = 0.05
+
+
+# ---------- HARDWARE ----------
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def detect_hardware() -> dict:
+    """Core counts, cache sizes, SIMD features and memory of this machine"""
+    usable = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+
+    # Physical cores: distinct (package, core) pairs among the usable CPUs
+    physical = set()
+    for cpu in usable:
+        core = _read(f"/sys/devices/system/cpu/cpu{cpu}/topology/core_id")
+        package = _read(f"/sys/devices/system/cpu/cpu{cpu}/topology/physical_package_id")
+        physical.add((package, core) if core is not None else cpu)
+
+    caches = {}
+    cache_dir = f"/sys/devices/system/cpu/cpu{usable[0]}/cache"
+    for index in sorted(os.listdir(cache_dir)) if os.path.isdir(cache_dir) else []:
+        level = _read(os.path.join(cache_dir, index, "level"))
+        kind = _read(os.path.join(cache_dir, index, "type"))
+        size = _read(os.path.join(cache_dir, index, "size"))
+        if level and size:
+            name = f"L{level}" + ("d" if kind == "Data" else "i" if kind == "Instruction" else "")
+            caches[name] = size
+
+    flags = set()
+    cpuinfo = _read("/proc/cpuinfo") or ""
+    for line in cpuinfo.splitlines():
+        if line.startswith(("flags", "Features")):
+            flags.update(line.split(":", 1)[1].split())
+            break
+    if platform.machine() in ("arm64", "aarch64") and not flags:
+        flags.add("neon")   # Apple silicon / no cpuinfo: NEON is baseline on arm64
+
+    mem_total = None
+    for line in (_read("/proc/meminfo") or "").splitlines():
+        if line.startswith("MemTotal:"):
+            mem_total = round(int(line.split()[1]) / 1024)
+
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor() or None,
+        "logical_cores": os.cpu_count(),
+        "usable_cores": len(usable),
+        "physical_cores": len(physical),
+        "caches": caches,
+        "simd": [f for f in SIMD_FLAGS if f in flags],
+        "memory_mb": mem_total,
+    }
+
+
+def thread_candidates(limit: int):
+    """1, 2, 4, ... up to limit, plus limit itself"""
+    candidates, n = [], 1
+    while n < limit:
+        candidates.append(n)
+        n *= 2
+    candidates.append(max(1, limit))
+    return sorted(set(candidates))
+
+
+def pick(results: dict, threads_of=lambda key: key):
+    """Fastest candidate; near-ties go to the one with fewer threads"""
+    best = min(results.values())
+    close = [k for k, v in results.items() if v <= best * (1 + TIE_MARGIN)]
+    return min(close, key=lambda k: (threads_of(k), results[k]))
+
+
+def timed(fn, repeat: int) -> float:
+    """Median seconds per call, after one untimed call"""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+# ---------- VAD ----------
+
+def load_vad(threads: int):
+    settings.VAD_THREADS = threads
+    from core.vad import SileroVAD
+    vad = SileroVAD()
+    return vad if vad.session is not None else None
+
+
+class BackgroundVAD:
+    """Runs VAD frames at real-time pace, the way the live assistant does"""
+
+    def __init__(self, vad):
+        self.vad = vad
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        frame = (np.random.default_rng(0).standard_normal(512) * 0.01).astype(np.float32)
+        while not self._stop.wait(0.032):
+            self.vad.is_speech(frame)
+
+    def __enter__(self):
+        if self.vad is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+
+
+def tune_vad(max_threads: int, repeat: int):
+    frame = np.zeros(512, dtype=np.float32)
+    results = {}
+    for threads in thread_candidates(min(2, max_threads)):
+        vad = load_vad(threads)
+        if vad is None:
+            return None, {}
+        results[threads] = timed(lambda: vad.is_speech(frame), repeat * 20) * 1000
+        print(f"   VAD  threads={threads}: {results[threads]:.2f} ms/frame")
+    return pick(results), results
+
+
+# ---------- STT ----------
+
+def _decode(model, audio):
+    segments, _ = model.transcribe(audio, beam_size=5, language="en", condition_on_previous_text=False)
+    list(segments)
+
+
+def tune_stt(max_threads: int, repeat: int, background):
+    try:
+        import ctranslate2
+        from faster_whisper import WhisperModel
+    except ImportError as e:
+        print(f"   STT skipped: {e}")
+        return None, {}
+
+    import scipy.io.wavfile as wav
+    sample_rate, audio = wav.read(FIXTURE)
+    audio = audio.astype(np.float32) / 32768.0
+    seconds = len(audio) / sample_rate
+
+    supported = ctranslate2.get_supported_compute_types("cpu")
+    compute_types = [t for t in ("int8", "int8_float32", "float32") if t in supported]
+    download_root = settings.STT_MODEL_PATH if os.path.exists(settings.STT_MODEL_PATH) else None
+
+    results = {}
+    with BackgroundVAD(background):
+        for compute_type in compute_types:
+            for threads in thread_candidates(max_threads):
+                try:
+                    model = WhisperModel(settings.STT_MODEL_SIZE, device="cpu", compute_type=compute_type,
+                                         cpu_threads=threads, download_root=download_root,
+                                         local_files_only=True)
+                except Exception as e:
+                    # Keep what the other candidates measured
+                    print(f"   STT  {compute_type:<13} threads={threads}: failed to load ({str(e)[:80]})")
+                    continue
+
+                rtf = timed(lambda m=model: _decode(m, audio), repeat) / seconds
+                results[(compute_type, threads)] = rtf
+                print(f"   STT  {compute_type:<13} threads={threads}: RTF {rtf:.3f}")
+                model = None   # free it before loading the next candidate
+    if not results:
+        print("   STT skipped: no candidate loaded")
+        return None, {}
+    return pick(results, threads_of=lambda k: k[1]), results
+
+
+# ---------- LLM ----------
+
+def _reply(llm, messages):
+    # Fresh prompt eval each time, so n_batch matters as much as it does per turn
+    llm.reset()
+    llm.create_chat_completion(messages=messages, max_tokens=32, temperature=0.0)
+
+
+def tune_llm(max_threads: int, repeat: int, background, batches):
+    try:
+        from llama_cpp import Llama
+    except ImportError as e:
+        print(f"   LLM skipped: {e}")
+        return None, {}
+    if not os.path.exists(settings.LLM_MODEL_PATH):
+        print(f"   LLM skipped: {settings.LLM_MODEL_PATH} not found")
+        return None, {}
+
+    from prompt_templates.prompts import PromptManager
+    messages = PromptManager().construct_messages("What can you tell me about the moon?")
+
+    def measure(threads, batch):
+        llm = Llama(model_path=settings.LLM_MODEL_PATH, n_ctx=settings.LLM_CONTEXT_WINDOW,
+                    n_threads=threads, n_batch=batch, verbose=False)
+        seconds = timed(lambda m=llm: _reply(m, messages), repeat)
+        llm = None   # free it before loading the next candidate
+        return seconds
+
+    results = {}
+    with BackgroundVAD(background):
+        # Threads first at the default batch, then batch sizes at the best thread count
+        for threads in thread_candidates(max_threads):
+            results[(threads, settings.LLM_BATCH)] = measure(threads, settings.LLM_BATCH)
+            print(f"   LLM  threads={threads} n_batch={settings.LLM_BATCH}: "
+                  f"{results[(threads, settings.LLM_BATCH)] * 1000:.0f} ms/reply")
+        best_threads = pick(results, threads_of=lambda k: k[0])[0]
+        for batch in batches:
+            if (best_threads, batch) not in results:
+                results[(best_threads, batch)] = measure(best_threads, batch)
+                print(f"   LLM  threads={best_threads} n_batch={batch}: "
+                      f"{results[(best_threads, batch)] * 1000:.0f} ms/reply")
+    return pick(results, threads_of=lambda k: k[0]), results
+
+
+# ---------- PROFILE ----------
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune model threads and precision for this machine")
+    parser.add_argument("--output", default=settings.TUNED_PROFILE_PATH)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per candidate")
+    parser.add_argument("--quick", action="store_true", help="one timed run, fewer batch sizes")
+    args = parser.parse_args()
+    repeat = 1 if args.quick else args.repeat
+    batches = [128, 512] if args.quick else [64, 128, 256, 512]
+
+    hardware = detect_hardware()
+    print("🖥️  Hardware:")
+    for key, value in hardware.items():
+        print(f"   {key:<15} {value}")
+
+    # llama.cpp and CTranslate2 scale with physical cores, not hyper-threads
+    cores = max(1, min(hardware["usable_cores"], hardware["physical_cores"] or hardware["usable_cores"]))
+
+    print("\n⏱️  VAD")
+    vad_threads, vad_results = tune_vad(cores, repeat)
+    vad_threads = vad_threads or 1
+    background = load_vad(vad_threads) if vad_results else None
+    # The VAD runs throughout; STT and LLM take turns with the remaining cores
+    remaining = max(1, cores - vad_threads) if cores > 1 else 1
+
+    print("\n⏱️  STT (VAD running alongside)")
+    stt_best, stt_results = tune_stt(remaining, repeat, background)
+    print("\n⏱️  LLM (VAD running alongside)")
+    llm_best, llm_results = tune_llm(remaining, repeat, background, batches)
+
+    tuned = {
+        "VAD_THREADS": vad_threads,
+        "STT_COMPUTE_TYPE": stt_best[0] if stt_best else settings.STT_COMPUTE_TYPE,
+        "STT_CPU_THREADS": stt_best[1] if stt_best else remaining,
+        "LLM_THREADS": llm_best[0] if llm_best else remaining,
+        "LLM_BATCH": llm_best[1] if llm_best else settings.LLM_BATCH,
+    }
+    profile = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "hardware": hardware,
+        "settings": tuned,
+        "measured": {"vad": bool(vad_results), "stt": bool(stt_results), "llm": bool(llm_results)},
+        "results": {
+            "vad_ms_per_frame": {str(k): round(v, 3) for k, v in vad_results.items()},
+            "stt_rtf": {f"{k[0]}/{k[1]}": round(v, 3) for k, v in stt_results.items()},
+            "llm_ms_per_reply": {f"{k[0]}/{k[1]}": round(v * 1000, 1) for k, v in llm_results.items()},
+        },
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+        f.write("\n")
+    print("\n✅ Tuned settings:")
+    for key, value in tuned.items():
+        measured = profile["measured"][key.split("_")[0].lower()]
+        print(f"   {key:<17} {value}{'' if measured else '  (heuristic, not measured)'}")
+    print(f"💾 Written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import numpy as np
+
+from config import settings
+from core.audio_source import synthesize_pattern
+from core.dsp import AGC, DCBlocker, DSPChain, HighPass, level_dbfs
+
+RATE = 16000
+FRAME = 480
+
+
+def frames_of(audio):
+    return [audio[i:i + FRAME].astype(np.float32).copy() for i in range(0, len(audio) - FRAME + 1, FRAME)]
+
+
+def test_dc_and_rumble_removed_speech_band_kept():
+    t = np.arange(3 * RATE) / RATE
+    tone = 0.1 * np.sin(2 * np.pi * 1000 * t)
+    audio = 0.2 + 0.1 * np.sin(2 * np.pi * 20 * t) + tone
+    chain = DSPChain([DCBlocker(RATE), HighPass(RATE, 80.0)])
+    out = np.concatenate([chain.process(f) for f in frames_of(audio)])
+
+    settled = slice(2 * RATE, 3 * RATE)
+    assert abs(out[settled].mean()) < 1e-3
+    np.testing.assert_allclose(level_dbfs(out[settled]), level_dbfs(tone[settled]), atol=0.5)
+    assert set(chain.stats()["stages"]) == {"dc", "highpass"}
+
+
+def test_agc_lifts_quiet_speech_without_lifting_the_noise():
+    speech = synthesize_pattern([("silence", 1.0), ("speech", 3.0), ("silence", 1.0)],
+                                level=0.01, noise_level=0.0005)
+    agc = AGC(RATE, target_dbfs=-20.0, max_gain_db=30.0)
+    out = [agc.process(f) for f in frames_of(speech)]
+
+    in_speech = np.concatenate(out[90:130])
+    pause = np.concatenate(out[-20:])
+    assert level_dbfs(in_speech) > level_dbfs(speech[int(3 * RATE):int(3.9 * RATE)]) + 6
+    assert level_dbfs(pause) < AGC.NOISE_CEILING_DBFS + 1
+    assert max(np.abs(f).max() for f in out) <= 0.99
+
+
+def test_stages_follow_settings():
+    previous = settings.DSP_AGC, settings.DSP_HIGHPASS_HZ
+    try:
+        settings.DSP_AGC, settings.DSP_HIGHPASS_HZ = False, None
+        assert [s.name for s in DSPChain.from_settings().stages] == ["dc"]
+    finally:
+        settings.DSP_AGC, settings.DSP_HIGHPASS_HZ = previous
+    assert [s.name for s in DSPChain.from_settings().stages] == ["dc", "highpass", "agc"]
+
+
+def test_highpass_matches_sosfilt_and_agc_gain_can_be_divided_out():
+    from scipy.signal import butter, sosfilt
+    noise = np.random.default_rng(0).normal(0.0, 0.05, 2 * RATE).astype(np.float32)
+    hp = HighPass(RATE, 80.0)
+    out = np.concatenate([hp.process(f) for f in frames_of(noise)])
+    reference = sosfilt(butter(2, 80.0, btype="highpass", fs=RATE, output="sos"), noise.astype(np.float64))
+    np.testing.assert_allclose(out, reference[:len(out)], atol=1e-5)
+
+    speech = synthesize_pattern([("silence", 1.0), ("speech", 2.0)], level=0.01, noise_level=0.0005)
+    agc = AGC(RATE)
+    for frame in frames_of(speech):
+        raw = level_dbfs(frame)
+        agc.process(frame)
+        # What barge-in compares with the speaker level: the mic before the AGC
+        assert abs(level_dbfs(frame) - 20 * np.log10(agc.frame_gain) - raw) < 1.0
@@ -0,0 +1,56 @@
+import numpy as np
+
+from core.journal import AudioJournal, JournalReader
+
+RATE = 16000
+FRAME = 480
+
+
+def frames(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [(rng.integers(-20000, 20000, FRAME) / 32768.0).astype(np.float32) for _ in range(n)]
+
+
+def test_turns_and_audio_read_back_exactly(tmp_path):
+    journal = AudioJournal(str(tmp_path), hours=60 / 3600, sample_rate=RATE)
+    written = frames(100)
+    for f in written:
+        journal.write(f)
+    journal.mark("speech_start", 10 * FRAME)
+    journal.mark("speech_end", 50 * FRAME, start=10 * FRAME, turn=1)
+    journal.mark("transcript", 50 * FRAME, turn=1, text="hello there")
+    journal.close()
+
+    reader = JournalReader(str(tmp_path))
+    [turn] = reader.turns()
+    assert (turn["start"], turn["end"], turn["text"]) == (10 * FRAME, 50 * FRAME, "hello there")
+    expected = (np.concatenate(written[10:50]) * 32768).astype(np.int16)
+    np.testing.assert_array_equal(reader.audio(turn["start"], turn["end"]), expected)
+    reader.close()
+
+
+def test_ring_wraps_and_sessions_continue(tmp_path):
+    capacity_frames = 40
+    hours = capacity_frames * FRAME / RATE / 3600
+    journal = AudioJournal(str(tmp_path), hours=hours, sample_rate=RATE)
+    for f in frames(30):
+        journal.write(f)
+    journal.mark("speech_end", 20 * FRAME, start=5 * FRAME, turn=1)
+    journal.close()
+
+    # A second session picks up where the first left off and overwrites its oldest audio
+    journal = AudioJournal(str(tmp_path), hours=hours, sample_rate=RATE)
+    assert journal.base == 30 * FRAME
+    second = frames(30, seed=1)
+    for f in second:
+        journal.write(f)
+    journal.mark("speech_end", 25 * FRAME, start=15 * FRAME, turn=1)
+    journal.close()
+
+    reader = JournalReader(str(tmp_path))
+    assert reader.head == 60 * FRAME and reader.oldest == 20 * FRAME
+    # The first session's turn started before the oldest sample still held
+    assert [(t["start"], t["end"]) for t in reader.turns()] == [(45 * FRAME, 55 * FRAME)]
+    np.testing.assert_array_equal(reader.audio(30 * FRAME, 60 * FRAME),
+                                  (np.concatenate(second) * 32768).astype(np.int16))
+    reader.close()
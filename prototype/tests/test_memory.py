@@ -0,0 +1,47 @@
+import threading
+import time
+
+from core.memory import MemoryGovernor
+
+
+class FakeModel:
+    instances = 0
+
+    def __init__(self):
+        FakeModel.instances += 1
+        self.unloaded = False
+
+    def answer(self, x, delay=0.0):
+        time.sleep(delay)
+        return x * 2
+
+
+def test_idle_model_is_unloaded_and_reloads_on_use():
+    governor = MemoryGovernor()
+    unloaded = []
+    model = governor.register("fake", FakeModel, unloader=unloaded.append, idle_timeout=0.05)
+    assert model.answer(2) == 4
+    assert model.loaded
+
+    time.sleep(0.1)
+    assert model.unload(idle_only=True)
+    assert not model.loaded and len(unloaded) == 1
+
+    # Fetching the method doesn't reload; calling it does
+    answer = model.answer
+    assert not model.loaded
+    assert answer(3) == 6
+    assert model.loads == 2 and model.evictions == 1
+
+
+def test_model_in_use_is_not_unloaded():
+    governor = MemoryGovernor()
+    model = governor.register("fake", FakeModel, idle_timeout=0.0)
+    model.load()
+    worker = threading.Thread(target=model.answer, args=(1, 0.2))
+    worker.start()
+    time.sleep(0.05)
+    assert not model.unload(idle_only=True)
+    worker.join()
+    assert model.unload(idle_only=True)
+    assert governor.footprint()["models"]["fake"]["loaded"] is False
@@ -0,0 +1,49 @@
+import threading
+
+from core.pipeline import CancelEvent, EventLoopThread, Pipeline, Turn
+
+
+def test_failed_turn_reported_and_next_turn_still_runs():
+    failures = []
+    done = []
+    finished = threading.Event()
+
+    def stt(turn):
+        if turn.text == "bad":
+            raise RuntimeError("decoder crashed")
+        return turn
+
+    async def reply(turn):
+        done.append(turn.text)
+        finished.set()
+
+    runtime = EventLoopThread()
+    pipeline = Pipeline(runtime, on_error=lambda stage, item, error: failures.append((stage, item.text, str(error))))
+    pipeline.add_stage("stt", stt)
+    pipeline.add_stage("reply", reply)
+    pipeline.start()
+    try:
+        for text in ("bad", "good"):
+            turn = Turn()
+            turn.text = text
+            pipeline.feed(turn, block=True)
+        assert finished.wait(2.0)
+    finally:
+        pipeline.stop()
+        runtime.stop()
+
+    assert failures == [("stt", "bad", "decoder crashed")]
+    assert done == ["good"]
+    assert pipeline.stats()["stt"]["processed"] == 2
+
+
+def test_cancelling_a_turn_cancels_its_child_events():
+    cancel = CancelEvent()
+    offline = cancel.child()
+    offline.set()                     # a child can be cancelled on its own...
+    assert not cancel.is_set()
+
+    speculative = cancel.child()
+    cancel.set()                      # ...and is cancelled with the turn
+    assert speculative.is_set()
+    assert cancel.child().is_set()    # made after the turn was cancelled
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from core.audio_source import ReplaySource
+from core.audio_stream import AudioStream
+from core.resampler import Resampler, resample
+
+
+def tone(freq, rate, seconds=1.0, level=0.5):
+    return (level * np.sin(2 * np.pi * freq * np.arange(int(rate * seconds)) / rate)).astype(np.float32)
+
+
+@pytest.mark.parametrize("in_rate", [44100, 48000, 8000])
+def test_chunked_stream_matches_one_shot(in_rate):
+    x = np.random.default_rng(0).standard_normal(in_rate // 2).astype(np.float32)
+    resampler = Resampler(in_rate, 16000)
+    whole = resampler.process(x)
+
+    resampler.reset()
+    rng = np.random.default_rng(1)
+    chunks, pos = [], 0
+    while pos < len(x):
+        n = int(rng.integers(1, 1500))
+        chunks.append(resampler.process(x[pos:pos + n]))
+        pos += n
+    np.testing.assert_allclose(np.concatenate(chunks), whole, atol=1e-6)
+
+
+@pytest.mark.parametrize("quality", ["fast", "balanced", "high"])
+def test_passband_kept_and_aliases_rejected(quality):
+    y = resample(tone(1000, 44100), 44100, 16000, quality)
+    assert len(y) == 16000
+    np.testing.assert_allclose(y[500:-500], tone(1000, 16000)[500:-500], atol=0.01)
+
+    # 11 kHz would fold back to 5 kHz at 16 kHz
+    alias = resample(tone(11000, 48000), 48000, 16000, quality)[500:-500]
+    assert np.sqrt(np.mean(alias ** 2)) < 0.5 * 10 ** (-50 / 20)
+
+
+def test_audio_stream_resamples_a_native_rate_source():
+    audio = (tone(440, 48000, seconds=0.6) * 32767).astype(np.int16)
+    source = ReplaySource(audio, sample_rate=48000, blocksize=1024, realtime=False)
+    stream = AudioStream(sample_rate=16000, frame_duration_ms=30, profile=False, source=source)
+    frames = []
+    stream.subscribe(frames.append)
+
+    stream.start()
+    assert stream.wait_finished(5.0)
+    stream.stop()
+
+    assert all(len(f) == 480 for f in frames)
+    # 0.6 s at 48 kHz (padded to whole 1024-sample blocks) -> about 0.6 s at 16 kHz
+    assert len(frames) == (len(source.audio) // 3) // 480
+    assert 0.45 < np.abs(np.concatenate(frames)[960:]).max() < 0.55
@@ -0,0 +1,73 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from config import settings
+from core.router import BORDERLINE, IntentRouter, NaiveBayesIntentClassifier, PhraseTrie, tokenize
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "router_cases.jsonl")
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config")
+
+
+def load_cases():
+    with open(FIXTURES, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter.from_config(os.path.join(CONFIG_DIR, "router.json"))
+
+
+@pytest.mark.parametrize("case", load_cases(), ids=lambda c: c["text"])
+def test_router_fixtures(router, case):
+    decision = router.route(case["text"])
+    assert decision["intent"] == case["intent"]
+    assert decision["query"] == case["query"]
+
+
+def test_trie_matches_whole_words_only():
+    trie = PhraseTrie()
+    trie.add("find", "trigger")
+    trie.add("who is", "trigger")
+
+    tokens, _ = tokenize("Our findings show who is right")
+    assert [hit[2] for hit in trie.find_all(tokens)] == ["who is"]
+
+
+def test_classifier_marks_unmatched_text_borderline_or_search():
+    classifier = NaiveBayesIntentClassifier.from_jsonl(os.path.join(CONFIG_DIR, "router_training.jsonl"))
+    router = IntentRouter(classifier=classifier)
+
+    assert router.route("how much is gold today")["intent"] == "search"
+    assert router.route("tell me a story")["intent"] == "offline"
+    assert router.route("how much is gold today")["source"] == "classifier"
+
+
+def test_default_config_turn_reaches_borderline_race():
+    from core.pipeline import Turn
+    from main import FullStreamingAssistant
+
+    turn = Turn()
+    turn.text = "How many moons does Jupiter have?"
+    turn.route = IntentRouter.from_config().route(turn.text)
+    turn.search_query = turn.route["query"]
+    assert turn.route["intent"] == BORDERLINE and settings.BORDERLINE_RACE
+
+    searched = []
+
+    async def get_context(query):
+        searched.append(query)
+        return ""
+
+    async def search():
+        assistant = SimpleNamespace(prefetcher=SimpleNamespace(get_context=get_context))
+        await FullStreamingAssistant.search_stage(assistant, turn)
+        await turn.search_task
+
+    asyncio.run(search())
+    # The LLM stage races whenever the search stage left a search task on the turn
+    assert searched == ["How many moons does Jupiter have?"]
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+
+import pytest
+
+from core.scheduler import FairScheduler
+
+
+def queue_behind_blocker(scheduler, ran, jobs):
+    """Occupy the only worker with session a's first job, then queue `jobs` behind it"""
+    release = threading.Event()
+
+    def blocker():
+        release.wait(2.0)
+        ran.append("a0")
+
+    tasks = [asyncio.ensure_future(scheduler.run("a", blocker))]
+    for session_id, name in jobs:
+        tasks.append(asyncio.ensure_future(scheduler.run(session_id, ran.append, name)))
+    return release, tasks
+
+
+def test_sessions_served_round_robin():
+    async def run():
+        scheduler = FairScheduler("test", concurrency=1)
+        ran = []
+        release, tasks = queue_behind_blocker(
+            scheduler, ran, [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")])
+        await asyncio.sleep(0)
+        assert scheduler.backlog == 4
+
+        release.set()
+        await asyncio.gather(*tasks)
+        scheduler.shutdown()
+        return ran, scheduler.stats()
+
+    ran, stats = asyncio.run(run())
+    # b's single job doesn't wait behind a's whole backlog
+    assert ran == ["a0", "a1", "b1", "a2", "a3"]
+    assert stats["completed"] == 5 and stats["backlog"] == 0
+
+
+def test_drop_session_cancels_its_queued_jobs():
+    async def run():
+        scheduler = FairScheduler("test", concurrency=1)
+        ran = []
+        release, tasks = queue_behind_blocker(scheduler, ran, [("a", "a1"), ("b", "b1"), ("a", "a2")])
+        await asyncio.sleep(0)
+
+        scheduler.drop_session("a")
+        assert scheduler.backlog == 1
+        release.set()
+        await asyncio.gather(tasks[0], tasks[2])
+        for task in (tasks[1], tasks[3]):
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        scheduler.shutdown()
+        return ran
+
+    # The running job finishes; the dropped ones never run; the other session is unaffected
+    assert asyncio.run(run()) == ["a0", "b1"]
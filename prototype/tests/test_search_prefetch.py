@@ -0,0 +1,36 @@
+import asyncio
+
+from tools.search_prefetch import RateLimiter, SearchPrefetcher
+
+
+class CountingSearch:
+    """Web tool stand-in that records each query it was asked"""
+
+    def __init__(self):
+        self.queries = []
+
+    async def get_context(self, query):
+        self.queries.append(query)
+        return f"results for {query}"
+
+
+def test_only_the_exact_query_reuses_the_prefetch():
+    web = CountingSearch()
+    prefetcher = SearchPrefetcher(web, limiter=RateLimiter(rate_per_sec=0.0, burst=2))
+    try:
+        assert prefetcher.prefetch("the president of France")
+        # The final query grew a qualifier: the prefetch doesn't answer it, so search afresh
+        context = asyncio.run(prefetcher.get_context("The president of France today"))
+        assert context == "results for The president of France today"
+        assert prefetcher.stats()["discarded"] == 1
+
+        # Same query modulo case and spacing: reused
+        assert prefetcher.prefetch("who won  the game")
+        context = asyncio.run(prefetcher.get_context("Who won the game"))
+        assert context == "results for who won  the game"
+        # (the cancelled prefetch may or may not have reached the search too)
+        assert {"The president of France today", "who won  the game"} <= set(web.queries)
+        assert "Who won the game" not in web.queries
+        assert prefetcher.stats()["hits"] == 1
+    finally:
+        prefetcher.close()
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from config import settings
+
+
+@pytest.fixture(autouse=True)
+def restore_settings(monkeypatch):
+    yield
+    monkeypatch.undo()
+    settings.configure("default")
+
+
+def test_profile_then_env_then_overrides(monkeypatch):
+    monkeypatch.setenv("POCKETMINDLY_STT_BEAM_SIZE", "3")
+    settings.configure("low-latency", {"LLM_MAX_TOKENS": "99"})
+    assert settings.SILENCE_THRESHOLD == settings.PROFILES["low-latency"]["SILENCE_THRESHOLD"]
+    assert settings.STT_BEAM_SIZE == 3            # env beats the profile
+    assert settings.LLM_MAX_TOKENS == 99          # override beats both, parsed to int
+
+
+def test_profiles_combine_and_reset():
+    settings.configure("low-power,low-memory")
+    assert settings.LLM_THREADS == 2 and settings.MEMORY_LAZY_LOAD is True
+    settings.configure("default")
+    assert settings.MEMORY_LAZY_LOAD is False
+    assert settings.MEMORY_IDLE_TIMEOUTS == {"stt": None, "llm": None}
+
+
+def test_values_are_type_checked():
+    settings.configure("default", {"BARGE_IN_ENABLED": "off", "AUDIO_CALLBACK_BUDGET_MS": "none",
+                                   "MEMORY_IDLE_TIMEOUTS": '{"stt": 5}'})
+    assert settings.BARGE_IN_ENABLED is False
+    assert settings.AUDIO_CALLBACK_BUDGET_MS is None
+    assert settings.MEMORY_IDLE_TIMEOUTS == {"stt": 5}
+    with pytest.raises(ValueError):
+        settings.configure("default", {"STT_BEAM_SIZE": "wide"})
+    with pytest.raises(ValueError):
+        settings.configure("default", {"NO_SUCH_SETTING": 1})
+    with pytest.raises(ValueError):
+        settings.configure("no-such-profile")
+
+
+def test_model_path_follows_overridden_filename(monkeypatch):
+    monkeypatch.setenv("POCKETMINDLY_LLM_MODEL_FILENAME", "phi-3-mini.Q4_K_M.gguf")
+    settings.configure("default")
+    assert settings.LLM_MODEL_PATH == os.path.join(settings.MODELS_DIR, "phi-3-mini.Q4_K_M.gguf")
+    # An explicit path wins over the filename
+    settings.configure("default", {"LLM_MODEL_PATH": "/opt/models/custom.gguf"})
+    assert settings.LLM_MODEL_PATH == "/opt/models/custom.gguf"
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+from core.state_machine import StateMachine, State
+
+
+def test_invalid_transition_is_rejected():
+    sm = StateMachine(verbose=False)
+    assert not sm.transition(State.SPEAKING)
+    assert sm.state == State.IDLE
+    assert sm.transition(State.LISTENING)
+    assert sm.state == State.LISTENING
+
+
+def test_slow_subscriber_does_not_block_transition():
+    sm = StateMachine(verbose=False)
+    release = threading.Event()
+    seen = []
+
+    def slow(event):
+        release.wait(2.0)
+        seen.append((event.old, event.new))
+
+    sm.subscribe(slow, to_state=State.RECORDING)
+    started = time.monotonic()
+    sm.transition(State.LISTENING)
+    sm.transition(State.RECORDING)
+    sm.transition(State.PROCESSING)
+    assert time.monotonic() - started < 0.5
+    assert sm.state == State.PROCESSING
+
+    release.set()
+    sm.close()
+    assert seen == [(State.LISTENING, State.RECORDING)]
+
+
+def test_on_transition_runs_on_event_loop():
+    async def run():
+        loop = asyncio.get_running_loop()
+        sm = StateMachine(loop=loop, verbose=False)
+        done = asyncio.Event()
+        threads = []
+
+        def callback():
+            threads.append(threading.current_thread())
+            done.set()
+
+        sm.on_transition(State.IDLE, State.LISTENING, callback)
+        await loop.run_in_executor(None, sm.transition, State.LISTENING)
+        await asyncio.wait_for(done.wait(), 1.0)
+        return threads
+
+    assert asyncio.run(run()) == [threading.main_thread()]
+
+
+def test_trace_is_bounded_and_ordered():
+    sm = StateMachine(trace_size=3, verbose=False)
+    for state in (State.LISTENING, State.RECORDING, State.PROCESSING, State.LISTENING):
+        sm.transition(state)
+    trace = sm.trace()
+    assert [e.new for e in trace] == [State.RECORDING, State.PROCESSING, State.LISTENING]
+    assert all(a.at <= b.at for a, b in zip(trace, trace[1:]))
+    assert sm.trace(limit=1)[0].new == State.LISTENING
+    assert set(sm.time_in_states()) == {"RECORDING", "PROCESSING", "LISTENING"}
+
+
+def test_concurrent_transitions_are_traced_and_delivered_in_order():
+    sm = StateMachine(trace_size=10000, verbose=False)
+    delivered = []
+    sm.subscribe(delivered.append)
+    sm.transition(State.LISTENING)
+    cycle = {State.LISTENING: State.RECORDING, State.RECORDING: State.PROCESSING,
+             State.PROCESSING: State.LISTENING}
+
+    def churn():
+        for _ in range(2000):
+            sm.transition(cycle[sm.state])    # Some lose the race (invalid), which is fine
+
+    threads = [threading.Thread(target=churn) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    sm.close()
+
+    trace = sm.trace()
+    assert delivered == trace
+    # Each transition starts where the previous one ended
+    assert all(a.new is b.old for a, b in zip(trace, trace[1:]))
@@ -0,0 +1,68 @@
+import numpy as np
+
+from core.endpointer import Endpointer
+from core.turn_gate import TurnGate, confident_text
+
+RATE = 16000
+FRAME = 480
+
+
+class LevelVAD:
+    """Speech probability = the frame's peak, so tests script it directly"""
+
+    def __init__(self):
+        self._was_speech = False
+
+    def process_frame(self, frame, threshold=0.5):
+        prob = float(np.abs(frame).max())
+        is_speech = prob > threshold
+        event = 'speech_start' if is_speech and not self._was_speech else None
+        self._was_speech = is_speech
+        return {'probability': prob, 'is_speech': is_speech, 'event': event}
+
+    def reset_for_new_utterance(self):
+        self._was_speech = False
+
+
+def utterance_stats(probabilities):
+    """Endpoint one utterance whose frames have these VAD probabilities, then 1 s of silence"""
+    endpointer = Endpointer(LevelVAD(), RATE, silence_threshold=1.0)
+    frames = [np.full(FRAME, p, dtype=np.float32) for p in list(probabilities) + [0.0] * 40]
+    for frame in frames:
+        result = endpointer.process(frame)
+        if result['event'] == 'speech_end':
+            return result['stats']
+    raise AssertionError("no speech_end")
+
+
+def test_noise_bursts_rejected_before_stt_speech_kept():
+    gate = TurnGate(min_speech_seconds=0.3, min_voiced_ratio=0.4, min_vad_probability=0.6)
+
+    speech = utterance_stats([0.9] * 20 + [0.1] * 5 + [0.9] * 20)
+    assert abs(speech['seconds'] - 45 * FRAME / RATE) < 1e-9      # trailing silence excluded
+    assert abs(speech['voiced_ratio'] - 40 / 45) < 1e-9
+    assert gate.check_audio(speech) is None
+
+    cough = utterance_stats([0.95] * 4)
+    assert gate.check_audio(cough) == "too short"
+    # Something just over the VAD threshold now and then (TV in the next room)
+    tv = utterance_stats(([0.55] + [0.3] * 4) * 12)
+    assert gate.check_audio(tv) == "sparse, low vad"
+
+    stats = gate.stats()
+    assert (stats["utterances"], stats["rejected_before_stt"], stats["llm_turns_saved"]) == (3, 2, 2)
+    assert stats["stt_seconds_saved"] > 0
+
+
+def test_low_confidence_segments_dropped_after_stt():
+    hallucination = {'text': " Thank you.", 'no_speech_prob': 0.8, 'avg_logprob': -0.3}
+    guess = {'text': " MBC", 'no_speech_prob': 0.1, 'avg_logprob': -1.4}
+    real = {'text': " What time is it?", 'no_speech_prob': 0.05, 'avg_logprob': -0.2}
+    assert confident_text([hallucination, real, guess]) == "What time is it?"
+
+    gate = TurnGate()
+    assert gate.check_transcript({'text': "", 'segments': [hallucination], 'dropped': 1}) == "low confidence"
+    # Plain silence (nothing decoded) and answered turns aren't counted
+    assert gate.check_transcript({'text': "", 'segments': [], 'dropped': 0}) is None
+    assert gate.check_transcript({'text': "What time is it?", 'segments': [real], 'dropped': 0}) is None
+    assert gate.stats()["rejected_after_stt"] == 1
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for speculative searches.
+    Allows a short burst, then caps the sustained rate to the search provider.
+    """
+
+    def __init__(self, rate_per_sec: float = 0.5, burst: int = 2):
+        self.rate = rate_per_sec
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Take one token if available. Never blocks."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class SearchPrefetcher:
+    """
+    Starts likely web searches before the pipeline has decided it needs them.
+
+    Searches run on a background event loop so they can be started from any
+    thread (audio callback, STT, routing). A search that is later needed is
+    claimed with get_context(); anything unclaimed is cancelled by discard().
+    """
+
+    def __init__(self, web_tool, limiter: Optional[RateLimiter] = None, loop=None):
+        self.web_tool = web_tool
+        self.limiter = limiter or RateLimiter()
+
+        self._loop = loop
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # query -> {future, started, finished}
+        self._inflight: Dict[str, dict] = {}
+
+        # Stats
+        self.prefetched = 0
+        self.hits = 0
+        self.discarded = 0
+        self.rate_limited = 0
+        self.saved_ms_total = 0.0
+
+    # ---------- LOOP ----------
+
+    def _ensure_loop(self):
+        if self._loop is not None:
+            return self._loop
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name="search-prefetch",
+            daemon=True
+        )
+        self._thread.start()
+        return self._loop
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    # ---------- PREFETCH ----------
+
+    def prefetch(self, query: str) -> bool:
+        """
+        Start a search for query in the background (thread-safe).
+        Returns True if a search for this query is now in flight.
+        """
+        key = self._normalize(query)
+        if not key:
+            return False
+
+        with self._lock:
+            if key in self._inflight:
+                return True
+
+            if not self.limiter.try_acquire():
+                self.rate_limited += 1
+                return False
+
+            loop = self._ensure_loop()
+            future = asyncio.run_coroutine_threadsafe(self.web_tool.get_context(query), loop)
+            started = time.monotonic()
+            self._inflight[key] = {"future": future, "started": started, "finished": None}
+            self.prefetched += 1
+
+        # Outside the lock: a search that already finished runs the callback right here
+        future.add_done_callback(lambda f, k=key: self._mark_done(k, f))
+        return True
+
+    def _mark_done(self, key, future):
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None and entry["future"] is future:
+                entry["finished"] = time.monotonic()
+
+    async def get_context(self, query: str):
+        """
+        Return search context for query.
+        Reuses an in-flight prefetch for exactly the same (normalized) query,
+        otherwise searches now. Any other prefetch is cancelled: results for
+        "the president of france" don't answer "the president of france today".
+        """
+        key = self._normalize(query)
+        claimed_at = time.monotonic()
+
+        with self._lock:
+            entry = self._inflight.pop(key, None)
+            others = list(self._inflight.values())
+            self._inflight.clear()
+        self._drop(others)
+
+        if entry is None:
+            return await self.web_tool.get_context(query)
+
+        # Head start = how much of the search ran before we would have started it
+        end = entry["finished"] or claimed_at
+        saved_ms = max(0.0, min(claimed_at, end) - entry["started"]) * 1000
+        self.hits += 1
+        self.saved_ms_total += saved_ms
+        print(f"⚡ Prefetched search reused (saved ~{saved_ms:.0f} ms)")
+
+        return await asyncio.wrap_future(entry["future"])
+
+    def discard(self):
+        """Cancel and drop every unclaimed prefetch."""
+        with self._lock:
+            entries = list(self._inflight.values())
+            self._inflight.clear()
+        self._drop(entries)
+
+    def _drop(self, entries):
+        for entry in entries:
+            future = entry["future"]
+            if future.done():
+                # Retrieve the exception so it is not reported as unhandled
+                if not future.cancelled():
+                    future.exception()
+            else:
+                future.cancel()
+            self.discarded += 1
+
+    def stats(self) -> dict:
+        """Prefetch counters and average latency saved per reused search."""
+        return {
+            "prefetched": self.prefetched,
+            "hits": self.hits,
+            "discarded": self.discarded,
+            "rate_limited": self.rate_limited,
+            "avg_saved_ms": self.saved_ms_total / self.hits if self.hits else 0.0,
+        }
+
+    def close(self):
+        """Stop the background loop if this prefetcher owns it."""
+        self.discard()
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=1.0)
+            self._thread = None
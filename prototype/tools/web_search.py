@@ -1,8 +1,11 @@
 import asyncio
-import aiohttp
 import urllib.parse
-from bs4 import BeautifulSoup
-from typing import List, Dict
+from typing import TYPE_CHECKING, Dict
+from core import tracing
+from config import settings
+
+if TYPE_CHECKING:
+    import aiohttp
 
 class AsyncWebSearchTool:
     """
@@ -10,7 +13,9 @@ class AsyncWebSearchTool:
     Designed for local LLM summarization.
     """
 
-    def __init__(self):
+    def __init__(self, search_url: str = None):
+        # "{query}" is replaced by the URL-encoded query (DuckDuckGo HTML by default)
+        self.search_url = search_url or settings.SEARCH_URL
         self.headers = {
             "User-Agent": (
                 "Mozilla/5.0 (X11; Linux x86_64) "
@@ -18,22 +23,51 @@ class AsyncWebSearchTool:
                 "Chrome/120.0 Safari/537.36"
             )
         }
-        self.max_chars_per_page = 2000
-        self.fetch_timeout = aiohttp.ClientTimeout(total=4)
+        self.max_chars_per_page = settings.SEARCH_MAX_CHARS_PER_PAGE
+        self.fetch_timeout_seconds = settings.SEARCH_FETCH_TIMEOUT
+
+        # One HTTP session (and so one connection pool) per event loop, kept across searches
+        self._session = None
+        self._session_loop = None
+
+    # ---------- SESSION ----------
+
+    def _client(self) -> "aiohttp.ClientSession":
+        """The shared session, created on first use on the running loop"""
+        # aiohttp and bs4 are imported on first search, not at startup
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.fetch_timeout_seconds)
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def close(self):
+        """Close the shared session (call on the loop that searched)"""
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            await session.close()
 
     # ---------- SEARCH ----------
 
-    async def search(self, session: aiohttp.ClientSession, query: str, max_results: int = 5):
+    async def search(self, session: "aiohttp.ClientSession", query: str, max_results: int = None):
+        from bs4 import BeautifulSoup  # deferred, see _client()
+
         encoded = urllib.parse.quote(query)
-        url = f"https://html.duckduckgo.com/html/?q={encoded}"
+        url = self.search_url.format(query=encoded)
 
-        async with session.get(url) as resp:
-            html = await resp.text()
+        with tracing.tracer.span("search.results"):
+            async with session.get(url) as resp:
+                html = await resp.text()
 
         soup = BeautifulSoup(html, "html.parser")
         results = []
 
-        for result in soup.find_all("div", class_="result", limit=max_results):
+        for result in soup.find_all("div", class_="result", limit=max_results or settings.SEARCH_MAX_RESULTS):
             title = result.find("a", class_="result__a")
             snippet = result.find("a", class_="result__snippet")
 
@@ -48,7 +82,9 @@ class AsyncWebSearchTool:
 
     # ---------- PAGE FETCH ----------
 
-    async def fetch_page(self, session: aiohttp.ClientSession, result: Dict):
+    async def fetch_page(self, session: "aiohttp.ClientSession", result: Dict):
+        from bs4 import BeautifulSoup
+
         try:
             async with session.get(result["url"]) as resp:
                 if resp.status != 200:
@@ -79,45 +115,51 @@ class AsyncWebSearchTool:
 
     # ---------- ORCHESTRATOR ----------
 
-    async def get_context(self, query: str, max_pages: int = 2):
-        async with aiohttp.ClientSession(
-            headers=self.headers,
-            timeout=self.fetch_timeout
-        ) as session:
+    async def get_context(self, query: str, max_pages: int = None):
+        with tracing.tracer.span("search.context"):
+            return await self._get_context(query, max_pages or settings.SEARCH_MAX_PAGES)
+
+    async def _get_context(self, query: str, max_pages: int = 2):
+        session = self._client()
 
-            search_results = await self.search(session, query)
-            if not search_results:
-                return "No search results found."
+        search_results = await self.search(session, query)
+        if not search_results:
+            return "No search results found."
 
-            tasks = [
-                asyncio.create_task(self.fetch_page(session, r))
-                for r in search_results
-            ]
+        tasks = [
+            asyncio.create_task(self.fetch_page(session, r))
+            for r in search_results
+        ]
 
-            collected = []
+        collected = []
+        try:
             for future in asyncio.as_completed(tasks):
                 page = await future
                 if page:
                     collected.append(page)
                     if len(collected) >= max_pages:
                         break
+        finally:
+            # The session outlives this search, so stop the fetches it no longer needs
+            for task in tasks:
+                task.cancel()
+
+        if not collected:
+            # fallback to snippets
+            return "\n".join(
+                f"{i+1}. {r['title']}: {r['snippet']}"
+                for i, r in enumerate(search_results[:3])
+            )
 
-            if not collected:
-                # fallback to snippets
-                return "\n".join(
-                    f"{i+1}. {r['title']}: {r['snippet']}"
-                    for i, r in enumerate(search_results[:3])
-                )
-
-            # Build LLM-friendly context
-            context = ""
-            for i, page in enumerate(collected):
-                context += (
-                    f"\nSOURCE {i+1}: {page['title']}\n"
-                    f"{page['content']}\n"
-                )
+        # Build LLM-friendly context
+        context = ""
+        for i, page in enumerate(collected):
+            context += (
+                f"\nSOURCE {i+1}: {page['title']}\n"
+                f"{page['content']}\n"
+            )
 
-            return context.strip()
+        return context.strip()
 
 # ---------- TEST ----------
 
@@ -125,5 +167,10 @@ if __name__ == "__main__":
     tool = AsyncWebSearchTool()
     query = "current price of bitcoin"
 
-    result = asyncio.run(tool.get_context(query))
-    print(result)
+    async def once():
+        try:
+            return await tool.get_context(query)
+        finally:
+            await tool.close()
+
+    print(asyncio.run(once()))
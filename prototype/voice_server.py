@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+PocketMindly - Voice Server
+Many thin clients (kiosks, browser tabs) share one set of models.
+
+Each client gets its own VAD state, endpointer and StateMachine. One Whisper
+model and one GGUF model are shared through fair (round-robin) schedulers.
+
+Protocol (WebSocket at /ws):
+    client -> server   binary: mono int16 PCM at the "hello" sample rate (16 kHz), any chunk size
+                       text:   {"type": "reset"}
+    server -> client   text:   {"type": "state" | "transcript" | "rejected" | "token" | "audio" | "reply" | "busy", ...}
+                       binary: TTS PCM (int16), announced by the "audio" message before it
+GET /stats returns per-session latency and scheduler stats as JSON.
+
+Barge-in is not supported here: audio arriving while a reply is being
+generated or spoken is ignored.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+from aiohttp import web, WSMsgType
+
+from config import settings
+from core import tracing
+from core.dsp import DSPChain
+from core.endpointer import Endpointer
+from core.router import IntentRouter
+from core.scheduler import FairScheduler
+from core.state_machine import StateMachine, State
+from core.tracing import RollingHistogram
+from core.tts import SentenceSplitter, NullBackend, clean_for_speech, create_backend
+from core.turn_gate import TurnGate
+from tools.web_search import AsyncWebSearchTool
+
+
+class ClientSession:
+    """One connected client: its own VAD state, endpointer and StateMachine"""
+
+    def __init__(self, server, ws, session_id: str):
+        self.server = server
+        self.ws = ws
+        self.id = session_id
+        self.loop = asyncio.get_running_loop()
+
+        self.vad = server.vad.fork()
+        self.sample_rate = settings.SAMPLE_RATE
+        self.frame_size = settings.SAMPLE_RATE * settings.FRAME_MS // 1000
+        self.dsp = DSPChain.from_settings(self.sample_rate, settings.FRAME_MS)
+        self.endpointer = Endpointer(self.vad, sample_rate=self.sample_rate,
+                                     silence_threshold=settings.SILENCE_THRESHOLD,
+                                     vad_threshold=settings.VAD_THRESHOLD)
+        self.gate = TurnGate.from_settings()
+        self.state_machine = StateMachine(loop=self.loop)
+        self.state_machine.transition(State.LISTENING)
+
+        self.cancel = threading.Event()
+        self._pcm = np.zeros(0, dtype=np.int16)
+        self._turn_task = None
+
+        # Everything sent goes through one writer task, so messages never interleave
+        self._outbox = asyncio.Queue()
+        self._writer = asyncio.ensure_future(self._write())
+
+        # Stats (ms from the VAD endpoint)
+        self.connected = time.monotonic()
+        self.turns = 0
+        self.latency = {name: RollingHistogram(100) for name in ("stt", "first_token", "first_audio", "reply")}
+
+    # ---------- OUTPUT ----------
+
+    def send(self, message: dict):
+        self._outbox.put_nowait(("text", message))
+
+    def send_audio(self, pcm: np.ndarray, sample_rate: int):
+        self._outbox.put_nowait(("text", {"type": "audio", "sample_rate": sample_rate, "samples": len(pcm)}))
+        self._outbox.put_nowait(("bytes", pcm.astype("<i2").tobytes()))
+
+    async def _write(self):
+        while True:
+            kind, payload = await self._outbox.get()
+            try:
+                if kind == "text":
+                    await self.ws.send_str(json.dumps(payload))
+                else:
+                    await self.ws.send_bytes(payload)
+            except (ConnectionResetError, RuntimeError):
+                return
+
+    def _transition(self, state: State):
+        if self.state_machine.transition(state):
+            self.send({"type": "state", "state": state.name})
+
+    # ---------- INPUT ----------
+
+    async def feed(self, data: bytes):
+        """Split incoming PCM into 30 ms frames and run VAD/endpointing on them"""
+        self._pcm = np.concatenate([self._pcm, np.frombuffer(data, dtype="<i2")])
+        while len(self._pcm) >= self.frame_size:
+            frame = self._pcm[:self.frame_size].astype(np.float32) / 32768.0
+            self._pcm = self._pcm[self.frame_size:]
+
+            state = self.state_machine.state
+            if state not in (State.LISTENING, State.RECORDING):
+                continue
+            if self.dsp:
+                self.dsp.process(frame)
+
+            result = await self.loop.run_in_executor(self.server.vad_executor, self.endpointer.process, frame)
+            if result['event'] == 'speech_start' and state == State.LISTENING:
+                self._transition(State.RECORDING)
+            elif result['event'] == 'speech_end':
+                self._transition(State.PROCESSING)
+                # False triggers never reach the shared Whisper queue
+                reason = self.gate.check_audio(result['stats'])
+                if reason:
+                    self.send({"type": "rejected", "reason": reason})
+                    self._finish()
+                    continue
+                self._turn_task = asyncio.ensure_future(self._run_turn(result['audio']))
+
+    def reset(self):
+        self.cancel.set()
+        if self._turn_task is not None:
+            self._turn_task.cancel()
+        self.endpointer.reset()
+        self.state_machine = StateMachine(loop=self.loop)
+        self.state_machine.transition(State.LISTENING)
+        self.send({"type": "state", "state": State.LISTENING.name})
+
+    # ---------- TURN ----------
+
+    async def _run_turn(self, audio: np.ndarray):
+        server = self.server
+        endpoint = time.monotonic()
+        self.cancel = threading.Event()
+        ms = lambda: (time.monotonic() - endpoint) * 1000
+
+        try:
+            result = await server.stt_scheduler.run(self.id, server.stt.transcribe_detailed, audio)
+            text = result['text']
+            stt_ms = ms()
+            self.latency["stt"].add(stt_ms)
+            reason = self.gate.check_transcript(result)
+            if reason:
+                self.send({"type": "rejected", "reason": reason})
+                self._finish()
+                return
+            self.send({"type": "transcript", "text": text})
+            if not text:
+                self._finish()
+                return
+
+            self._transition(State.THINKING)
+            route = server.router.route(text)
+            context = None
+            if route['needs_search']:
+                try:
+                    context = await server.web_tool.get_context(route['query'])
+                except Exception as e:
+                    print(f"[{self.id}] ⚠️ Search error: {str(e)[:50]}")
+
+            # Tokens arrive on the LLM thread; sentences are synthesised as they complete
+            splitter = SentenceSplitter()
+            sentences = asyncio.Queue()
+            speaker = asyncio.ensure_future(self._speak(sentences, endpoint))
+            first_token = []
+
+            def on_token_loop(token):
+                if not first_token:
+                    first_token.append(ms())
+                    self.latency["first_token"].add(first_token[0])
+                    self._transition(State.SPEAKING)
+                self.send({"type": "token", "text": token})
+                for sentence in splitter.feed(token):
+                    sentences.put_nowait(sentence)
+
+            on_token = lambda token: self.loop.call_soon_threadsafe(on_token_loop, token)
+            if context and len(context) > 100:
+                fn = partial(server.llm.generate_response_with_search, text, context,
+                             cancel_event=self.cancel, on_token=on_token)
+            else:
+                fn = partial(server.llm.generate_response, text, cancel_event=self.cancel, on_token=on_token)
+            reply = await server.llm_scheduler.run(self.id, fn)
+
+            for sentence in splitter.flush():
+                sentences.put_nowait(sentence)
+            sentences.put_nowait(None)
+            await speaker
+
+            self.latency["reply"].add(ms())
+            self.turns += 1
+            self.send({"type": "reply", "text": reply or "", "intent": route['intent'],
+                       "latency_ms": {"stt": round(stt_ms, 1),
+                                      "first_token": round(first_token[0], 1) if first_token else None,
+                                      "reply": round(ms(), 1)}})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[{self.id}] Error in turn: {e}")
+            self.send({"type": "error", "message": str(e)})
+        self._finish()
+
+    async def _speak(self, sentences: asyncio.Queue, endpoint: float):
+        """Synthesise queued sentences in order on the shared TTS scheduler and stream the audio"""
+        server = self.server
+        first = True
+        while True:
+            sentence = await sentences.get()
+            if sentence is None:
+                return
+            sentence = clean_for_speech(sentence)
+            if not sentence or server.tts_backend is None:
+                continue
+            pcm = await server.tts_scheduler.run(self.id, server.tts_backend.synthesize, sentence)
+            if first:
+                self.latency["first_audio"].add((time.monotonic() - endpoint) * 1000)
+                first = False
+            self.send_audio(pcm, server.tts_backend.sample_rate)
+
+    def _finish(self):
+        self.endpointer.reset()
+        self._transition(State.LISTENING)
+
+    # ---------- LIFECYCLE ----------
+
+    def close(self):
+        self.cancel.set()
+        if self._turn_task is not None:
+            self._turn_task.cancel()
+        self._writer.cancel()
+        for scheduler in (self.server.stt_scheduler, self.server.llm_scheduler, self.server.tts_scheduler):
+            scheduler.drop_session(self.id)
+
+    def stats(self) -> dict:
+        return {
+            "turns": self.turns,
+            "connected_s": round(time.monotonic() - self.connected, 1),
+            "state": self.state_machine.state.name,
+            "transitions": [(e.old.name, e.new.name, round(e.at - self.connected, 3))
+                            for e in self.state_machine.trace(limit=20)],
+            "latency_ms": {name: h.summary() for name, h in self.latency.items()},
+            "dsp": self.dsp.stats(),
+            "gate": self.gate.stats(),
+        }
+
+
+class VoiceServer:
+    """
+    Accepts many concurrent audio streams and answers them with one shared
+    set of models. Components default to the real models; pass stand-ins to
+    run without them.
+    """
+
+    def __init__(self, vad=None, stt=None, llm=None, web_tool=None, tts_backend=None,
+                 max_sessions=None, max_backlog=None):
+        print("🚀 Initializing PocketMindly Voice Server...")
+        if vad is None:
+            from core.vad import SileroVAD
+            vad = SileroVAD()
+        if stt is None:
+            from core.stt import PocketSTT
+            stt = PocketSTT()
+        self.llm_server = None
+        if llm is None and settings.LLM_OUT_OF_PROCESS:
+            from core.llm_server import LLMServer, RemoteLLM
+            self.llm_server = LLMServer().start()
+            llm = RemoteLLM(self.llm_server)
+        elif llm is None:
+            from core.llm import PocketLLM
+            llm = PocketLLM()
+        if tts_backend is None:
+            tts_backend = create_backend(settings.VOICE_SERVER_TTS)
+
+        self.vad = vad
+        self.stt = stt
+        self.llm = llm
+        self.web_tool = web_tool or AsyncWebSearchTool()
+        # Silent backend: text-only replies, no audio frames
+        self.tts_backend = None if isinstance(tts_backend, NullBackend) else tts_backend
+        self.router = IntentRouter.from_config()
+
+        self.max_sessions = max_sessions or settings.VOICE_SERVER_MAX_SESSIONS
+        self.max_backlog = max_backlog or settings.VOICE_SERVER_MAX_BACKLOG
+
+        self.vad_executor = ThreadPoolExecutor(max_workers=settings.VOICE_SERVER_VAD_WORKERS,
+                                               thread_name_prefix="server-vad")
+        self.stt_scheduler = FairScheduler("stt", concurrency=1)
+        self.llm_scheduler = FairScheduler("llm", concurrency=1)
+        self.tts_scheduler = FairScheduler("tts", concurrency=settings.VOICE_SERVER_TTS_WORKERS)
+
+        self.sessions = {}
+        self._ids = itertools.count(1)
+        self.admitted = 0
+        self.rejected = 0
+
+    # ---------- ADMISSION ----------
+
+    def admit(self) -> bool:
+        """Refuse new clients when full, or when shared models are already backed up"""
+        if len(self.sessions) >= self.max_sessions:
+            return False
+        return self.stt_scheduler.backlog + self.llm_scheduler.backlog < self.max_backlog
+
+    # ---------- HTTP ----------
+
+    async def handle_ws(self, request):
+        ws = web.WebSocketResponse(max_msg_size=1 << 20)
+        await ws.prepare(request)
+
+        if not self.admit():
+            self.rejected += 1
+            await ws.send_str(json.dumps({"type": "busy", "sessions": len(self.sessions)}))
+            await ws.close(code=1013, message=b"server busy")
+            return ws
+
+        session_id = f"s{next(self._ids)}"
+        session = ClientSession(self, ws, session_id)
+        self.sessions[session_id] = session
+        self.admitted += 1
+        print(f"🔌 {session_id} connected ({len(self.sessions)} active)")
+        session.send({"type": "hello", "session": session_id, "sample_rate": session.sample_rate})
+
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.BINARY:
+                    await session.feed(msg.data)
+                elif msg.type == WSMsgType.TEXT:
+                    try:
+                        control = json.loads(msg.data)
+                    except ValueError:
+                        session.send({"type": "error", "message": "malformed control message"})
+                        continue
+                    if isinstance(control, dict) and control.get("type") == "reset":
+                        session.reset()
+                elif msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            session.close()
+            del self.sessions[session_id]
+            print(f"🔌 {session_id} disconnected ({len(self.sessions)} active)")
+        return ws
+
+    async def handle_stats(self, request):
+        return web.json_response(self.stats())
+
+    def stats(self) -> dict:
+        return {
+            "sessions": {sid: s.stats() for sid, s in self.sessions.items()},
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "schedulers": {s.name: s.stats() for s in (self.stt_scheduler, self.llm_scheduler, self.tts_scheduler)},
+        }
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/ws", self.handle_ws)
+        app.router.add_get("/stats", self.handle_stats)
+        app.on_shutdown.append(self._on_shutdown)
+        return app
+
+    async def _on_shutdown(self, app):
+        for session in list(self.sessions.values()):
+            await session.ws.close()
+        await self.web_tool.close()
+
+    def close(self):
+        for scheduler in (self.stt_scheduler, self.llm_scheduler, self.tts_scheduler):
+            scheduler.shutdown()
+        self.vad_executor.shutdown(wait=False)
+        if self.llm_server is not None:
+            self.llm_server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PocketMindly multi-client voice server")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--max-sessions", type=int)
+    settings.add_arguments(parser)
+    args = parser.parse_args()
+    if not settings.apply_args(args):
+        raise SystemExit(0)
+    args.host = args.host or settings.VOICE_SERVER_HOST
+    args.port = args.port or settings.VOICE_SERVER_PORT
+    tracing.set_tracer(tracing.from_settings())
+
+    server = VoiceServer(max_sessions=args.max_sessions)
+    print(f"✅ Listening on ws://{args.host}:{args.port}/ws (max {server.max_sessions} clients)")
+    try:
+        web.run_app(server.app(), host=args.host, port=args.port, print=None)
+    finally:
+        server.close()